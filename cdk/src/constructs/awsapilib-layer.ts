@@ -0,0 +1,52 @@
+import * as path from 'path';
+import { PythonLayerVersion } from '@aws-cdk/aws-lambda-python-alpha';
+import { Stack } from 'aws-cdk-lib';
+import { Runtime } from 'aws-cdk-lib/aws-lambda';
+import { Construct } from 'constructs';
+import { compilePython } from './superwerker-python-layer';
+
+/**
+ * Packages awsapilib depends on that the lambda runtime provides. pip installs them as dependencies of awsapilib, they
+ * are removed again so functions use the boto3 and botocore of the runtime, like the ones without this layer.
+ */
+const RUNTIME_PACKAGES = ['boto3', 'botocore', 's3transfer'];
+
+/**
+ * Pinned awsapilib with its dependencies except boto3 and botocore, installed and compiled at build time.
+ *
+ * Functions using awsapilib get it from this layer, so nothing is installed at runtime and they work without internet
+ * access on their first invocation.
+ */
+export class AwsapilibLayer extends Construct {
+  /**
+   * Returns the singleton layer of the stack.
+   */
+  public static getOrCreate(scope: Construct) {
+    const stack = Stack.of(scope);
+    const id = 'superwerker.awsapilib-layer';
+    const layer = (stack.node.tryFindChild(id) as AwsapilibLayer) || new AwsapilibLayer(stack, id);
+    return layer.layerVersion;
+  }
+
+  public readonly layerVersion: PythonLayerVersion;
+
+  constructor(scope: Construct, id: string) {
+    super(scope, id);
+
+    this.layerVersion = new PythonLayerVersion(this, 'awsapilib', {
+      entry: path.join(__dirname, '..', 'layers', 'awsapilib'),
+      compatibleRuntimes: [Runtime.PYTHON_3_14],
+      description: 'awsapilib with pinned dependencies',
+      bundling: {
+        commandHooks: {
+          beforeBundling: () => [],
+          afterBundling: (inputDir: string, outputDir: string) => [
+            // boto3* also matches boto3_type_annotations, type stubs not used at runtime
+            `rm -rf ${RUNTIME_PACKAGES.map((p) => `${outputDir}/${p}*`).join(' ')}`,
+            ...compilePython.afterBundling(inputDir, outputDir),
+          ],
+        },
+      },
+    });
+  }
+}
@@ -4,6 +4,9 @@ import { CustomResource, Duration, Stack, aws_iam as iam, aws_lambda as lambda }
 import { Runtime } from 'aws-cdk-lib/aws-lambda';
 import * as cr from 'aws-cdk-lib/custom-resources';
 import { Construct } from 'constructs';
+import { BOTOCORE_DATA_ENVIRONMENT, botocoreDataBundling } from './botocore-data';
+import { OrganizationsLock } from './organizations-lock';
+import { SuperwerkerPythonLayer } from './superwerker-python-layer';
 
 export class BackupPolicyEnable extends Construct {
   constructor(scope: Construct, id: string) {
@@ -35,6 +38,7 @@ class BackupPolicyEnableProvider extends Construct {
       entry: path.join(__dirname, '..', 'functions', 'backup-policy-enable'),
       handler: 'enable_tag_policies',
       runtime: Runtime.PYTHON_3_14,
+      layers: [SuperwerkerPythonLayer.getOrCreate(this)],
       timeout: Duration.seconds(200),
       initialPolicy: [
         new iam.PolicyStatement({
@@ -42,10 +46,13 @@ class BackupPolicyEnableProvider extends Construct {
           actions: ['organizations:EnablePolicyType', 'organizations:DisablePolicyType', 'organizations:ListRoots'],
         }),
       ],
+      environment: BOTOCORE_DATA_ENVIRONMENT,
       bundling: {
         assetExcludes: ['__pycache__', 'tests', '.pytest_cache', '.venv'],
+        ...botocoreDataBundling,
       },
     });
+    OrganizationsLock.getOrCreate(this).grant(backupPolicyEnableFn);
     (backupPolicyEnableFn.node.defaultChild as lambda.CfnFunction).overrideLogicalId('BackupPolicyEnableHandlerFunction');
 
     this.provider = new cr.Provider(this, 'backup-policy-enable-provider', {
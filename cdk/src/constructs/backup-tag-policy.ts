@@ -4,6 +4,10 @@ import { aws_iam as iam, CustomResource, Duration, Stack, aws_lambda as lambda }
 import { Runtime } from 'aws-cdk-lib/aws-lambda';
 import * as cr from 'aws-cdk-lib/custom-resources';
 import { Construct } from 'constructs';
+import { BOTOCORE_DATA_ENVIRONMENT, botocoreDataBundling } from './botocore-data';
+import { CustomResourceResults } from './custom-resource-results';
+import { OrganizationsLock } from './organizations-lock';
+import { SuperwerkerPythonLayer } from './superwerker-python-layer';
 
 interface BackupTagPolicyProps {
   readonly policy: string;
@@ -44,6 +48,7 @@ class BackupTagPolicyProvider extends Construct {
       entry: path.join(__dirname, '..', 'functions', 'backup-tag-policy'),
       handler: 'handler',
       runtime: Runtime.PYTHON_3_14,
+      layers: [SuperwerkerPythonLayer.getOrCreate(this)],
       timeout: Duration.seconds(200),
       initialPolicy: [
         new iam.PolicyStatement({
@@ -52,18 +57,24 @@ class BackupTagPolicyProvider extends Construct {
             'organizations:CreatePolicy',
             'organizations:UpdatePolicy',
             'organizations:DeletePolicy',
+            'organizations:DescribePolicy',
             'organizations:AttachPolicy',
             'organizations:DetachPolicy',
             'organizations:ListRoots',
             'organizations:ListPolicies',
             'organizations:ListPoliciesForTarget',
+            'organizations:ListTargetsForPolicy',
           ],
         }),
       ],
+      environment: BOTOCORE_DATA_ENVIRONMENT,
       bundling: {
         assetExcludes: ['__pycache__', 'tests', '.pytest_cache', '.venv'],
+        ...botocoreDataBundling,
       },
     });
+    OrganizationsLock.getOrCreate(this).grant(tagPolicyFn);
+    CustomResourceResults.getOrCreate(this).grant(tagPolicyFn);
     (tagPolicyFn.node.defaultChild as lambda.CfnFunction).overrideLogicalId('TagPolicyHandlerFunction');
 
     this.provider = new cr.Provider(this, 'backup-tag-policy-provider', {
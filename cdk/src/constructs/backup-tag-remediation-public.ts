@@ -4,6 +4,8 @@ import { aws_iam as iam, CustomResource, Duration, Stack, aws_lambda as lambda,
 import { Runtime } from 'aws-cdk-lib/aws-lambda';
 import * as cr from 'aws-cdk-lib/custom-resources';
 import { Construct } from 'constructs';
+import { BOTOCORE_DATA_ENVIRONMENT, botocoreDataBundling } from './botocore-data';
+import { SuperwerkerPythonLayer } from './superwerker-python-layer';
 
 interface BackupTagRemediationPublicProps {
   readonly documentName: string;
@@ -45,6 +47,7 @@ class BackupTagRemediationPublicProvider extends Construct {
       entry: path.join(__dirname, '..', 'functions', 'backup-tag-remediation-public'),
       handler: 'handler',
       runtime: Runtime.PYTHON_3_14,
+      layers: [SuperwerkerPythonLayer.getOrCreate(this)],
       timeout: Duration.seconds(3),
       initialPolicy: [
         new iam.PolicyStatement({
@@ -61,8 +64,10 @@ class BackupTagRemediationPublicProvider extends Construct {
           actions: ['ssm:ModifyDocumentPermission'],
         }),
       ],
+      environment: BOTOCORE_DATA_ENVIRONMENT,
       bundling: {
         assetExcludes: ['__pycache__', 'tests', '.pytest_cache', '.venv'],
+        ...botocoreDataBundling,
       },
     });
     (backupTagRemedationPublicFn.node.defaultChild as lambda.CfnFunction).overrideLogicalId('BackupTagRemediationPublicHandlerFunction');
@@ -1,9 +1,15 @@
 import * as path from 'path';
 import { PythonFunction } from '@aws-cdk/aws-lambda-python-alpha';
-import { CustomResource, Duration, Stack, aws_lambda as lambda } from 'aws-cdk-lib';
+import { CustomResource, Duration, Stack, aws_iam as iam, aws_lambda as lambda } from 'aws-cdk-lib';
 import { Runtime } from 'aws-cdk-lib/aws-lambda';
 import * as cr from 'aws-cdk-lib/custom-resources';
 import { Construct } from 'constructs';
+import { AwsapilibLayer } from './awsapilib-layer';
+import { CustomResourceResults } from './custom-resource-results';
+import { compilePython, SuperwerkerPythonLayer } from './superwerker-python-layer';
+
+// SSM parameters caching the billing settings shown on the dashboard
+const CACHE_PARAMETER_PREFIX = '/superwerker/cache/billing-setup';
 
 export class BillingSetup extends Construct {
   public billingSetupFn: PythonFunction;
@@ -39,11 +45,23 @@ class BillingSetupProvider extends Construct {
       handler: 'handler',
       runtime: Runtime.PYTHON_3_14,
       timeout: Duration.seconds(30),
+      layers: [SuperwerkerPythonLayer.getOrCreate(this), AwsapilibLayer.getOrCreate(this)],
+      environment: {
+        CACHE_PARAMETER_PREFIX: CACHE_PARAMETER_PREFIX,
+      },
+      initialPolicy: [
+        new iam.PolicyStatement({
+          actions: ['ssm:GetParameter', 'ssm:PutParameter', 'ssm:DeleteParameter'],
+          resources: [`arn:aws:ssm:*:*:parameter${CACHE_PARAMETER_PREFIX}/*`],
+        }),
+      ],
       bundling: {
         assetExcludes: ['__pycache__', 'tests', '.pytest_cache', '.venv'],
+        commandHooks: compilePython,
       },
     });
     (billingSetupFn.node.defaultChild as lambda.CfnFunction).overrideLogicalId('BillingSetupFunction');
+    CustomResourceResults.getOrCreate(this).grant(billingSetupFn);
 
     this.provider = new cr.Provider(this, 'billing-setup-provider', {
       onEventHandler: billingSetupFn,
@@ -0,0 +1,41 @@
+import * as path from 'path';
+import { BundlingOptions } from '@aws-cdk/aws-lambda-python-alpha';
+import { DockerVolume } from 'aws-cdk-lib';
+import { compilePython } from './superwerker-python-layer';
+
+const BOTOCORE_DATA = 'botocore-data';
+
+/**
+ * Points botocore at the data bundled by `botocoreDataBundling`, it is read before the data of the runtime's botocore.
+ */
+export const BOTOCORE_DATA_ENVIRONMENT = { AWS_DATA_PATH: `/var/task/${BOTOCORE_DATA}` };
+
+// the build tools of the superwerker package, see src/layers/superwerker-python
+const superwerkerPythonVolume: DockerVolume = {
+  hostPath: path.join(__dirname, '..', 'layers', 'superwerker-python'),
+  containerPath: '/superwerker-python',
+};
+
+/**
+ * Commands bundling the botocore data of only the services the function in `inputDir` uses, see `superwerker.botocore_data`.
+ * The models are taken from the botocore of the runtime in the bundling image, so they match the one that reads them.
+ */
+export function botocoreDataCommands(inputDir: string, outputDir: string) {
+  return [
+    `PYTHONPATH=${superwerkerPythonVolume.containerPath}:/var/runtime python -m superwerker.botocore_data ${inputDir} ${outputDir}/${BOTOCORE_DATA}`,
+  ];
+}
+
+/**
+ * Bundling of python functions with slimmed botocore data, the functions need `BOTOCORE_DATA_ENVIRONMENT`.
+ */
+export const botocoreDataBundling: Pick<BundlingOptions, 'volumes' | 'commandHooks'> = {
+  volumes: [superwerkerPythonVolume],
+  commandHooks: {
+    beforeBundling: () => [],
+    afterBundling: (inputDir: string, outputDir: string) => [
+      ...botocoreDataCommands(inputDir, outputDir),
+      ...compilePython.afterBundling(inputDir, outputDir),
+    ],
+  },
+};
@@ -0,0 +1,35 @@
+import { RemovalPolicy, Stack, aws_dynamodb as dynamodb, aws_lambda as lambda } from 'aws-cdk-lib';
+import { Construct } from 'constructs';
+
+/**
+ * Table the python functions keep the results of custom resource requests in, so retried deliveries return them
+ * instead of running again, see `superwerker.idempotency`.
+ */
+export class CustomResourceResults extends Construct {
+  /**
+   * Returns the singleton table of the stack.
+   */
+  public static getOrCreate(scope: Construct) {
+    const stack = Stack.of(scope);
+    const id = 'superwerker.custom-resource-results';
+    return (stack.node.tryFindChild(id) as CustomResourceResults) || new CustomResourceResults(stack, id);
+  }
+
+  public readonly table: dynamodb.Table;
+
+  constructor(scope: Construct, id: string) {
+    super(scope, id);
+
+    this.table = new dynamodb.Table(this, 'Table', {
+      partitionKey: { name: 'Key', type: dynamodb.AttributeType.STRING },
+      timeToLiveAttribute: 'ExpiresAt',
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: RemovalPolicy.DESTROY,
+    });
+  }
+
+  public grant(fn: lambda.Function) {
+    this.table.grant(fn, 'dynamodb:GetItem', 'dynamodb:PutItem', 'dynamodb:DeleteItem');
+    fn.addEnvironment('REQUEST_RESULTS_TABLE', this.table.tableName);
+  }
+}
@@ -0,0 +1,36 @@
+import { RemovalPolicy, Stack, aws_dynamodb as dynamodb, aws_lambda as lambda } from 'aws-cdk-lib';
+import { Construct } from 'constructs';
+
+/**
+ * Lease table the python functions of a stack use to serialize their AWS Organizations writes, see `superwerker.lock`.
+ *
+ * Each stack has its own table, functions of different stacks are not serialized against each other.
+ */
+export class OrganizationsLock extends Construct {
+  /**
+   * Returns the singleton lock of the stack.
+   */
+  public static getOrCreate(scope: Construct) {
+    const stack = Stack.of(scope);
+    const id = 'superwerker.organizations-lock';
+    return (stack.node.tryFindChild(id) as OrganizationsLock) || new OrganizationsLock(stack, id);
+  }
+
+  public readonly table: dynamodb.Table;
+
+  constructor(scope: Construct, id: string) {
+    super(scope, id);
+
+    this.table = new dynamodb.Table(this, 'Table', {
+      partitionKey: { name: 'LockName', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      // leases are only valid for seconds, there is nothing to recover
+      removalPolicy: RemovalPolicy.DESTROY,
+    });
+  }
+
+  public grant(fn: lambda.Function) {
+    this.table.grant(fn, 'dynamodb:UpdateItem');
+    fn.addEnvironment('ORGANIZATIONS_LOCK_TABLE', this.table.tableName);
+  }
+}
@@ -0,0 +1,33 @@
+import * as path from 'path';
+import { aws_s3_assets as s3assets } from 'aws-cdk-lib';
+import { Runtime } from 'aws-cdk-lib/aws-lambda';
+import { Construct } from 'constructs';
+import { botocoreDataBundling, botocoreDataCommands } from './botocore-data';
+import { compilePython } from './superwerker-python-layer';
+
+// copies the modules without tests, adds their botocore data and compiles them like the bundled functions
+const bundleCommand = [
+  'cp /asset-input/*.py /asset-output',
+  ...botocoreDataCommands('/asset-input', '/asset-output'),
+  ...compilePython.afterBundling('/asset-input', '/asset-output'),
+].join(' && ');
+
+/**
+ * Zip asset with the compiled modules of a python function in `src/functions`.
+ *
+ * For functions defined outside of this app, e.g. in a stack set template, which reference the code by bucket and key.
+ * They need the environment variables of `BOTOCORE_DATA_ENVIRONMENT`.
+ */
+export class PythonFunctionAsset extends s3assets.Asset {
+  constructor(scope: Construct, id: string, functionName: string) {
+    super(scope, id, {
+      path: path.join(__dirname, '..', 'functions', functionName),
+      exclude: ['__pycache__', 'tests', '.pytest_cache', '.venv', 'venv'],
+      bundling: {
+        image: Runtime.PYTHON_3_14.bundlingImage,
+        command: ['bash', '-c', bundleCommand],
+        volumes: botocoreDataBundling.volumes,
+      },
+    });
+  }
+}
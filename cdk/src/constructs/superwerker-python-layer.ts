@@ -0,0 +1,69 @@
+import * as path from 'path';
+import { ICommandHooks, PythonLayerVersion } from '@aws-cdk/aws-lambda-python-alpha';
+import { Stack } from 'aws-cdk-lib';
+import { Runtime } from 'aws-cdk-lib/aws-lambda';
+import { Construct } from 'constructs';
+
+/**
+ * Compiles the bundled python code at build time, the lambda runtime can not write `__pycache__` and would compile
+ * every imported module on each cold start otherwise.
+ */
+export const compilePython: ICommandHooks = {
+  beforeBundling: () => [],
+  afterBundling: (_inputDir: string, outputDir: string) => [`python -m compileall -q --invalidation-mode unchecked-hash ${outputDir}`],
+};
+
+/**
+ * Modules of the `superwerker` package run from a checkout only, the command line tools (see DEVELOPMENT.md) and the
+ * build tools of the functions. Some need packages the lambda runtime lacks, e.g. `yaml` or `numpy`, and no function
+ * imports them, so they are not part of the layer.
+ */
+export const OFFLINE_MODULES = [
+  'botocore_data',
+  'coldstart',
+  'compliance',
+  'effective_policy',
+  'inline_code',
+  'inventory',
+  'remediation',
+  'rootmail_index',
+];
+
+/**
+ * Shared python code (package `superwerker`) for the python functions in `src/functions`.
+ */
+export class SuperwerkerPythonLayer extends Construct {
+  /**
+   * Returns the singleton layer of the stack.
+   */
+  public static getOrCreate(scope: Construct) {
+    const stack = Stack.of(scope);
+    const id = 'superwerker.python-layer';
+    const layer = (stack.node.tryFindChild(id) as SuperwerkerPythonLayer) || new SuperwerkerPythonLayer(stack, id);
+    return layer.layerVersion;
+  }
+
+  public readonly layerVersion: PythonLayerVersion;
+
+  constructor(scope: Construct, id: string) {
+    super(scope, id);
+
+    this.layerVersion = new PythonLayerVersion(this, 'superwerker-python', {
+      entry: path.join(__dirname, '..', 'layers', 'superwerker-python'),
+      compatibleRuntimes: [Runtime.PYTHON_3_14],
+      description: 'superwerker shared python code',
+      bundling: {
+        assetExcludes: [
+          '__pycache__',
+          'tests',
+          '.pytest_cache',
+          '.venv',
+          'Makefile',
+          'requirements_dev.txt',
+          ...OFFLINE_MODULES.map((module) => `superwerker/${module}.py`),
+        ],
+        commandHooks: compilePython,
+      },
+    });
+  }
+}
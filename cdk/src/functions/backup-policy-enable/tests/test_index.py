@@ -1,7 +1,7 @@
 import os
 from unittest.mock import MagicMock, Mock, PropertyMock, patch
 import pytest
-from index import CREATE
+from superwerker.organizations import CREATE
 
 
 
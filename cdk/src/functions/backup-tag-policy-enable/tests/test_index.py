@@ -1,7 +1,8 @@
 import os
 from unittest.mock import MagicMock, Mock, PropertyMock, patch
 import pytest
-from index import CREATE, enable_tag_policies
+from superwerker.organizations import CREATE
+from index import enable_tag_policies
 
 
 
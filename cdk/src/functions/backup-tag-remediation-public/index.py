@@ -1,6 +1,7 @@
-import boto3
+from superwerker.lazy import lazy_client
+from superwerker.retry import throttling_back_off
 
-ssm = boto3.client("ssm")
+ssm = lazy_client("ssm")
 
 CREATE = 'Create'
 DELETE = 'Delete'
@@ -31,17 +32,17 @@ def handler(event, context):
 
 
     if RequestType == CREATE or RequestType == UPDATE:
-        ssm.modify_document_permission(
+        throttling_back_off(lambda: ssm.modify_document_permission(
             Name=DocumentName,
             PermissionType='Share',
             AccountIdsToAdd=['All']
-        )
+        ))
     elif RequestType == DELETE:
-        ssm.modify_document_permission(
+        throttling_back_off(lambda: ssm.modify_document_permission(
             Name=DocumentName,
             PermissionType='Share',
             AccountIdsToRemove=['All']
-        )
+        ))
 
     return {
         'PhysicalResourceId': id,
@@ -1,49 +1,169 @@
 import json
 import os
-from awsapilib import Billing
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from superwerker.cache import SSMParameterStore, TTLCache
+from superwerker.idempotency import idempotent
+from superwerker.lazy import lazy_import
+from superwerker.sessions import SessionPool
+
+# awsapilib and its dependencies are a third of the cold start imports, dashboard reads from the cache do not need them
+awsapilib = lazy_import('awsapilib')
 
 CREATE = 'Create'
 
+SETTINGS_KEY = 'settings'
+SETTINGS_TTL = 900
+# seconds to wait for the slowest setting, the function times out after 30
+SETTINGS_TIMEOUT = 20
 
-def handler(event, _):
-    billing = Billing(os.environ['AWSAPILIB_BILLING_ROLE_ARN'])
+# the billing console backend is slow and fragile, so the dashboard reads the settings from this cache
+settings_cache = TTLCache(SETTINGS_TTL, store=SSMParameterStore.from_environment())
+
+# the Billing objects hold the assumed role and the console login, both are reused by warm invocations
+sessions = SessionPool()
+
+
+def billing_session(reader=None):
+    """
+    Returns the Billing object of `reader`, e.g. a setting of SETTINGS. A Billing object and its console session are
+    not thread safe, so each concurrent reader has its own, and writes use the one of no reader.
+    """
+    role_arn = os.environ['AWSAPILIB_BILLING_ROLE_ARN']
+    return sessions.get((role_arn, reader), lambda: awsapilib.Billing(role_arn))
+
+
+def invalidate_billing_session(reader=None):
+    """Logs `reader` in again next time, in case its console session is the problem."""
+    sessions.invalidate((os.environ['AWSAPILIB_BILLING_ROLE_ARN'], reader))
+
+
+# every read is a separate, slow request against the billing console backend, so they run concurrently
+SETTINGS = {
+    'tax_inheritance': lambda billing: billing.tax.inheritance,
+    'pdf_invoice_by_mail': lambda billing: billing.preferences.pdf_invoice_by_mail,
+    'credit_sharing': lambda billing: billing.preferences.credit_sharing,
+}
+
+
+def read(name, read_setting):
+    return read_setting(billing_session(name))
+
+
+# Python threads can not be cancelled, so a read that timed out keeps running into the next, warm invocation.
+# The reads run on threads kept across invocations, and a read still running is waited for again instead of
+# being started once more, so there is never more than one read per setting.
+executor = ThreadPoolExecutor(max_workers=len(SETTINGS) + 1)
+reads = {}
+
+
+def start_read(name, read_setting):
+    future = reads.get(name)
+    if future is None or future.done():
+        future = reads[name] = executor.submit(read, name, read_setting)
+    return future
+
+
+def results(futures, deadline):
+    """
+    Returns the result of each future done by `deadline`, None for the ones that failed or timed out, whose readers log
+    in again next time.
+    """
+    done, _ = wait(futures.values(), timeout=max(0, deadline - time.monotonic()))
+    values = {}
+    for name, future in futures.items():
+        if future in done and future.exception() is None:
+            values[name] = future.result()
+        else:
+            print('Reading {} failed: {}'.format(name, future.exception() if future in done else 'timeout'))
+            invalidate_billing_session(name)
+            values[name] = None
+    return values
+
+
+def read_settings():
+    # the iam_access check counts against the same deadline, it is a console request like the others
+    deadline = time.monotonic() + SETTINGS_TIMEOUT
+    settings = results({'iam_access': start_read('iam_access', lambda billing: billing.iam_access)}, deadline)
+    if settings['iam_access'] is False:
+        return settings
 
+    if settings['iam_access']:
+        settings.update(results({name: start_read(name, read_setting) for name, read_setting in SETTINGS.items()}, deadline))
+    else:
+        settings.update({name: None for name in SETTINGS})
+    return settings
+
+
+def complete(settings):
+    return None not in settings.values()
+
+
+def render(value):
+    return 'unknown, the billing console did not answer' if value is None else '{} &#10004;'.format(value)
+
+
+def enable_tax_inheritance(billing):
+    print('Enabling Tax Inheritance...')
+    billing.tax.inheritance = True
+
+
+def enable_preferences(billing):
+    print('Enabling PDF invoices delivery by email...')
+    billing.preferences.pdf_invoice_by_mail = True
+
+    print('Enabling Credit Sharing...')
+    billing.preferences.credit_sharing = True
+
+
+# a retried Create would run the slow console automation again, dashboard requests are passed through
+@idempotent()
+def handler(event, _):
     if 'RequestType' in event.keys() and event["RequestType"] == CREATE:
 
         # custom cloudformation resource: on create configure billing settings
 
+        billing = billing_session()
+
         print('Configuring billing relevant settings...')
 
         if not billing.iam_access:
             print('No IAM access to billing, this lambda does not have sufficient permissions.')
             return {}
         else:
-            print('Enabling Tax Inheritance...')
-            billing.tax.inheritance = True
-
-            print('Enabling PDF invoices delivery by email...')
-            billing.preferences.pdf_invoice_by_mail = True
-
-            print('Enabling Credit Sharing...')
-            billing.preferences.credit_sharing = True
+            # all writes use the one Billing object, which is not thread safe, so they run one after the other
+            try:
+                enable_tax_inheritance(billing)
+                enable_preferences(billing)
+            except Exception:
+                invalidate_billing_session()
+                raise
 
+            try:
+                settings_cache.invalidate(SETTINGS_KEY)
+            except Exception as e:
+                # billing is configured, the dashboard shows the old settings until they expire
+                print('Invalidating the cached settings failed: {}'.format(e))
             return {}
 
     else:
 
         # return current settings and recommentations for display on cloudwatch dashboard
 
-        if not billing.iam_access:
+        settings = settings_cache.get(SETTINGS_KEY, read_settings, cache_if=complete)
+
+        # None if the check did not answer in time, the settings are rendered as unknown then
+        if settings['iam_access'] is False:
             return '<p>Error: Not sufficient permissions to access billing information. Please activate <a href="https://docs.aws.amazon.com/IAM/latest/UserGuide/tutorial_billing.html#tutorial-billing-activate">IAM Access for billing</a> (requires root user).</p>'
         else:
-            
+
             return f'''<ul><li>Recommended settings for billing:</li>
 <li>Add your VAT/Tax registration number in <a href="https://us-east-1.console.aws.amazon.com/billing/home?region=us-east-1#/tax-settings">Tax settings</a>.</li>
 <li>Set your preferred currency for your <a href="https://us-east-1.console.aws.amazon.com/billing/home?region=us-east-1#/paymentpreferences/paymentmethods">default payment method</a>.</li>
 <li>Set security and operational contacts in <a href="https://us-east-1.console.aws.amazon.com/billing/home#/account">alternate contacts section</a>.</li>
-<li>Tax inheritance: {billing.tax.inheritance} &#10004;</li>
-<li>PDF invoices by email: {billing.preferences.pdf_invoice_by_mail} &#10004;</li>
-<li>Credit sharing: {billing.preferences.credit_sharing} &#10004;</li></ul>'''
+<li>Tax inheritance: {render(settings['tax_inheritance'])}</li>
+<li>PDF invoices by email: {render(settings['pdf_invoice_by_mail'])}</li>
+<li>Credit sharing: {render(settings['credit_sharing'])}</li></ul>'''
+
 
-    
 
@@ -1,17 +1,26 @@
 import os
+import threading
 from unittest.mock import MagicMock, Mock, PropertyMock, patch
 import pytest
-from index import CREATE, handler
+from index import CREATE, SETTINGS, handler, invalidate_billing_session, sessions, settings_cache
 
 
+@pytest.fixture(autouse=True)
+def empty_settings_cache():
+    os.environ['AWSAPILIB_BILLING_ROLE_ARN'] = 'apilib-role'
+    settings_cache.invalidate()
+    for reader in [None, 'iam_access', *SETTINGS]:
+        invalidate_billing_session(reader)
+    yield
+
 
 def test_billing_features_enabled():
 
     os.environ['AWSAPILIB_BILLING_ROLE_ARN'] = 'apilib-role'
 
-    with patch('index.Billing') as billing:
-        with patch('index.Billing.Tax') as tax:
-            with patch('index.Billing.Preferences') as preferences:
+    with patch('index.awsapilib.Billing') as billing:
+        with patch('index.awsapilib.Billing.Tax') as tax:
+            with patch('index.awsapilib.Billing.Preferences') as preferences:
                 iam_access_mock = PropertyMock(return_value=True)
                 tax_mock = PropertyMock(return_value=tax)
                 preferences_mock = PropertyMock(return_value=preferences)
@@ -33,13 +42,14 @@ def test_billing_features_enabled():
                 pdf_invoice_by_mail_mock.assert_called_once_with(True)
                 credit_sharing_mock.assert_called_once_with(True)
 
+
 def test_iam_access_disabled():
 
     os.environ['AWSAPILIB_BILLING_ROLE_ARN'] = 'apilib-role'
 
-    with patch('index.Billing') as billing:
-        with patch('index.Billing.Tax') as tax:
-            with patch('index.Billing.Preferences') as preferences:
+    with patch('index.awsapilib.Billing') as billing:
+        with patch('index.awsapilib.Billing.Tax') as tax:
+            with patch('index.awsapilib.Billing.Preferences') as preferences:
                 iam_access_mock = PropertyMock(return_value=False)
                 tax_mock = PropertyMock(return_value=tax)
                 preferences_mock = PropertyMock(return_value=preferences)
@@ -59,4 +69,125 @@ def test_iam_access_disabled():
                 iam_access_mock.assert_called_once()
                 tax_inheritance_mock.assert_not_called()
                 pdf_invoice_by_mail_mock.assert_not_called()
-                credit_sharing_mock.assert_not_called()
\ No newline at end of file
+                credit_sharing_mock.assert_not_called()
+
+
+def test_dashboard_reads_settings_once_within_ttl():
+
+    os.environ['AWSAPILIB_BILLING_ROLE_ARN'] = 'apilib-role'
+
+    with patch('index.awsapilib.Billing') as billing:
+        type(billing.return_value).iam_access = PropertyMock(return_value=True)
+        billing.return_value.tax.inheritance = True
+        billing.return_value.preferences.pdf_invoice_by_mail = True
+        billing.return_value.preferences.credit_sharing = False
+
+        first = handler({}, {})
+        second = handler({}, {})
+
+        # one console session per concurrent reader
+        assert billing.call_count == 4
+        assert first == second
+        assert '<li>Credit sharing: False &#10004;</li>' in first
+
+
+def test_create_invalidates_cached_settings():
+
+    os.environ['AWSAPILIB_BILLING_ROLE_ARN'] = 'apilib-role'
+
+    with patch('index.awsapilib.Billing') as billing:
+        iam_access_mock = PropertyMock(return_value=True)
+        type(billing.return_value).iam_access = iam_access_mock
+
+        handler({}, {})
+        handler({'RequestType': CREATE}, {})
+        handler({}, {})
+
+        # the readers and the writer keep their console sessions
+        assert billing.call_count == 5
+        assert iam_access_mock.call_count == 3
+
+
+def test_dashboard_renders_partial_settings_without_caching_them():
+
+    os.environ['AWSAPILIB_BILLING_ROLE_ARN'] = 'apilib-role'
+
+    with patch('index.awsapilib.Billing') as billing:
+        type(billing.return_value).iam_access = PropertyMock(return_value=True)
+        billing.return_value.tax.inheritance = True
+        billing.return_value.preferences.pdf_invoice_by_mail = True
+        type(billing.return_value.preferences).credit_sharing = PropertyMock(side_effect=Exception('billing console down'))
+
+        first = handler({}, {})
+        handler({}, {})
+
+        assert '<li>Tax inheritance: True &#10004;</li>' in first
+        assert '<li>Credit sharing: unknown, the billing console did not answer</li>' in first
+        # only the reader of credit sharing logs in again
+        assert billing.call_count == 5
+
+
+def test_create_succeeds_when_the_cache_can_not_be_invalidated():
+    with patch('index.awsapilib.Billing'), patch.object(settings_cache, 'invalidate', side_effect=Exception('parameter store down')):
+        assert handler({'RequestType': CREATE}, {}) == {}
+
+
+def test_timed_out_read_is_not_started_again_while_running():
+
+    os.environ['AWSAPILIB_BILLING_ROLE_ARN'] = 'apilib-role'
+    answered = threading.Event()
+    credit_sharing_mock = PropertyMock(side_effect=lambda: answered.wait(5))
+
+    with patch('index.awsapilib.Billing') as billing, patch('index.SETTINGS_TIMEOUT', 0.1):
+        type(billing.return_value).iam_access = PropertyMock(return_value=True)
+        type(billing.return_value.preferences).credit_sharing = credit_sharing_mock
+
+        first = handler({}, {})
+        handler({}, {})
+        answered.set()
+
+        assert '<li>Credit sharing: unknown, the billing console did not answer</li>' in first
+        credit_sharing_mock.assert_called_once()
+
+
+def test_iam_access_check_counts_against_the_timeout():
+
+    os.environ['AWSAPILIB_BILLING_ROLE_ARN'] = 'apilib-role'
+    answered = threading.Event()
+
+    with patch('index.awsapilib.Billing') as billing, patch('index.SETTINGS_TIMEOUT', 0.1):
+        type(billing.return_value).iam_access = PropertyMock(side_effect=lambda: answered.wait(5))
+
+        page = handler({}, {})
+        answered.set()
+
+        assert '<li>Tax inheritance: unknown, the billing console did not answer</li>' in page
+
+
+def test_billing_session_is_reused_until_it_expires():
+
+    os.environ['AWSAPILIB_BILLING_ROLE_ARN'] = 'apilib-role'
+
+    with patch('index.awsapilib.Billing') as billing, patch.object(sessions, 'clock', return_value=1000) as clock:
+        handler({'RequestType': CREATE}, {})
+        handler({'RequestType': CREATE}, {})
+        billing.assert_called_once()
+
+        clock.return_value += 3000
+        handler({'RequestType': CREATE}, {})
+        assert billing.call_count == 2
+
+
+def test_retried_create_returns_earlier_result():
+    os.environ['AWSAPILIB_BILLING_ROLE_ARN'] = 'apilib-role'
+    event = {'RequestType': CREATE, 'StackId': 'stack', 'LogicalResourceId': 'BillingSetup', 'RequestId': 'retried-create'}
+
+    with patch('index.awsapilib.Billing') as billing:
+        type(billing.return_value).iam_access = PropertyMock(return_value=True)
+        tax_inheritance_mock = PropertyMock()
+        type(billing.return_value.tax).inheritance = tax_inheritance_mock
+
+        assert handler(event, {}) == {}
+        assert handler(dict(event), {}) == {}
+
+        tax_inheritance_mock.assert_called_once_with(True)
@@ -1,7 +1,11 @@
 default: test
 
+# shared python code deployed as lambda layer, see src/layers/superwerker-python
+SUPERWERKER_PYTHON := $(abspath $(dir $(lastword $(MAKEFILE_LIST)))../layers/superwerker-python)
+
 .PHONY: test
 test: export VIRTUAL_ENV=$(VENV)
+test: export PYTHONPATH=$(SUPERWERKER_PYTHON)
 test: activate test-dependencies
 	$(PYTHON) -m pytest ./tests
 
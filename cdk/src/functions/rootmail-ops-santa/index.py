@@ -0,0 +1,778 @@
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from email import policy
+from email.feedparser import BytesFeedParser
+from email.parser import BytesHeaderParser
+import hashlib
+import json
+import os
+import re
+import datetime
+import threading
+import time
+
+# the settings of superwerker.clients, this module is also inline code of templates/rootmail.yaml and can not use the layer
+config = Config(retries={'mode': 'adaptive', 'max_attempts': 5}, max_pool_connections=16, tcp_keepalive=True, connect_timeout=5, read_timeout=60)
+
+s3 = boto3.client('s3', config=config)
+# the function runs where SES receives the mails, ops items are created in the superwerker region
+ssm = boto3.client('ssm', region_name=os.environ.get('OPS_ITEM_REGION'), config=config)
+
+PASSWORD_ASSISTANCE = 'Amazon Web Services Password Assistance'
+
+filtered_email_subjects = [
+    'Your AWS Account is Ready - Get Started Now',
+    'Welcome to Amazon Web Services',
+]
+
+# only the start of a mail is read, its headers and text come first and what is beyond this is attachments
+MAX_MAIL_BYTES = 512 * 1024
+CHUNK_SIZE = 64 * 1024
+# every mail gets an entry below this prefix of the bucket, see index_mail, which compact_index merges into manifests
+# once its day is over, see superwerker.rootmail_index for the layout
+INDEX_PREFIX = 'RootMailIndex/'
+INDEX_MAILS = INDEX_PREFIX + 'mails/'
+INDEX_DAY = INDEX_PREFIX + 'day={}.ndjson'
+INDEX_RECIPIENT = INDEX_PREFIX + 'recipient={}/{}.ndjson'
+# mails whose entry could not be written are counted in this metric of the function
+METRIC_NAMESPACE = 'superwerker'
+INDEX_FAILURES_METRIC = 'RootMailIndexFailures'
+# longest title and description of an ops item, see create_ops_item
+MAX_TEXT_LENGTH = 1020
+# ops items need a title and a description, e.g. for mails without a subject or whose text is beyond MAX_MAIL_BYTES
+NO_SUBJECT = '(no subject)'
+NO_TEXT = 'The text of this mail could not be read, see {}'
+
+# records are processed concurrently, at most one S3 and one SSM connection each, see max_pool_connections
+MAX_WORKERS = 16
+
+# mails with the same fingerprint within a window, e.g. a notice AWS sends to the root mail of every account, are folded
+# into the ops item of the first one instead of creating one each
+FOLD_WINDOW_SECONDS = 6 * 3600
+# how long folded mails wait for the first one of another invocation to create its ops item
+FOLD_WAIT_SECONDS = 10
+# how long the mail creating the ops item of a fingerprint holds it, longer than the function runs, see claim
+CLAIM_LEASE_SECONDS = 120
+# statuses of ops items mails are still folded into, a notice after its ops item was resolved gets a new one
+OPEN_OPS_ITEM_STATUSES = ('Open', 'InProgress')
+# recipients listed in an ops item, its count includes all
+MAX_LISTED_RECIPIENTS = 100
+COUNT_KEY = '/superwerker/rootmail/count'
+RECIPIENTS_KEY = '/superwerker/rootmail/recipients'
+
+ADDRESSES = re.compile(r'\S+@\S+')
+NUMBERS = re.compile(r'\d+')
+WHITESPACE = re.compile(r'\s+')
+
+CREATED = 'created'
+FAILED = 'failed'
+FILTERED = 'filtered'
+FOLDED = 'folded'
+PASSWORD_RESET = 'password_reset'
+VERDICT_FAILED = 'verdict_failed'
+
+
+class RecordsFailed(Exception):
+    def __init__(self, outcomes):
+        super().__init__('{} of {} records failed'.format(len([o for o in outcomes if o['outcome'] == FAILED]), len(outcomes)))
+        self.outcomes = outcomes
+
+
+class InMemoryFoldStore:
+    """Local stand-in for DynamoDBFoldStore, e.g. in tests, folds only the mails of one execution environment."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key, message_id, recipient, expires_at, now):
+        with self._lock:
+            self._items = {k: v for k, v in self._items.items() if v['ExpiresAt'] > self.clock()}
+            item = self._items.get(key)
+            if item is not None and (item['OpsItemId'] is not None or (item['Claimer'] != message_id and item['ClaimExpiresAt'] >= now)):
+                return False
+            if item is None:
+                item = {'ExpiresAt': expires_at, 'OpsItemId': None, 'MessageIds': set(), 'Recipients': set(), 'Reported': 0}
+                self._items[key] = item
+            item.update(Claimer=message_id, ClaimExpiresAt=now + CLAIM_LEASE_SECONDS)
+            item['MessageIds'].add(message_id)
+            item['Recipients'].add(recipient)
+            return True
+
+    def set_ops_item(self, key, ops_item_id):
+        with self._lock:
+            self._items[key]['OpsItemId'] = ops_item_id
+
+    def reopen(self, key, closed_ops_item_id, message_id, recipient, now):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item['OpsItemId'] != closed_ops_item_id:
+                return False
+            item.update(
+                OpsItemId=None, Claimer=message_id, ClaimExpiresAt=now + CLAIM_LEASE_SECONDS, MessageIds={message_id},
+                Recipients={recipient}, Reported=0,
+            )
+            return True
+
+    def release(self, key, message_id):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item['OpsItemId'] is None and item['Claimer'] == message_id:
+                item['ClaimExpiresAt'] = 0
+
+    def fold(self, key, message_id, recipient):
+        with self._lock:
+            self._items[key]['MessageIds'].add(message_id)
+            self._items[key]['Recipients'].add(recipient)
+
+    def report(self, key, ops_item_id, count):
+        with self._lock:
+            if self._items[key]['OpsItemId'] != ops_item_id or self._items[key]['Reported'] >= count:
+                return False
+            self._items[key]['Reported'] = count
+            return True
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            return None if item is None else dict(item, MessageIds=set(item['MessageIds']), Recipients=set(item['Recipients']))
+
+
+class DynamoDBFoldStore:
+    """
+    Keeps the folded mails in a table with partition key `Fingerprint`, shared by all execution environments.
+
+    Message ids and recipients are sets, so a retried mail is not counted twice. The mail creating the ops item claims
+    the fingerprint for CLAIM_LEASE_SECONDS, its retry or, once the claim expired, any other mail can claim it again
+    as long as there is no ops item. Once the ops item is resolved, the next mail claims the fingerprint anew.
+    """
+
+    def __init__(self, table_name, client):
+        self.table_name = table_name
+        self.client = client
+
+    def claim(self, key, message_id, recipient, expires_at, now):
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key={'Fingerprint': {'S': key}},
+                UpdateExpression=(
+                    'SET Claimer = :message_id, ClaimExpiresAt = :lease, ExpiresAt = if_not_exists(ExpiresAt, :expires_at) '
+                    'ADD MessageIds :message_ids, Recipients :recipients'
+                ),
+                ConditionExpression=(
+                    'attribute_not_exists(Fingerprint) OR '
+                    '(attribute_not_exists(OpsItemId) AND (Claimer = :message_id OR ClaimExpiresAt < :now))'
+                ),
+                ExpressionAttributeValues={
+                    ':message_id': {'S': message_id},
+                    ':lease': {'N': str(int(now + CLAIM_LEASE_SECONDS))},
+                    ':expires_at': {'N': str(int(expires_at))},
+                    ':now': {'N': str(int(now))},
+                    ':message_ids': {'SS': [message_id]},
+                    ':recipients': {'SS': [recipient]},
+                },
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def set_ops_item(self, key, ops_item_id):
+        self.client.update_item(
+            TableName=self.table_name,
+            Key={'Fingerprint': {'S': key}},
+            UpdateExpression='SET OpsItemId = :id',
+            ExpressionAttributeValues={':id': {'S': ops_item_id}},
+        )
+
+    def reopen(self, key, closed_ops_item_id, message_id, recipient, now):
+        """Claims the fingerprint for a new ops item, unless another mail did since `closed_ops_item_id` was closed."""
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key={'Fingerprint': {'S': key}},
+                UpdateExpression=(
+                    'SET Claimer = :message_id, ClaimExpiresAt = :lease, MessageIds = :message_ids, Recipients = :recipients '
+                    'REMOVE OpsItemId, Reported'
+                ),
+                ConditionExpression='OpsItemId = :closed',
+                ExpressionAttributeValues={
+                    ':closed': {'S': closed_ops_item_id},
+                    ':message_id': {'S': message_id},
+                    ':lease': {'N': str(int(now + CLAIM_LEASE_SECONDS))},
+                    ':message_ids': {'SS': [message_id]},
+                    ':recipients': {'SS': [recipient]},
+                },
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def release(self, key, message_id):
+        """Ends the claim of `message_id` early, the mails folded so far stay."""
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key={'Fingerprint': {'S': key}},
+                UpdateExpression='SET ClaimExpiresAt = :expired',
+                ConditionExpression='attribute_not_exists(OpsItemId) AND Claimer = :message_id',
+                ExpressionAttributeValues={':expired': {'N': '0'}, ':message_id': {'S': message_id}},
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+    def fold(self, key, message_id, recipient):
+        self.client.update_item(
+            TableName=self.table_name,
+            Key={'Fingerprint': {'S': key}},
+            UpdateExpression='ADD MessageIds :message_id, Recipients :recipient',
+            ExpressionAttributeValues={':message_id': {'SS': [message_id]}, ':recipient': {'SS': [recipient]}},
+        )
+
+    def report(self, key, ops_item_id, count):
+        """
+        Records that ops item `ops_item_id` shows `count` mails, returns False if it already shows as many or more, or the
+        fingerprint has another ops item by now.
+        """
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key={'Fingerprint': {'S': key}},
+                UpdateExpression='SET Reported = :count',
+                ConditionExpression='OpsItemId = :id AND (attribute_not_exists(Reported) OR Reported < :count)',
+                ExpressionAttributeValues={':id': {'S': ops_item_id}, ':count': {'N': str(count)}},
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def get(self, key):
+        item = self.client.get_item(TableName=self.table_name, Key={'Fingerprint': {'S': key}}, ConsistentRead=True).get('Item')
+        if item is None:
+            return None
+        return {
+            'ExpiresAt': int(item['ExpiresAt']['N']),
+            'OpsItemId': item.get('OpsItemId', {}).get('S'),
+            'MessageIds': set(item.get('MessageIds', {}).get('SS', [])),
+            'Recipients': set(item.get('Recipients', {}).get('SS', [])),
+            'Reported': int(item.get('Reported', {}).get('N', 0)),
+        }
+
+
+# without the table of the stack set, e.g. in templates/rootmail.yaml, each execution environment folds on its own
+if os.environ.get('FOLD_TABLE'):
+    fold_store = DynamoDBFoldStore(os.environ['FOLD_TABLE'], boto3.client('dynamodb', config=config))
+else:
+    fold_store = InMemoryFoldStore()
+
+
+def handler(event, context):
+
+    log({
+        'event': event,
+        'level': 'debug',
+    })
+
+    if event.get('source') == 'aws.events':
+        # the daily schedule of the stack set, see OpsSantaIndexCompaction
+        return compact_index()
+
+    records = event['Records']
+    folded = set()
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(records)))) as executor:
+        outcomes = list(executor.map(lambda record: process_isolated(record, folded), records))
+
+    log({
+        'level': 'info',
+        'msg': 'processed mails',
+        'outcomes': outcomes,
+    })
+
+    # one update per ops item and invocation, however many of its mails the invocation has
+    failed_updates = []
+    for key in sorted(folded):
+        try:
+            update_folded(key)
+        except Exception as e:
+            log({
+                'error': repr(e),
+                'fingerprint': key,
+                'level': 'error',
+                'msg': 'updating folded ops item failed',
+            })
+            failed_updates.append(key)
+
+    if any(o['outcome'] == FAILED for o in outcomes):
+        # the invocation is retried, records already done are not duplicated, ops items are deduplicated by message id
+        # and folded mails by their fingerprint
+        raise RecordsFailed(outcomes)
+    if failed_updates:
+        # the retry folds the mails again and updates the ops items with their counts
+        raise Exception('updating the ops items of {} of {} fingerprints failed'.format(len(failed_updates), len(folded)))
+
+    return outcomes
+
+
+def process_isolated(record, folded):
+    """Returns the outcome of `record`, a failing record does not affect the others."""
+    id = None
+    try:
+        ses = record['ses']
+        id = ses['mail']['messageId']
+        return {'id': id, 'outcome': process(ses, folded)}
+    except Exception as e:
+        log({
+            'error': repr(e),
+            'id': id,
+            'level': 'error',
+            'msg': 'processing mail failed',
+        })
+        return {'id': id, 'outcome': FAILED, 'error': repr(e)}
+
+
+def process(ses, folded=None):
+    """Returns the outcome of the mail, adds the fingerprint of folded mails to `folded`."""
+
+    id = ses['mail']['messageId']
+    key = 'RootMail/{key}'.format(key=id)
+    receipt = ses['receipt']
+
+    log({
+        'id': id,
+        'level': 'debug',
+        'key': key,
+        'msg': 'processing mail',
+    })
+
+    verdicts = {
+        'dkim': receipt['dkimVerdict']['status'],
+        'spam': receipt['spamVerdict']['status'],
+        'spf': receipt['spfVerdict']['status'],
+        'virus': receipt['virusVerdict']['status'],
+    }
+
+    for k, v in verdicts.items():
+
+        if not v == 'PASS':
+
+            log({
+                'class': k,
+                'id': id,
+                'key': key,
+                'level': 'warn',
+                'msg': 'verdict failed - ops santa item skipped',
+            })
+
+            index_mail(ses, verdicts)
+
+            return VERDICT_FAILED
+
+    msg, size = read_mail(key)
+
+    title = msg["subject"]
+
+    index_mail(ses, verdicts, size, title)
+
+    title = title or ses['mail'].get('commonHeaders', {}).get('subject') or NO_SUBJECT
+
+    source = ses["mail"]["destination"][0]
+
+    if title == PASSWORD_ASSISTANCE:
+        description = text(msg.get_body('html'))
+        pw_reset_link = re.search(r'(https://signin.aws.amazon.com/resetpassword(.*?))(?=<br>)', description).group()
+        rootmail_identifier = '/superwerker/rootmail/pw_reset_link/{}'.format(source.split('@')[0].split('root+')[1])
+        ssm.put_parameter(
+            Name=rootmail_identifier,
+            Value=pw_reset_link,
+            Overwrite=True,
+            Type='String',
+            Tier='Advanced',
+            Policies=json.dumps([
+                {
+                    "Type": "Expiration",
+                    "Version": "1.0",
+                    "Attributes": {
+                        "Timestamp": (datetime.datetime.now() + datetime.timedelta(minutes=10)).strftime('%Y-%m-%dT%H:%M:%SZ')  # expire in 10 minutes
+                    }
+                }
+            ])
+        )
+        return PASSWORD_RESET  # no ops item for now
+
+    if title in filtered_email_subjects:
+        log({
+            'level': 'info',
+            'msg': 'filtered email',
+            'title': title,
+        })
+        return FILTERED
+
+    description = text(msg.get_body(preferencelist=('plain', 'html')), MAX_TEXT_LENGTH + 1)
+    if not description.strip():
+        description = NO_TEXT.format('s3://{}/{}'.format(os.environ['EMAIL_BUCKET'], key))
+
+    title = title[:MAX_TEXT_LENGTH] + " ..." * (len(title) > MAX_TEXT_LENGTH)
+
+    description = description[:MAX_TEXT_LENGTH] + " ..." * (len(description) > MAX_TEXT_LENGTH)
+
+    source = source[:60] + ' ...' * (len(source) > 60)
+
+    # the window is the one of the time SES received the mail, so a retry hours later folds into the same ops item
+    received = received_at(ses['mail'])
+    fingerprint_key = '{}-{}'.format(fingerprint(title, description), int(received // FOLD_WINDOW_SECONDS))
+    expires_at = max(received, time.time()) + 2 * FOLD_WINDOW_SECONDS
+    while not fold_store.claim(fingerprint_key, id, source, expires_at, time.time()):
+        item = fold_store.get(fingerprint_key)
+        if item is None:
+            # expired since the claim, claim it anew
+            continue
+        if item['OpsItemId'] is None or ops_item_open(item['OpsItemId']):
+            fold_store.fold(fingerprint_key, id, source)
+            if folded is not None:
+                folded.add(fingerprint_key)
+            return FOLDED
+        # nobody looks at the resolved ops item anymore, this mail creates a new one, unless another mail already does
+        if fold_store.reopen(fingerprint_key, item['OpsItemId'], id, source, time.time()):
+            break
+
+    operational_data = {
+        "/aws/dedup": {
+            "Value": json.dumps(
+                {
+                    "dedupString": id,
+                }
+            ),
+            "Type": "SearchableString",
+        },
+        "/aws/resources": {
+            "Value": json.dumps([
+                {
+                    "arn": "{}/{}".format(os.environ['EMAIL_BUCKET_ARN'], key),
+                }
+            ]),
+            "Type": "SearchableString",
+        },
+        COUNT_KEY: {
+            "Value": "1",
+            "Type": "SearchableString",
+        },
+        RECIPIENTS_KEY: {
+            "Value": json.dumps([source]),
+            "Type": "SearchableString",
+        },
+    }
+
+    try:
+        ops_item = ssm.create_ops_item(
+            Description=description,
+            OperationalData=operational_data,
+            Source=source,
+            Title=title,
+        )
+    except Exception:
+        # the retry of this mail, or of one folded meanwhile, claims the fingerprint again
+        fold_store.release(fingerprint_key, id)
+        raise
+    fold_store.set_ops_item(fingerprint_key, ops_item['OpsItemId'])
+    return CREATED
+
+
+def ops_item_open(ops_item_id):
+    return ssm.get_ops_item(OpsItemId=ops_item_id)['OpsItem']['Status'] in OPEN_OPS_ITEM_STATUSES
+
+
+def received_at(mail):
+    """Returns the time SES received `mail` in seconds since the epoch, now if the notification has none."""
+    if not mail.get('timestamp'):
+        return time.time()
+    return datetime.datetime.fromisoformat(mail['timestamp'].replace('Z', '+00:00')).timestamp()
+
+
+def fingerprint(title, description):
+    """
+    Returns the hash of title and description with addresses and numbers masked and whitespace collapsed, so a notice
+    is the same for every account it is sent to, whatever account id, root mail address or date it mentions.
+    """
+    normalized = '{}\n{}'.format(title, description).lower()
+    normalized = ADDRESSES.sub('@', normalized)
+    normalized = NUMBERS.sub('0', normalized)
+    normalized = WHITESPACE.sub(' ', normalized).strip()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def update_folded(key):
+    """
+    Sets count and recipients of the ops item of the mails with fingerprint `key`, from all mails folded so far.
+
+    Invocations folding mails of the same fingerprint update the ops item concurrently. Only an invocation with more
+    mails than reported so far writes, and writes again if another one reported more meanwhile, so a count read before
+    does not overwrite a higher one.
+    """
+    item = fold_store.get(key)
+    deadline = time.time() + FOLD_WAIT_SECONDS
+    while item is None or item['OpsItemId'] is None:
+        if time.time() > deadline:
+            # the first mail failed or is still being processed, the retry of this invocation folds the mails again
+            raise Exception('ops item of {} not created yet'.format(key))
+        time.sleep(1)
+        item = fold_store.get(key)
+
+    if not fold_store.report(key, item['OpsItemId'], len(item['MessageIds'])):
+        return
+    while True:
+        ssm.update_ops_item(
+            OpsItemId=item['OpsItemId'],
+            OperationalData={
+                COUNT_KEY: {
+                    "Value": str(len(item['MessageIds'])),
+                    "Type": "SearchableString",
+                },
+                RECIPIENTS_KEY: {
+                    "Value": json.dumps(sorted(item['Recipients'])[:MAX_LISTED_RECIPIENTS]),
+                    "Type": "SearchableString",
+                },
+            },
+        )
+        log({
+            'count': len(item['MessageIds']),
+            'level': 'info',
+            'msg': 'folded mails into ops item',
+            'ops_item_id': item['OpsItemId'],
+        })
+        latest = fold_store.get(key)
+        if latest is None or latest['OpsItemId'] != item['OpsItemId'] or latest['Reported'] <= len(item['MessageIds']):
+            return
+        # another invocation reported more mails while this one wrote, its write may have come first
+        item = latest
+
+
+def read_mail(key):
+    """
+    Returns the mail parsed from its first MAX_MAIL_BYTES, fed to the parser chunk by chunk as they arrive, and its size.
+
+    Reading stops once the text process() needs is complete, see body_complete. Memory stays the same however big the
+    mail is, parts cut off at the limit or after the text, i.e. attachments, are incomplete.
+    """
+    try:
+        response = s3.get_object(
+            Bucket=os.environ['EMAIL_BUCKET'],
+            Key=key,
+            Range='bytes=0-{}'.format(MAX_MAIL_BYTES - 1),
+        )
+    except ClientError as e:
+        # S3 answers a range of an empty object with 416
+        if e.response['Error']['Code'] != 'InvalidRange':
+            raise
+        return parse_mail([]), 0
+    body = response['Body']
+    try:
+        msg = parse_mail(body.iter_chunks(CHUNK_SIZE), until=body_complete)
+    finally:
+        body.close()
+    # e.g. `bytes 0-524287/1048576`, the length is the one of the range
+    size = int(response['ContentRange'].split('/')[1]) if response.get('ContentRange') else response.get('ContentLength')
+    return msg, size
+
+
+def index_mail(ses, verdicts, size=None, subject=None):
+    """
+    Writes the entry of the mail to the index in the bucket, see superwerker.rootmail_index for its layout and queries.
+
+    The index is secondary, a failing write does not fail the mail, it is logged and counted in the
+    RootMailIndexFailures metric. Retries overwrite the same entry.
+    """
+    mail = ses['mail']
+    local_part = mail['destination'][0].split('@')[0]
+    date = mail.get('timestamp') or datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    entry = {
+        'messageId': mail['messageId'],
+        'recipient': local_part.split('+', 1)[1] if '+' in local_part else local_part,
+        'subject': subject if subject is not None else mail.get('commonHeaders', {}).get('subject'),
+        'date': date,
+        'verdicts': verdicts,
+        'size': size,
+    }
+    try:
+        s3.put_object(
+            Bucket=os.environ['EMAIL_BUCKET'],
+            Key='{}{}/{}.json'.format(INDEX_MAILS, date[:10], entry['messageId']),
+            Body=(json.dumps(entry) + '\n').encode(),
+            ContentType='application/x-ndjson',
+        )
+    except Exception as e:
+        log({
+            'error': repr(e),
+            'id': entry['messageId'],
+            'level': 'warn',
+            'msg': 'indexing mail failed',
+        })
+        count_metric(INDEX_FAILURES_METRIC)
+
+
+def compact_index(today=None):
+    """
+    Merges the entries of the mails of the days before `today` into the manifest of their day and the monthly ones of
+    their recipients, and deletes them. Returns the days compacted.
+
+    Entries written after their day was compacted, e.g. by a retried mail, are merged the next time. Merging is
+    keyed on the message id, so running again after a failure does not duplicate entries.
+    """
+    bucket = os.environ['EMAIL_BUCKET']
+    today = today or datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d')
+    days = {}
+    # keys sort by day, the listing stops at the first entry of today
+    for key in list_keys(bucket, INDEX_MAILS):
+        day = key[len(INDEX_MAILS):len(INDEX_MAILS) + 10]
+        if day >= today:
+            break
+        days.setdefault(day, []).append(key)
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for day, keys in sorted(days.items()):
+            entries = [entry for entries in executor.map(read_entries, keys) for entry in entries]
+            merge_manifest(INDEX_DAY.format(day), entries)
+            recipients = {}
+            for entry in entries:
+                recipients.setdefault(entry['recipient'], []).append(entry)
+            for recipient, recipient_entries in sorted(recipients.items()):
+                merge_manifest(INDEX_RECIPIENT.format(recipient, day[:7]), recipient_entries)
+            for i in range(0, len(keys), 1000):
+                objects = [{'Key': key} for key in keys[i:i + 1000]]
+                response = s3.delete_objects(Bucket=bucket, Delete={'Objects': objects, 'Quiet': True})
+                if response.get('Errors'):
+                    raise Exception('deleting compacted index entries failed: {}'.format(response['Errors']))
+            log({
+                'day': day,
+                'entries': len(entries),
+                'level': 'info',
+                'msg': 'compacted index',
+            })
+    return sorted(days)
+
+
+def list_keys(bucket, prefix):
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            yield obj['Key']
+
+
+def read_entries(key):
+    """Returns the entries of the NDJSON object `key`, none if it does not exist."""
+    try:
+        body = s3.get_object(Bucket=os.environ['EMAIL_BUCKET'], Key=key)['Body']
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'NoSuchKey':
+            return []
+        raise
+    return [json.loads(line) for line in body.read().decode().splitlines() if line.strip()]
+
+
+def merge_manifest(key, entries):
+    """Adds `entries` to the NDJSON manifest `key`, replacing the ones with the same message id."""
+    merged = {entry['messageId']: entry for entry in read_entries(key)}
+    merged.update((entry['messageId'], entry) for entry in entries)
+    s3.put_object(
+        Bucket=os.environ['EMAIL_BUCKET'],
+        Key=key,
+        Body=''.join(json.dumps(entry) + '\n' for entry in sorted(merged.values(), key=lambda e: (e['date'], e['messageId']))).encode(),
+        ContentType='application/x-ndjson',
+    )
+
+
+def parse_mail(chunks, until=None):
+    """Returns the mail parsed from `chunks`, stops feeding them once `until` is true for the bytes fed so far."""
+    parser = BytesFeedParser(policy=policy.default)
+    data = bytearray()
+    for chunk in chunks:
+        parser.feed(chunk)
+        if until is not None:
+            data += chunk
+            if until(data):
+                break
+    return parser.close()
+
+
+HEADERS_END = re.compile(rb'\r?\n\r?\n')
+
+
+def body_complete(data):
+    """
+    Returns whether the mail starting with `data` has the complete body process() uses, the html of password resets
+    and the first text/plain part of other mails.
+
+    A part is complete once the delimiter of the next one follows it. Boundaries of nested multiparts are collected
+    from the part headers as they are read, the headers are parsed with the public header parser of the email package.
+    """
+    end = HEADERS_END.search(data)
+    if end is None:
+        return False
+    headers = BytesHeaderParser(policy=policy.default).parsebytes(bytes(data[:end.end()]))
+    if headers.get_content_maintype() != 'multipart' or headers.get_boundary() is None:
+        return False
+    content_type = 'text/html' if headers['subject'] == PASSWORD_ASSISTANCE else 'text/plain'
+    boundaries = [headers.get_boundary()]
+    current = None
+    pos = end.end()
+    while True:
+        delimiter = re.compile(
+            rb'^--(' + rb'|'.join(re.escape(b.encode('ascii', 'surrogateescape')) for b in boundaries) + rb')(--)?[ \t]*\r?$',
+            re.MULTILINE,
+        ).search(data, pos)
+        if delimiter is None:
+            return False
+        if current == content_type:
+            return True
+        if delimiter.group(2):
+            # the closing delimiter, a preamble or epilogue follows
+            current = None
+            pos = delimiter.end()
+            continue
+        # the delimiter line ends with the line break the headers end is searched from
+        end = HEADERS_END.search(data, delimiter.end())
+        if end is None:
+            return False
+        part = BytesHeaderParser(policy=policy.default).parsebytes(bytes(data[delimiter.end():end.end()]).lstrip(b'\r\n'))
+        if part.get_content_maintype() == 'multipart' and part.get_boundary() is not None:
+            boundaries.append(part.get_boundary())
+            current = None
+        else:
+            current = part.get_content_type()
+        pos = end.end()
+
+
+def text(part, length=None):
+    """Returns the decoded text of `part`, the first `length` characters of it if given."""
+    if part is None:
+        return ''
+    content = part.get_content()
+    return content if length is None else content[:length]
+
+
+def log(msg):
+    print(json.dumps(msg), flush=True)
+
+
+def count_metric(name):
+    """Counts one of `name` per function, as a log line in the embedded metric format CloudWatch turns into the metric."""
+    log({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRIC_NAMESPACE,
+                'Dimensions': [['FunctionName']],
+                'Metrics': [{'Name': name, 'Unit': 'Count'}],
+            }],
+        },
+        'FunctionName': os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'OpsSanta'),
+        name: 1,
+    })
@@ -0,0 +1,553 @@
+import io
+import json
+import os
+import time
+from email.message import EmailMessage
+from unittest.mock import MagicMock, patch
+import pytest
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-1')
+os.environ['OPS_ITEM_REGION'] = 'eu-central-1'
+os.environ['EMAIL_BUCKET'] = 'rootmail-bucket'
+os.environ['EMAIL_BUCKET_ARN'] = 'arn:aws:s3:::rootmail-bucket'
+
+from botocore.exceptions import ClientError
+
+from index import (
+    CHUNK_SIZE, CLAIM_LEASE_SECONDS, MAX_MAIL_BYTES, DynamoDBFoldStore, InMemoryFoldStore, RecordsFailed, body_complete, compact_index,
+    fingerprint, handler, update_folded,
+)
+
+
+def ses_record(message_id='message-id', destination='root+123456789012@aws.example.com', verdict='PASS', timestamp='2026-10-18T08:00:00.000Z'):
+    return {
+        'ses': {
+            'mail': {
+                'messageId': message_id,
+                'destination': [destination],
+                'timestamp': timestamp,
+                'commonHeaders': {'subject': 'Your AWS bill'},
+            },
+            'receipt': {
+                'dkimVerdict': {'status': verdict},
+                'spamVerdict': {'status': 'PASS'},
+                'spfVerdict': {'status': 'PASS'},
+                'virusVerdict': {'status': 'PASS'},
+            },
+        }
+    }
+
+
+LETTERS = str.maketrans('0123456789', 'abcdefghij')
+
+
+def ses_event(*args, **kwargs):
+    return {'Records': [ses_record(*args, **kwargs)]}
+
+
+class Body:
+    """Stands in for the StreamingBody of a ranged get_object."""
+
+    def __init__(self, data, range=None):
+        end = int(range.split('-')[1]) + 1 if range else len(data)
+        self.data = data[:end]
+        self.chunks = 0
+        self.closed = False
+
+    def iter_chunks(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            self.chunks += 1
+            yield self.data[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+def mail(subject, body, subtype='plain'):
+    msg = EmailMessage()
+    msg['Subject'] = subject
+    msg.set_content(body, subtype=subtype)
+    return {'Body': Body(msg.as_bytes())}
+
+
+@pytest.fixture
+def clients():
+    with patch('index.s3') as s3, patch('index.ssm') as ssm, patch('index.fold_store', InMemoryFoldStore()):
+        # ops item ids follow the message id of the mail
+        ssm.create_ops_item.side_effect = lambda **kwargs: {
+            'OpsItemId': 'oi-' + json.loads(kwargs['OperationalData']['/aws/dedup']['Value'])['dedupString']
+        }
+        ssm.get_ops_item.return_value = {'OpsItem': {'Status': 'Open'}}
+        yield s3, ssm
+
+
+def test_creates_ops_item(clients):
+    s3, ssm = clients
+    s3.get_object.return_value = mail('Your AWS bill', 'Please pay.')
+
+    assert handler(ses_event(), None) == [{'id': 'message-id', 'outcome': 'created'}]
+
+    s3.get_object.assert_called_once_with(Bucket='rootmail-bucket', Key='RootMail/message-id', Range='bytes=0-524287')
+    kwargs = ssm.create_ops_item.call_args.kwargs
+    assert kwargs['Title'] == 'Your AWS bill'
+    assert kwargs['Description'] == 'Please pay.\n'
+    assert kwargs['Source'] == 'root+123456789012@aws.example.com'
+    assert json.loads(kwargs['OperationalData']['/aws/resources']['Value']) == [
+        {'arn': 'arn:aws:s3:::rootmail-bucket/RootMail/message-id'}
+    ]
+
+
+def test_indexes_mail(clients):
+    s3, ssm = clients
+    s3.get_object.return_value = dict(mail('Your AWS bill', 'Please pay.'), ContentRange='bytes 0-524287/1048576')
+
+    handler(ses_event(), None)
+
+    s3.put_object.assert_called_once()
+    assert s3.put_object.call_args.kwargs['Key'] == 'RootMailIndex/mails/2026-10-18/message-id.json'
+    assert json.loads(s3.put_object.call_args.kwargs['Body']) == {
+        'messageId': 'message-id',
+        'recipient': '123456789012',
+        'subject': 'Your AWS bill',
+        'date': '2026-10-18T08:00:00.000Z',
+        'verdicts': {'dkim': 'PASS', 'spam': 'PASS', 'spf': 'PASS', 'virus': 'PASS'},
+        'size': 1048576,
+    }
+
+
+def test_indexes_mail_with_failed_verdict_without_reading_it(clients):
+    s3, ssm = clients
+
+    handler(ses_event(verdict='FAIL'), None)
+
+    s3.get_object.assert_not_called()
+    entry = json.loads(s3.put_object.call_args.kwargs['Body'])
+    assert entry['verdicts']['dkim'] == 'FAIL'
+    assert entry['subject'] == 'Your AWS bill'
+    assert entry['size'] is None
+
+
+def test_failing_index_does_not_fail_the_mail_but_is_counted(clients, capsys):
+    s3, ssm = clients
+    s3.get_object.return_value = mail('Your AWS bill', 'Please pay.')
+    s3.put_object.side_effect = Exception('access denied')
+
+    assert handler(ses_event(), None) == [{'id': 'message-id', 'outcome': 'created'}]
+
+    metrics = [line for line in map(json.loads, capsys.readouterr().out.splitlines()) if '_aws' in line]
+    assert [m['_aws']['CloudWatchMetrics'][0]['Metrics'] for m in metrics] == [[{'Name': 'RootMailIndexFailures', 'Unit': 'Count'}]]
+    assert metrics[0]['RootMailIndexFailures'] == 1
+
+
+def index_bucket(objects):
+    """Stands in for S3 with the NDJSON objects of `objects`, a dict of key and entries, changed by puts and deletes."""
+    s3 = MagicMock()
+    s3.get_paginator.return_value.paginate.side_effect = lambda Bucket, Prefix: [
+        {'Contents': [{'Key': key} for key in sorted(objects) if key.startswith(Prefix)]}
+    ]
+
+    def get_object(Bucket, Key):
+        if Key not in objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        return {'Body': io.BytesIO(''.join(json.dumps(e) + '\n' for e in objects[Key]).encode())}
+
+    def put_object(Bucket, Key, Body, ContentType):
+        objects[Key] = [json.loads(line) for line in Body.decode().splitlines()]
+
+    def delete_objects(Bucket, Delete):
+        for obj in Delete['Objects']:
+            objects.pop(obj['Key'])
+        return {}
+
+    s3.get_object.side_effect = get_object
+    s3.put_object.side_effect = put_object
+    s3.delete_objects.side_effect = delete_objects
+    return s3
+
+
+def index_entry(message_id, recipient, date):
+    return {'messageId': message_id, 'recipient': recipient, 'date': date + 'T08:00:00.000Z'}
+
+
+def test_compacts_the_entries_of_past_days_into_manifests():
+    objects = {
+        'RootMailIndex/mails/2026-10-16/a.json': [index_entry('a', 'alias-1', '2026-10-16')],
+        'RootMailIndex/mails/2026-10-17/b.json': [index_entry('b', 'alias-2', '2026-10-17')],
+        'RootMailIndex/mails/2026-10-17/c.json': [index_entry('c', 'alias-1', '2026-10-17')],
+        'RootMailIndex/mails/2026-10-18/d.json': [index_entry('d', 'alias-1', '2026-10-18')],
+        # an earlier run already merged the mails of the 1st of the recipient
+        'RootMailIndex/recipient=alias-1/2026-10.ndjson': [index_entry('x', 'alias-1', '2026-10-01')],
+    }
+
+    with patch('index.s3', index_bucket(objects)):
+        assert compact_index(today='2026-10-18') == ['2026-10-16', '2026-10-17']
+
+    assert {key: [e['messageId'] for e in entries] for key, entries in objects.items()} == {
+        'RootMailIndex/day=2026-10-16.ndjson': ['a'],
+        'RootMailIndex/day=2026-10-17.ndjson': ['b', 'c'],
+        'RootMailIndex/recipient=alias-1/2026-10.ndjson': ['x', 'a', 'c'],
+        'RootMailIndex/recipient=alias-2/2026-10.ndjson': ['b'],
+        'RootMailIndex/mails/2026-10-18/d.json': ['d'],
+    }
+
+
+def test_schedule_compacts_the_index():
+    with patch('index.compact_index', return_value=['2026-10-17']) as compact:
+        assert handler({'source': 'aws.events', 'detail-type': 'Scheduled Event'}, None) == ['2026-10-17']
+
+    compact.assert_called_once_with()
+
+
+def test_compacting_again_does_not_duplicate_entries():
+    entry = index_entry('a', 'alias-1', '2026-10-16')
+    objects = {
+        'RootMailIndex/mails/2026-10-16/a.json': [entry],
+        # a run failed after writing the manifests but before deleting the entries
+        'RootMailIndex/day=2026-10-16.ndjson': [entry],
+        'RootMailIndex/recipient=alias-1/2026-10.ndjson': [entry],
+    }
+
+    with patch('index.s3', index_bucket(objects)):
+        compact_index(today='2026-10-18')
+
+    assert objects == {
+        'RootMailIndex/day=2026-10-16.ndjson': [entry],
+        'RootMailIndex/recipient=alias-1/2026-10.ndjson': [entry],
+    }
+
+
+def test_stores_password_reset_link(clients):
+    s3, ssm = clients
+    s3.get_object.return_value = mail(
+        'Amazon Web Services Password Assistance',
+        '<p>https://signin.aws.amazon.com/resetpassword?token=abc<br></p>',
+        subtype='html',
+    )
+
+    handler(ses_event(), None)
+
+    kwargs = ssm.put_parameter.call_args.kwargs
+    assert kwargs['Name'] == '/superwerker/rootmail/pw_reset_link/123456789012'
+    assert kwargs['Value'] == 'https://signin.aws.amazon.com/resetpassword?token=abc'
+    ssm.create_ops_item.assert_not_called()
+
+
+def test_skips_filtered_subjects(clients):
+    s3, ssm = clients
+    s3.get_object.return_value = mail('Welcome to Amazon Web Services', 'Hello')
+
+    handler(ses_event(), None)
+
+    ssm.create_ops_item.assert_not_called()
+
+
+def test_skips_mail_with_failed_verdict(clients):
+    s3, ssm = clients
+
+    handler(ses_event(verdict='FAIL'), None)
+
+    s3.get_object.assert_not_called()
+    ssm.create_ops_item.assert_not_called()
+
+
+def test_processes_every_record_of_a_burst(clients):
+    s3, ssm = clients
+    subjects = {'RootMail/filtered': 'Welcome to Amazon Web Services'}
+    # distinct texts, the same ones would be folded
+    s3.get_object.side_effect = lambda Bucket, Key, Range: mail(subjects.get(Key, 'AWS announcement'), 'News ' + Key.translate(LETTERS))
+    records = [ses_record('failed-verdict', verdict='FAIL'), ses_record('filtered')] + [
+        ses_record('mail-{}'.format(i), 'root+{:012d}@aws.example.com'.format(i)) for i in range(100)
+    ]
+
+    outcomes = handler({'Records': records}, None)
+
+    assert [o['outcome'] for o in outcomes[:3]] == ['verdict_failed', 'filtered', 'created']
+    assert [o['id'] for o in outcomes] == [r['ses']['mail']['messageId'] for r in records]
+    assert ssm.create_ops_item.call_count == 100
+    assert {c.kwargs['Source'] for c in ssm.create_ops_item.call_args_list} == {'root+{:012d}@aws.example.com'.format(i) for i in range(100)}
+
+
+def test_failing_record_does_not_stop_the_others(clients):
+    s3, ssm = clients
+    s3.get_object.side_effect = lambda Bucket, Key, Range: mail('Your AWS bill', 'Please pay {}.'.format(Key))
+
+    def create_ops_item(**kwargs):
+        if 'first' in kwargs['OperationalData']['/aws/dedup']['Value']:
+            raise Exception('throttled')
+        return {'OpsItemId': 'oi-second'}
+
+    ssm.create_ops_item.side_effect = create_ops_item
+
+    with pytest.raises(RecordsFailed) as e:
+        handler({'Records': [ses_record('first'), ses_record('second')]}, None)
+
+    assert [o['outcome'] for o in e.value.outcomes] == ['failed', 'created']
+    assert ssm.create_ops_item.call_count == 2
+
+
+def test_reads_only_the_start_of_large_mails(clients):
+    s3, ssm = clients
+    msg = EmailMessage()
+    msg['Subject'] = 'Your AWS bill'
+    msg.set_content('Please pay. ' * 1000)
+    msg.add_attachment(os.urandom(4 * MAX_MAIL_BYTES), maintype='application', subtype='pdf', filename='invoice.pdf')
+    bodies = []
+    s3.get_object.side_effect = lambda Bucket, Key, Range: bodies.append(Body(msg.as_bytes(), Range)) or {'Body': bodies[-1]}
+
+    handler(ses_event(), None)
+
+    # the text comes first, reading stops once it is complete
+    assert bodies[0].chunks == 1
+    assert bodies[0].closed
+    description = ssm.create_ops_item.call_args.kwargs['Description']
+    assert description == ('Please pay. ' * 1000)[:1020] + ' ...'
+
+
+def test_body_is_complete_once_the_text_in_a_nested_multipart_is_followed_by_a_delimiter():
+    msg = EmailMessage()
+    msg['Subject'] = 'Your AWS bill'
+    msg.set_content('Please pay.')
+    msg.add_alternative('<p>Please pay.</p>', subtype='html')
+    msg.add_attachment(b'%PDF', maintype='application', subtype='pdf', filename='invoice.pdf')
+    data = msg.as_bytes()
+    text_end = data.index(b'Please pay.') + len(b'Please pay.\n')
+
+    assert msg.get_content_type() == 'multipart/mixed'
+    assert not body_complete(data[:text_end])
+    assert body_complete(data[:text_end + len(b'--') + len(msg.get_payload()[0].get_boundary()) + 1])
+
+
+def test_body_of_password_assistance_is_complete_with_its_html():
+    msg = EmailMessage()
+    msg['Subject'] = 'Amazon Web Services Password Assistance'
+    msg.set_content('Reset your password.')
+    msg.add_alternative('<a href="https://signin.aws.amazon.com/reset">Reset</a>', subtype='html')
+    data = msg.as_bytes()
+    html_end = data.index(b'</a>')
+
+    assert not body_complete(data[:html_end])
+    assert body_complete(data)
+    assert not body_complete(b'Subject: Your AWS bill\n\nPlease pay.\n')
+
+
+def test_mail_without_text_in_its_start_points_at_the_bucket(clients):
+    s3, ssm = clients
+    msg = EmailMessage()
+    msg['Subject'] = 'Your AWS bill'
+    msg.set_content('Please pay.')
+    msg.add_attachment(os.urandom(2 * MAX_MAIL_BYTES), maintype='application', subtype='pdf', filename='invoice.pdf')
+    # the text after the attachment is beyond MAX_MAIL_BYTES
+    msg.get_payload().reverse()
+    bodies = []
+    s3.get_object.side_effect = lambda Bucket, Key, Range: bodies.append(Body(msg.as_bytes(), Range)) or {'Body': bodies[-1]}
+
+    handler(ses_event(), None)
+
+    assert bodies[0].chunks == MAX_MAIL_BYTES // CHUNK_SIZE
+    assert ssm.create_ops_item.call_args.kwargs['Description'] == (
+        'The text of this mail could not be read, see s3://rootmail-bucket/RootMail/message-id'
+    )
+
+
+def test_empty_mail(clients):
+    s3, ssm = clients
+    s3.get_object.side_effect = ClientError({'Error': {'Code': 'InvalidRange'}}, 'GetObject')
+
+    handler(ses_event(), None)
+
+    assert ssm.create_ops_item.call_args.kwargs['Title'] == 'Your AWS bill'
+    assert ssm.create_ops_item.call_args.kwargs['Description'].startswith('The text of this mail could not be read')
+
+
+def test_folds_the_same_notice_to_many_accounts_into_one_ops_item(clients):
+    s3, ssm = clients
+    s3.get_object.side_effect = lambda Bucket, Key, Range: mail(
+        'AWS Health Event', 'Your account {} is affected.  Contact root+{}@aws.example.com.'.format(Key[-12:], Key[-12:])
+    )
+    records = [ses_record('mail-{:012d}'.format(i), 'root+{:012d}@aws.example.com'.format(i)) for i in range(150)]
+
+    outcomes = handler({'Records': records}, None)
+
+    assert sorted(o['outcome'] for o in outcomes) == ['created'] + ['folded'] * 149
+    ssm.create_ops_item.assert_called_once()
+    ssm.update_ops_item.assert_called_once()
+    kwargs = ssm.update_ops_item.call_args.kwargs
+    assert kwargs['OpsItemId'] == 'oi-' + next(o['id'] for o in outcomes if o['outcome'] == 'created')
+    assert kwargs['OperationalData']['/superwerker/rootmail/count']['Value'] == '150'
+    assert len(json.loads(kwargs['OperationalData']['/superwerker/rootmail/recipients']['Value'])) == 100
+
+
+def test_retried_folded_mail_is_counted_once(clients):
+    s3, ssm = clients
+    s3.get_object.side_effect = lambda Bucket, Key, Range: mail('AWS Health Event', 'Your account is affected.')
+    records = [ses_record('first', 'root+111111111111@aws.example.com'), ses_record('second', 'root+222222222222@aws.example.com')]
+
+    handler({'Records': records[:1]}, None)
+    handler({'Records': records[1:]}, None)
+    handler({'Records': records[1:]}, None)
+
+    ssm.create_ops_item.assert_called_once()
+    assert ssm.update_ops_item.call_args.kwargs == {
+        'OpsItemId': 'oi-first',
+        'OperationalData': {
+            '/superwerker/rootmail/count': {'Value': '2', 'Type': 'SearchableString'},
+            '/superwerker/rootmail/recipients': {
+                'Value': json.dumps(['root+111111111111@aws.example.com', 'root+222222222222@aws.example.com']),
+                'Type': 'SearchableString',
+            },
+        },
+    }
+
+
+def test_mail_of_failed_ops_item_is_not_folded(clients):
+    s3, ssm = clients
+    s3.get_object.side_effect = lambda Bucket, Key, Range: mail('AWS Health Event', 'Your account is affected.')
+    ssm.create_ops_item.side_effect = [Exception('throttled'), {'OpsItemId': 'oi-first'}]
+
+    with pytest.raises(RecordsFailed):
+        handler(ses_event('first'), None)
+
+    assert handler(ses_event('first'), None) == [{'id': 'first', 'outcome': 'created'}]
+
+
+def test_fingerprint_ignores_account_specifics():
+    assert fingerprint('Notice', 'Account 123456789012 (root+abc@aws.example.com)\n\nis  affected.') == fingerprint(
+        'Notice', 'Account 210987654321 (root+xyz@aws.example.com) is affected.'
+    )
+    assert fingerprint('Notice', 'Account is affected.') != fingerprint('Notice', 'Account is not affected.')
+
+
+def test_retry_of_mail_crashed_after_claiming_creates_the_ops_item(clients):
+    s3, ssm = clients
+    s3.get_object.side_effect = lambda Bucket, Key, Range: mail('AWS Health Event', 'Your account is affected.')
+    # the first delivery claimed the fingerprint and crashed before creating the ops item
+    with patch('index.ssm.create_ops_item', side_effect=SystemExit):
+        with pytest.raises(SystemExit):
+            handler(ses_event('first'), None)
+
+    assert handler(ses_event('first'), None) == [{'id': 'first', 'outcome': 'created'}]
+
+
+def test_abandoned_claim_is_taken_over_after_its_lease(clients):
+    s3, ssm = clients
+    s3.get_object.side_effect = lambda Bucket, Key, Range: mail('AWS Health Event', 'Your account is affected.')
+    with patch('index.ssm.create_ops_item', side_effect=SystemExit):
+        with pytest.raises(SystemExit):
+            handler(ses_event('first'), None)
+
+    with patch('index.FOLD_WAIT_SECONDS', 0), patch('index.time.sleep'):
+        with pytest.raises(Exception, match='1 of 1 fingerprints'):
+            handler(ses_event('second'), None)
+    with patch('index.time.time', return_value=time.time() + CLAIM_LEASE_SECONDS + 1):
+        assert handler(ses_event('second'), None) == [{'id': 'second', 'outcome': 'created'}]
+
+    assert ssm.update_ops_item.call_args is None
+    assert ssm.create_ops_item.call_args.kwargs['OperationalData']['/aws/dedup']['Value'] == json.dumps({'dedupString': 'second'})
+
+
+def test_fold_window_follows_the_time_the_mail_was_received(clients):
+    s3, ssm = clients
+    s3.get_object.side_effect = lambda Bucket, Key, Range: mail('AWS Health Event', 'Your account is affected.')
+    records = [
+        ses_record('first', timestamp='2026-10-18T08:00:00.000Z'),
+        ses_record('second', timestamp='2026-10-18T08:30:00.000Z'),
+        ses_record('third', timestamp='2026-10-18T13:00:00.000Z'),
+    ]
+
+    outcomes = [handler({'Records': [record]}, None)[0]['outcome'] for record in records]
+
+    assert outcomes == ['created', 'folded', 'created']
+
+
+def test_mail_after_the_ops_item_was_resolved_creates_a_new_one(clients):
+    s3, ssm = clients
+    s3.get_object.side_effect = lambda Bucket, Key, Range: mail('AWS Health Event', 'Your account is affected.')
+    handler(ses_event('first'), None)
+    ssm.get_ops_item.return_value = {'OpsItem': {'Status': 'Resolved'}}
+
+    assert handler(ses_event('second'), None) == [{'id': 'second', 'outcome': 'created'}]
+
+    ssm.get_ops_item.assert_called_once_with(OpsItemId='oi-first')
+    ssm.update_ops_item.assert_not_called()
+    ssm.get_ops_item.return_value = {'OpsItem': {'Status': 'Open'}}
+    assert handler(ses_event('third'), None) == [{'id': 'third', 'outcome': 'folded'}]
+    assert ssm.update_ops_item.call_args.kwargs['OpsItemId'] == 'oi-second'
+    assert ssm.update_ops_item.call_args.kwargs['OperationalData']['/superwerker/rootmail/count']['Value'] == '2'
+
+
+def test_failed_update_of_one_ops_item_does_not_stop_the_others(clients):
+    s3, ssm = clients
+    s3.get_object.side_effect = lambda Bucket, Key, Range: mail('Notice ' + Key[-2], 'Your account is affected.')
+    records = [ses_record(id) for id in ('a1', 'a2', 'b1', 'b2')]
+    ssm.update_ops_item.side_effect = [Exception('throttled'), None]
+
+    with pytest.raises(Exception, match='1 of 2 fingerprints'):
+        handler({'Records': records}, None)
+
+    assert ssm.update_ops_item.call_count == 2
+
+
+def test_dynamodb_fold_store_reopens_only_the_resolved_ops_item():
+    client = MagicMock()
+    store = DynamoDBFoldStore('fold-table', client)
+
+    assert store.reopen('fp', 'oi-first', 'second', 'root+2@aws.example.com', 10)
+    kwargs = client.update_item.call_args.kwargs
+    assert kwargs['ConditionExpression'] == 'OpsItemId = :closed'
+    assert kwargs['ExpressionAttributeValues'][':closed'] == {'S': 'oi-first'}
+
+    client.update_item.side_effect = ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+    assert not store.reopen('fp', 'oi-first', 'third', 'root+3@aws.example.com', 10)
+
+
+def test_stale_count_does_not_overwrite_a_higher_one(clients):
+    s3, ssm = clients
+    store = InMemoryFoldStore()
+    store.claim('fp', 'first', 'root+1@aws.example.com', time.time() + 60, time.time())
+    store.set_ops_item('fp', 'oi-first')
+    store.fold('fp', 'second', 'root+2@aws.example.com')
+    stale = store.get('fp')
+    store.fold('fp', 'third', 'root+3@aws.example.com')
+    # another invocation reported all three mails while this one had read two
+    store.report('fp', 'oi-first', 3)
+
+    with patch('index.fold_store', store), patch.object(store, 'get', side_effect=[stale, store.get('fp')]):
+        update_folded('fp')
+
+    ssm.update_ops_item.assert_not_called()
+
+
+def test_concurrent_higher_count_is_written_again(clients):
+    s3, ssm = clients
+    store = InMemoryFoldStore()
+    store.claim('fp', 'first', 'root+1@aws.example.com', time.time() + 60, time.time())
+    store.set_ops_item('fp', 'oi-first')
+    store.fold('fp', 'second', 'root+2@aws.example.com')
+
+    def other_invocation_reports_more(**kwargs):
+        if store.get('fp')['Reported'] == 2:
+            store.fold('fp', 'third', 'root+3@aws.example.com')
+            store.report('fp', 'oi-first', 3)
+
+    ssm.update_ops_item.side_effect = other_invocation_reports_more
+    with patch('index.fold_store', store):
+        update_folded('fp')
+
+    counts = [c.kwargs['OperationalData']['/superwerker/rootmail/count']['Value'] for c in ssm.update_ops_item.call_args_list]
+    assert counts == ['2', '3']
+
+
+def test_dynamodb_fold_store_claims_a_fingerprint_once():
+    client = MagicMock()
+    store = DynamoDBFoldStore('fold-table', client)
+
+    assert store.claim('fp', 'first', 'root+1@aws.example.com', 100, 10)
+    kwargs = client.update_item.call_args.kwargs
+    assert kwargs['ConditionExpression'] == (
+        'attribute_not_exists(Fingerprint) OR (attribute_not_exists(OpsItemId) AND (Claimer = :message_id OR ClaimExpiresAt < :now))'
+    )
+    assert kwargs['ExpressionAttributeValues'][':lease'] == {'N': str(10 + CLAIM_LEASE_SECONDS)}
+
+    client.update_item.side_effect = ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+    assert not store.claim('fp', 'second', 'root+2@aws.example.com', 100, 10)
+    assert not store.report('fp', 'oi-first', 2)
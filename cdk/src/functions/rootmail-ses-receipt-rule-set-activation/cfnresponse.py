@@ -0,0 +1,35 @@
+"""
+Sends the result of a custom resource to CloudFormation, like the cfnresponse module CloudFormation adds to inline code.
+
+Functions deployed from an asset do not get that module, so the function ships this one with the same interface.
+"""
+import json
+import urllib.request
+
+SUCCESS = 'SUCCESS'
+FAILED = 'FAILED'
+
+
+def send(event, context, response_status, response_data, physical_resource_id=None, no_echo=False, reason=None):
+    body = json.dumps(
+        {
+            'Status': response_status,
+            'Reason': reason or 'See the details in CloudWatch Log Stream: {}'.format(context.log_stream_name),
+            'PhysicalResourceId': physical_resource_id or context.log_stream_name,
+            'StackId': event['StackId'],
+            'RequestId': event['RequestId'],
+            'LogicalResourceId': event['LogicalResourceId'],
+            'NoEcho': no_echo,
+            'Data': response_data,
+        }
+    ).encode('utf-8')
+    print('Response body: {}'.format(body))
+
+    request = urllib.request.Request(
+        event['ResponseURL'], data=body, method='PUT', headers={'Content-Type': '', 'Content-Length': str(len(body))}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            print('Status code: {}'.format(response.status))
+    except Exception as e:
+        print('send(..) failed executing request: {}'.format(e))
@@ -0,0 +1,111 @@
+import os
+import boto3
+from botocore.config import Config
+import cfnresponse
+
+# the settings of superwerker.clients, this module is also inline code of templates/rootmail.yaml and can not use the layer
+config = Config(retries={'mode': 'adaptive', 'max_attempts': 5}, tcp_keepalive=True, connect_timeout=5, read_timeout=60)
+
+ses = boto3.client("ses", config=config)
+
+CREATE = 'Create'
+DELETE = 'Delete'
+UPDATE = 'Update'
+
+RULE_SET_NAME = 'RootMail'
+RULE_NAME = 'Receive'
+
+
+def exception_handling(function):
+    def catch(event, context):
+        try:
+            function(event, context)
+        except Exception as e:
+            print(e)
+            print(event)
+            cfnresponse.send(event, context, cfnresponse.FAILED, {})
+
+    return catch
+
+
+@exception_handling
+def handler(event, context):
+    RequestType = event["RequestType"]
+    LogicalResourceId = event["LogicalResourceId"]
+    PhysicalResourceId = event.get("PhysicalResourceId")
+
+    print('RequestType: {}'.format(RequestType))
+    print('PhysicalResourceId: {}'.format(PhysicalResourceId))
+    print('LogicalResourceId: {}'.format(LogicalResourceId))
+
+    id = PhysicalResourceId
+    rule_set_name = RULE_SET_NAME
+    rule_name = RULE_NAME
+
+    if RequestType == CREATE:
+        ses.create_receipt_rule_set(
+            RuleSetName=rule_set_name
+        )
+
+        ses.create_receipt_rule(
+            RuleSetName=rule_set_name,
+            Rule=receipt_rule(),
+        )
+
+        print('Activating SES ReceiptRuleSet: {}'.format(LogicalResourceId))
+
+        ses.set_active_receipt_rule_set(
+            RuleSetName=rule_set_name,
+        )
+    elif RequestType == UPDATE:
+        print('Updating SES ReceiptRule: {}'.format(LogicalResourceId))
+
+        ses.update_receipt_rule(
+            RuleSetName=rule_set_name,
+            Rule=receipt_rule(),
+        )
+    elif RequestType == DELETE:
+        print('Deactivating SES ReceiptRuleSet: {}'.format(LogicalResourceId))
+
+        ses.set_active_receipt_rule_set()
+
+        ses.delete_receipt_rule(
+            RuleName=rule_name,
+            RuleSetName=rule_set_name,
+        )
+
+        ses.delete_receipt_rule_set(
+            RuleSetName=rule_set_name
+        )
+
+    cfnresponse.send(event, context, cfnresponse.SUCCESS, {}, id)
+
+
+def receipt_rule():
+    """
+    Returns the rule storing the mails in the bucket and passing them to OpsSanta, which reads them from there.
+
+    The rule has no SNS action with the content of the mails, SES bounces mails bigger than 150 KB then, e.g. invoices.
+    """
+    return {
+        'Name': RULE_NAME,
+        'Enabled': True,
+        'TlsPolicy': 'Require',
+        'ScanEnabled': True,
+        'Recipients': [
+            os.environ['ROOT_MAIL_RECIPIENT'],
+        ],
+        'Actions': [
+            {
+                'S3Action': {
+                    'BucketName': os.environ['EMAIL_BUCKET'],
+                    'ObjectKeyPrefix': 'RootMail'
+                },
+            },
+            {
+                'LambdaAction': {
+                    'FunctionArn': os.environ['OPS_SANTA_FUNCTION_ARN']
+                }
+            }
+        ],
+    }
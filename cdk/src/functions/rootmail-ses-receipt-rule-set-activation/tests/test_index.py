@@ -0,0 +1,99 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+import pytest
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-1')
+os.environ['ROOT_MAIL_RECIPIENT'] = 'root@aws.example.com'
+os.environ['EMAIL_BUCKET'] = 'rootmail-bucket'
+os.environ['OPS_SANTA_FUNCTION_ARN'] = 'arn:aws:lambda:eu-west-1:123456789012:function:OpsSanta'
+
+import cfnresponse
+from index import CREATE, DELETE, UPDATE, handler
+
+
+def event(request_type):
+    return {
+        'RequestType': request_type,
+        'ResourceProperties': {},
+        'LogicalResourceId': 'SESReceiptRuleSetActivation',
+        'PhysicalResourceId': 'rule-set',
+        'StackId': 'stack-id',
+        'RequestId': 'request-id',
+        'ResponseURL': 'https://cloudformation-custom-resource-response.example.com',
+    }
+
+
+@pytest.fixture
+def ses():
+    with patch('index.ses') as ses, patch('index.cfnresponse.send') as send:
+        yield ses, send
+
+
+def test_create_activates_rule_set(ses):
+    ses, send = ses
+
+    handler(event(CREATE), None)
+
+    rule = ses.create_receipt_rule.call_args.kwargs['Rule']
+    assert rule['Recipients'] == ['root@aws.example.com']
+    assert rule['Actions'] == [
+        {'S3Action': {'BucketName': 'rootmail-bucket', 'ObjectKeyPrefix': 'RootMail'}},
+        {'LambdaAction': {'FunctionArn': 'arn:aws:lambda:eu-west-1:123456789012:function:OpsSanta'}},
+    ]
+    ses.set_active_receipt_rule_set.assert_called_once_with(RuleSetName='RootMail')
+    send.assert_called_once_with(event(CREATE), None, cfnresponse.SUCCESS, {}, 'rule-set')
+
+
+def test_update_updates_receipt_rule(ses):
+    ses, send = ses
+
+    with patch.dict(os.environ, {'EMAIL_BUCKET': 'other-bucket'}):
+        handler(event(UPDATE), None)
+
+    ses.create_receipt_rule_set.assert_not_called()
+    rule = ses.update_receipt_rule.call_args.kwargs['Rule']
+    assert rule['Actions'] == [
+        {'S3Action': {'BucketName': 'other-bucket', 'ObjectKeyPrefix': 'RootMail'}},
+        {'LambdaAction': {'FunctionArn': 'arn:aws:lambda:eu-west-1:123456789012:function:OpsSanta'}},
+    ]
+    send.assert_called_once_with(event(UPDATE), None, cfnresponse.SUCCESS, {}, 'rule-set')
+
+
+def test_delete_deactivates_rule_set(ses):
+    ses, send = ses
+
+    handler(event(DELETE), None)
+
+    ses.set_active_receipt_rule_set.assert_called_once_with()
+    ses.delete_receipt_rule_set.assert_called_once_with(RuleSetName='RootMail')
+    send.assert_called_once_with(event(DELETE), None, cfnresponse.SUCCESS, {}, 'rule-set')
+
+
+def test_failure_is_sent_to_cloudformation(ses):
+    ses, send = ses
+    ses.create_receipt_rule_set.side_effect = Exception('boom')
+
+    handler(event(CREATE), None)
+
+    send.assert_called_once_with(event(CREATE), None, cfnresponse.FAILED, {})
+
+
+def test_cfnresponse_puts_response():
+    context = MagicMock(log_stream_name='log-stream')
+    with patch('cfnresponse.urllib.request.urlopen') as urlopen:
+        cfnresponse.send(event(CREATE), context, cfnresponse.SUCCESS, {'Key': 'Value'}, 'rule-set')
+
+    request = urlopen.call_args.args[0]
+    assert request.method == 'PUT'
+    assert request.full_url == 'https://cloudformation-custom-resource-response.example.com'
+    assert json.loads(request.data) == {
+        'Status': 'SUCCESS',
+        'Reason': 'See the details in CloudWatch Log Stream: log-stream',
+        'PhysicalResourceId': 'rule-set',
+        'StackId': 'stack-id',
+        'RequestId': 'request-id',
+        'LogicalResourceId': 'SESReceiptRuleSetActivation',
+        'NoEcho': False,
+        'Data': {'Key': 'Value'},
+    }
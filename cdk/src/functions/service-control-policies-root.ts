@@ -8,6 +8,7 @@ import {
   PolicyType,
   UpdatePolicyCommand,
   ListPoliciesCommand,
+  paginateListTargetsForPolicy,
 } from '@aws-sdk/client-organizations';
 import { Effect, PolicyDocument, PolicyStatement } from 'aws-cdk-lib/aws-iam';
 import { CdkCustomResourceEvent, CdkCustomResourceResponse, Context } from 'aws-lambda';
@@ -132,19 +133,20 @@ export async function handler(event: CdkCustomResourceEvent, _context: Context):
       console.log('Deleting Policy: ', event.LogicalResourceId);
 
       try {
-        const rootId = await getRootId(client);
-
         const policyId = await getPolicyId(client, event.ResourceProperties.scpName);
+        const targetIds = await throttlingBackOff(() => getPolicyTargetIds(client, policyId));
 
-        const commandDetachPolicy = new DetachPolicyCommand({
-          PolicyId: policyId,
-          TargetId: rootId,
-        });
+        for (const targetId of targetIds) {
+          const commandDetachPolicy = new DetachPolicyCommand({
+            PolicyId: policyId,
+            TargetId: targetId,
+          });
 
-        await throttlingBackOff(() => client.send(commandDetachPolicy));
+          await throttlingBackOff(() => client.send(commandDetachPolicy));
+        }
 
         const commandDeletePolicy = new DeletePolicyCommand({
-          PolicyId: await getPolicyId(client, event.ResourceProperties.scpName),
+          PolicyId: policyId,
         });
 
         const responseDeletePolicy = await throttlingBackOff(() => client.send(commandDeletePolicy));
@@ -187,3 +189,16 @@ async function getPolicyId(organizationClient: OrganizationsClient, policyName:
 
   throw new Error(`No SCP Policy found for the name: ${policyName}`);
 }
+
+async function getPolicyTargetIds(organizationClient: OrganizationsClient, policyId: string | undefined): Promise<Set<string>> {
+  // all pages, a policy can be attached to the root and any number of OUs and accounts
+  const targetIds = new Set<string>();
+  for await (const page of paginateListTargetsForPolicy({ client: organizationClient }, { PolicyId: policyId })) {
+    for (const target of page.Targets ?? []) {
+      if (target.TargetId) {
+        targetIds.add(target.TargetId);
+      }
+    }
+  }
+  return targetIds;
+}
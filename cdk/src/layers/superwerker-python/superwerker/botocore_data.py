@@ -0,0 +1,139 @@
+"""
+Writes the botocore data of only the AWS services a function uses, to be bundled with the function.
+
+Usage:
+    python -m superwerker.botocore_data FUNCTION_DIRECTORY OUTPUT_DIRECTORY
+
+The services are the string literals passed to `client()`, `resource()` or `lazy_client()`, also when imported under
+another name like `from superwerker.clients import client as tuned_client`, in the modules of the function and in the
+superwerker modules they import. Their models are written without documentation, `endpoints.json` only with their
+endpoints. Creating a client reads and parses this data on every cold start, the full `endpoints.json` alone is more
+than 1 MB. Functions point botocore at the output with the AWS_DATA_PATH environment variable, botocore reads it before
+its own data. The data all clients share, like `_retry.json`, is left to the botocore of the runtime.
+Fails if a function module passes anything else than a string literal, its service could not be bundled then.
+"""
+import ast
+import copy
+import json
+import os
+import sys
+
+from botocore.exceptions import DataNotFoundError
+from botocore.loaders import Loader
+
+LAYER_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CLIENT_FACTORIES = ('client', 'resource', 'lazy_client')
+SERVICE_DATA = ('service-2', 'endpoint-rule-set-1', 'paginators-1')
+DOCUMENTATION_KEYS = ('documentation', 'documentationUrl')
+
+
+def _modules(tree, package_directory):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            # `from superwerker import clients` imports a module as well
+            names = [node.module] + [node.module + '.' + alias.name for alias in node.names]
+        else:
+            continue
+        for name in names:
+            if name.split('.')[0] == 'superwerker':
+                path = os.path.join(package_directory, *name.split('.')) + '.py'
+                if os.path.isfile(path):
+                    yield path
+
+
+def _service_calls(tree):
+    imported_as = {
+        alias.asname: alias.name for node in ast.walk(tree) if isinstance(node, ast.ImportFrom) for alias in node.names if alias.asname
+    }
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        name = node.func.attr if isinstance(node.func, ast.Attribute) else getattr(node.func, 'id', None)
+        if imported_as.get(name, name) not in CLIENT_FACTORIES:
+            continue
+        arguments = node.args[:1] or [k.value for k in node.keywords if k.arg == 'service_name']
+        if arguments:
+            yield node.lineno, arguments[0]
+
+
+def used_services(directory, package_directory=LAYER_DIRECTORY):
+    """
+    Returns the services the modules of `directory` and the superwerker modules they import create clients for.
+
+    Also returns `file:line` of every call in `directory` whose service is not a string literal. Calls like that in
+    superwerker modules are ignored, they are helpers which get the service from their caller.
+    """
+    directory = os.path.abspath(directory)
+    services, unresolved = set(), []
+    pending = [os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith('.py')]
+    seen = set()
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+        for line, argument in _service_calls(tree):
+            if isinstance(argument, ast.Constant) and isinstance(argument.value, str):
+                services.add(argument.value)
+            elif not path.startswith(package_directory):
+                unresolved.append('{}:{}'.format(os.path.relpath(path, directory), line))
+        pending.extend(_modules(tree, package_directory))
+    return sorted(services), unresolved
+
+
+def _without_documentation(value):
+    if isinstance(value, dict):
+        return {k: _without_documentation(v) for k, v in value.items() if k not in DOCUMENTATION_KEYS}
+    if isinstance(value, list):
+        return [_without_documentation(v) for v in value]
+    return value
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+
+def write(services, output, loader=None):
+    """Writes the data of `services` to `output` in the layout of botocore's data directory."""
+    loader = loader or Loader()
+    endpoint_prefixes = set()
+    for service in services:
+        api_version = loader.determine_latest_version(service, 'service-2')
+        for type_name in SERVICE_DATA:
+            try:
+                data = loader.load_service_model(service, type_name, api_version)
+            except DataNotFoundError:
+                continue
+            if type_name == 'service-2':
+                data = _without_documentation(data)
+                endpoint_prefixes.add(data['metadata']['endpointPrefix'])
+            _write(os.path.join(output, service, api_version, type_name + '.json'), data)
+
+    endpoints = copy.deepcopy(loader.load_data('endpoints'))
+    for partition in endpoints['partitions']:
+        partition['services'] = {k: v for k, v in partition['services'].items() if k in endpoint_prefixes}
+    _write(os.path.join(output, 'endpoints.json'), endpoints)
+
+
+def main(args=None):
+    args = args if args is not None else sys.argv[1:]
+    if len(args) != 2:
+        sys.exit(__doc__)
+    directory, output = args
+
+    services, unresolved = used_services(directory)
+    if unresolved:
+        sys.exit('Can not tell the service of the clients created at {}, pass it as a string literal'.format(', '.join(unresolved)))
+    write(services, output)
+    print('botocore data of {} written to {}'.format(', '.join(services), output))
+
+
+if __name__ == '__main__':
+    main()
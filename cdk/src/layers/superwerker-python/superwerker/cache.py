@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from superwerker.clients import client
+from superwerker.retry import throttling_back_off
+
+CACHE_PARAMETER_PREFIX_ENV = 'CACHE_PARAMETER_PREFIX'
+
+
+class InMemoryStore:
+    """Local stand-in for the persisted stores, e.g. in tests."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def put(self, key, expires_at, value):
+        self._entries[key] = (expires_at, value)
+
+    def add(self, key, expires_at, value):
+        """Writes the entry only if `key` has none or an expired one, returns whether it did."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                return False
+            self._entries[key] = (expires_at, value)
+            return True
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+
+class FileStore:
+    """Keeps entries as JSON files, e.g. in /tmp which outlives the process for a while in an execution environment."""
+
+    def __init__(self, directory='/tmp/superwerker-cache'):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key.replace('/', '_') + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry['ExpiresAt'], entry['Value']
+
+    def put(self, key, expires_at, value):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(key), 'w') as f:
+            json.dump({'ExpiresAt': expires_at, 'Value': value}, f)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class SSMParameterStore:
+    """Keeps entries as JSON in SSM parameters below `prefix`, shared by all execution environments of a function."""
+
+    def __init__(self, prefix, client=None):
+        self.prefix = prefix.rstrip('/')
+        self._client = client
+
+    @classmethod
+    def from_environment(cls):
+        """Returns the store configured by CACHE_PARAMETER_PREFIX, or None if it is not set."""
+        prefix = os.environ.get(CACHE_PARAMETER_PREFIX_ENV)
+        return cls(prefix) if prefix else None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = client('ssm')
+        return self._client
+
+    def _name(self, key):
+        return '{}/{}'.format(self.prefix, key)
+
+    def get(self, key):
+        try:
+            parameter = throttling_back_off(lambda: self.client.get_parameter(Name=self._name(key)))['Parameter']
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ParameterNotFound':
+                return None
+            raise
+        entry = json.loads(parameter['Value'])
+        return entry['ExpiresAt'], entry['Value']
+
+    def put(self, key, expires_at, value):
+        throttling_back_off(
+            lambda: self.client.put_parameter(
+                Name=self._name(key),
+                Value=json.dumps({'ExpiresAt': expires_at, 'Value': value}),
+                Type='String',
+                Overwrite=True,
+            )
+        )
+
+    def delete(self, key):
+        try:
+            throttling_back_off(lambda: self.client.delete_parameter(Name=self._name(key)))
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ParameterNotFound':
+                raise
+
+
+class DynamoDBStore:
+    """
+    Keeps entries as JSON in a DynamoDB table with partition key `Key`, shared by all execution environments.
+
+    The table should expire items by their `ExpiresAt` attribute, expired items it did not delete yet are ignored.
+    """
+
+    def __init__(self, table_name, client=None):
+        self.table_name = table_name
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = client('dynamodb')
+        return self._client
+
+    def get(self, key):
+        item = throttling_back_off(
+            lambda: self.client.get_item(TableName=self.table_name, Key={'Key': {'S': key}}, ConsistentRead=True)
+        ).get('Item')
+        if item is None:
+            return None
+        return int(item['ExpiresAt']['N']), json.loads(item['Value']['S'])
+
+    def _item(self, key, expires_at, value):
+        return {'Key': {'S': key}, 'ExpiresAt': {'N': str(int(expires_at))}, 'Value': {'S': json.dumps(value)}}
+
+    def put(self, key, expires_at, value):
+        throttling_back_off(lambda: self.client.put_item(TableName=self.table_name, Item=self._item(key, expires_at, value)))
+
+    def add(self, key, expires_at, value, clock=time.time):
+        """Writes the entry only if `key` has none or an expired one, returns whether it did."""
+        try:
+            throttling_back_off(
+                lambda: self.client.put_item(
+                    TableName=self.table_name,
+                    Item=self._item(key, expires_at, value),
+                    ConditionExpression='attribute_not_exists(#key) OR #expires_at <= :now',
+                    ExpressionAttributeNames={'#key': 'Key', '#expires_at': 'ExpiresAt'},
+                    ExpressionAttributeValues={':now': {'N': str(int(clock()))}},
+                )
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def delete(self, key):
+        throttling_back_off(lambda: self.client.delete_item(TableName=self.table_name, Key={'Key': {'S': key}}))
+
+
+class TTLCache:
+    """
+    Caches values for `ttl` seconds in process memory, so warm invocations answer without any call.
+
+    With a `store` (see the classes above) entries also survive cold starts, values must be JSON serializable then.
+    A failing store is logged and skipped, the cache then only works in memory.
+    """
+
+    def __init__(self, ttl, store=None, clock=time.time):
+        self.ttl = ttl
+        self.store = store
+        self.clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _stored(self, key):
+        try:
+            return self.store.get(key)
+        except Exception as e:
+            print('Reading {} from cache store failed: {}'.format(key, e))
+            return None
+
+    def get(self, key, load, cache_if=None):
+        """
+        Returns the cached value for `key`, calls `load()` and caches its result if there is none or it expired.
+
+        Results for which `cache_if(value)` is false, e.g. partial ones, are returned without caching them.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if (entry is None or entry[0] <= self.clock()) and self.store is not None:
+            entry = self._stored(key)
+        if entry is not None and entry[0] > self.clock():
+            with self._lock:
+                self._entries[key] = entry
+            return entry[1]
+
+        value = load()
+        if cache_if is None or cache_if(value):
+            self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        expires_at = self.clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+        if self.store is not None:
+            try:
+                self.store.put(key, expires_at, value)
+            except Exception as e:
+                print('Writing {} to cache store failed: {}'.format(key, e))
+
+    def invalidate(self, key=None):
+        """Drops `key`, or all entries of this process if no key is given, from memory and `key` from the store."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+        if key is not None and self.store is not None:
+            self.store.delete(key)
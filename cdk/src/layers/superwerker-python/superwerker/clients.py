@@ -0,0 +1,61 @@
+"""
+boto3 clients and the HTTP connection pool shared by all invocations of an execution environment.
+
+Functions get their clients from here instead of creating default ones. A client is created once per service and
+region, so warm invocations reuse its open connections and the endpoints it already resolved instead of doing
+another TLS handshake.
+"""
+import socket
+import threading
+
+import boto3
+import urllib3
+from botocore.config import Config
+
+# botocore retries throttling, server and connection errors, adaptive mode also slows the client down while it is
+# throttled, superwerker.retry.throttling_back_off retries the errors botocore does not know to be transient
+RETRIES = {'mode': 'adaptive', 'max_attempts': 5}
+# a client is shared by all threads of a function, the biggest thread pool is the one of superwerker.inventory
+MAX_POOL_CONNECTIONS = 16
+
+CONFIG = Config(
+    retries=RETRIES,
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    connect_timeout=5,
+    read_timeout=60,
+)
+
+_clients = {}
+_lock = threading.Lock()
+_http = None
+
+
+def client(service_name, region_name=None, session=None):
+    """
+    Returns a client for `service_name` with `CONFIG`.
+
+    Clients of the default session are created once per service and region and shared by all callers. Clients of
+    `session`, e.g. with assumed role credentials, are not cached, whoever keeps the session keeps its clients.
+    """
+    if session is not None:
+        return session.client(service_name, region_name=region_name, config=CONFIG)
+    key = (service_name, region_name)
+    with _lock:
+        # creating clients is not thread safe, and the pool would be opened twice
+        if key not in _clients:
+            _clients[key] = boto3.client(service_name, region_name=region_name, config=CONFIG)
+        return _clients[key]
+
+
+def http():
+    """Returns the urllib3 pool manager shared by all invocations, e.g. to PUT the signal of a wait condition."""
+    global _http
+    with _lock:
+        if _http is None:
+            _http = urllib3.PoolManager(
+                retries=urllib3.Retry(total=3, backoff_factor=0.2),
+                timeout=urllib3.Timeout(connect=5, read=30),
+                socket_options=urllib3.connection.HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)],
+            )
+        return _http
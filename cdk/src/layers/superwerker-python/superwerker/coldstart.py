@@ -0,0 +1,272 @@
+"""
+Measures what importing the handler of each python Lambda function costs at cold start, in a fresh interpreter.
+
+Usage:
+    python -m superwerker.coldstart [PATH ...] [--repeat 5] [--top 5] [--json after.json] [--baseline before.json]
+
+A PATH is a function folder with an index.py, or a CloudFormation template whose python InlineCode and ZipFile
+blocks (also those of a nested StackSet TemplateBody) are measured one by one. Without paths all functions in
+cdk/src/functions and all templates in templates and cdk/src/stacks are measured. Inline code that runs commands or
+calls the network at import, like the `pip install` of SetupControlTowerCustomResource in control-tower.yaml, is
+skipped and reported as such, importing it would do the same on the machine measuring it.
+Each handler is imported `--repeat` times with `-X importtime`, the median run is reported with the modules that cost
+most. Run it in a virtualenv with the requirements_dev.txt of the functions installed, the superwerker package of this
+folder is put on the PYTHONPATH like the layer is in Lambda.
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from collections import namedtuple
+
+import yaml
+
+LAYER_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPOSITORY_ROOT = os.path.abspath(os.path.join(LAYER_DIRECTORY, '..', '..', '..', '..'))
+DEFAULT_PATHS = ['cdk/src/functions/*', 'templates/*.yaml', 'cdk/src/stacks/*.yaml']
+
+REPEAT = 5
+TOP = 5
+
+# handlers creating clients at import need a region
+REGION = 'eu-central-1'
+# values for the pseudo parameters in !Sub, other variables become their name
+PSEUDO_PARAMETERS = {'AWS::AccountId': '123456789012', 'AWS::Partition': 'aws', 'AWS::Region': REGION, 'AWS::URLSuffix': 'amazonaws.com'}
+
+# imports the handler like the Lambda runtime does and prints how many seconds it took
+IMPORT_HANDLER = 'import time; start = time.perf_counter(); import index; print(time.perf_counter() - start)'
+
+# CloudFormation adds the cfnresponse module to inline code, measured with the same imports
+CFNRESPONSE = 'import json\n\nimport urllib3\n'
+
+# calls that run commands or reach the network, inline code calling them at import is not measured
+SIDE_EFFECTS = ('subprocess.', 'os.system', 'os.popen', 'os.exec', 'os.spawn', 'urllib.request.urlopen', 'urllib3.request', 'requests.')
+# creating these clients and connection pools is fine, calling them at module level is a request
+CLIENT_FACTORIES = ('boto3.client', 'boto3.resource', 'boto3.session.Session', 'urllib3.PoolManager', 'requests.Session')
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+SUB_VARIABLE = re.compile(r'\$\{(!?)([^}]*)\}')
+
+# `directory` holds the index.py of a function folder, inline `code` is written to a temporary one
+Target = namedtuple('Target', ['name', 'directory', 'code'], defaults=[None, None])
+ImportRecord = namedtuple('ImportRecord', ['module', 'self_us', 'cumulative_us', 'depth'])
+
+
+class ImportFailed(Exception):
+    pass
+
+
+def parse_importtime(output, module='index'):
+    """Returns the records of `module` and of everything it imported from the -X importtime output of one interpreter."""
+    records = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append(ImportRecord(name, int(self_us), int(cumulative_us), len(indent) // 2))
+
+    # modules are printed after everything they imported, one level deeper
+    end = max(i for i, record in enumerate(records) if record.module == module and record.depth == 0)
+    start = end
+    while start > 0 and records[start - 1].depth > 0:
+        start -= 1
+    return records[start : end + 1]
+
+
+def _dotted(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        parent = _dotted(node.value)
+        return parent and parent + '.' + node.attr
+    if isinstance(node, ast.Call):
+        return _dotted(node.func)
+    return None
+
+
+def _module_level(tree):
+    """Yields the nodes of `tree` that run at import, i.e. not those in function bodies."""
+    nodes = list(tree.body)
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            # decorators and defaults still run at import
+            nodes.extend(node.args.defaults + node.args.kw_defaults + getattr(node, 'decorator_list', []))
+            continue
+        yield node
+        nodes.extend(ast.iter_child_nodes(node))
+
+
+def side_effect_at_import(code):
+    """Returns the first call of `code` running a command or reaching the network at import, or None."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    names = {}
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.update({alias.asname or alias.name.split('.')[0]: alias.name if alias.asname else alias.name.split('.')[0] for alias in node.names})
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.update({alias.asname or alias.name: node.module + '.' + alias.name for alias in node.names})
+
+    def qualified(node):
+        name = _dotted(node)
+        if name is None:
+            return None
+        root, _, rest = name.partition('.')
+        return names.get(root, root) + ('.' + rest if rest else '')
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call) and (qualified(node.value.func) or '').startswith(CLIENT_FACTORIES):
+            names.update({target.id: 'client:' for target in node.targets if isinstance(target, ast.Name)})
+
+    for node in _module_level(tree):
+        if isinstance(node, ast.Call):
+            name = qualified(node.func) or ''
+            if name.startswith(CLIENT_FACTORIES):
+                continue
+            if name.startswith(SIDE_EFFECTS) or name.startswith('client:'):
+                return _dotted(node.func)
+    return None
+
+
+def _substitute(template):
+    # the code only has to be importable, not deployable
+    return SUB_VARIABLE.sub(lambda m: '${' + m.group(2) + '}' if m.group(1) else PSEUDO_PARAMETERS.get(m.group(2), m.group(2)), template)
+
+
+class _TemplateLoader(yaml.SafeLoader):
+    """Reads CloudFormation templates, short form intrinsic functions are replaced by their argument."""
+
+
+def _intrinsic(loader, tag, node):
+    if isinstance(node, yaml.ScalarNode):
+        value = loader.construct_scalar(node)
+    elif isinstance(node, yaml.SequenceNode):
+        value = loader.construct_sequence(node, deep=True)
+    else:
+        value = loader.construct_mapping(node, deep=True)
+    if tag == 'Sub':
+        return _substitute(value if isinstance(value, str) else value[0])
+    return value
+
+
+_TemplateLoader.add_multi_constructor('!', _intrinsic)
+
+
+def inline_code_targets(template, name):
+    """Yields a Target per python function with inline code in `template`, including nested StackSet templates."""
+    template = template or {}
+    runtime = ((template.get('Globals') or {}).get('Function') or {}).get('Runtime', '')
+    for logical_id, resource in sorted((template.get('Resources') or {}).items()):
+        properties = resource.get('Properties') or {}
+        if isinstance(properties.get('TemplateBody'), str):
+            nested = yaml.load(properties['TemplateBody'], Loader=_TemplateLoader)
+            yield from inline_code_targets(nested, '{}/{}'.format(name, logical_id))
+            continue
+        code = properties.get('InlineCode') or (properties.get('Code') or {}).get('ZipFile')
+        if isinstance(code, str) and str(properties.get('Runtime', runtime)).startswith('python'):
+            yield Target('{}/{}'.format(name, logical_id), code=code)
+
+
+def targets(paths, root=REPOSITORY_ROOT):
+    for pattern in paths:
+        for path in sorted(glob.glob(os.path.join(root, pattern))):
+            name = os.path.relpath(path, root)
+            if os.path.isfile(os.path.join(path, 'index.py')):
+                yield Target(name, directory=path)
+            elif path.endswith(('.yaml', '.yml')):
+                with open(path) as f:
+                    yield from inline_code_targets(yaml.load(f, Loader=_TemplateLoader), name)
+
+
+def _import_handler(directory, python):
+    env = dict(os.environ, PYTHONPATH=LAYER_DIRECTORY)
+    env.setdefault('AWS_DEFAULT_REGION', REGION)
+    result = subprocess.run([python, '-X', 'importtime', '-c', IMPORT_HANDLER], cwd=directory, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not IMPORT_TIME_LINE.match(line)]
+        raise ImportFailed(errors[-1] if errors else 'exit code {}'.format(result.returncode))
+    return float(result.stdout.split()[-1]), parse_importtime(result.stderr)
+
+
+def profile(target, repeat=REPEAT, python=sys.executable):
+    """
+    Imports the handler of `target` `repeat` times, each in a fresh interpreter, and returns the median run.
+
+    `Modules` and `Packages` hold the self time in microseconds of every module the handler imported, and of every top
+    level package summed up.
+    """
+    if target.code is not None and side_effect_at_import(target.code):
+        return {'Skipped': 'calls {} at import'.format(side_effect_at_import(target.code))}
+
+    with tempfile.TemporaryDirectory() as directory:
+        if target.code is not None:
+            for module, code in (('index', target.code), ('cfnresponse', CFNRESPONSE)):
+                with open(os.path.join(directory, module + '.py'), 'w') as f:
+                    f.write(code)
+        try:
+            runs = sorted((_import_handler(target.directory or directory, python) for _ in range(repeat)), key=lambda run: run[0])
+        except ImportFailed as e:
+            return {'Error': str(e)}
+
+    seconds, records = runs[(len(runs) - 1) // 2]
+    packages = {}
+    for record in records:
+        package = record.module.split('.')[0]
+        packages[package] = packages.get(package, 0) + record.self_us
+    return {
+        'Seconds': seconds,
+        'Runs': [run[0] for run in runs],
+        'Modules': {record.module: record.self_us for record in records},
+        'Packages': packages,
+    }
+
+
+def format_profile(name, result, baseline=None, top=TOP):
+    if 'Error' in result:
+        return '{}: failed, {}'.format(name, result['Error'])
+    if 'Skipped' in result:
+        return '{}: skipped, {}'.format(name, result['Skipped'])
+    line = '{}: {:.1f} ms'.format(name, result['Seconds'] * 1000)
+    if baseline and 'Seconds' in baseline:
+        line += ' ({:+.1f} ms)'.format((result['Seconds'] - baseline['Seconds']) * 1000)
+    packages = sorted(result['Packages'].items(), key=lambda item: -item[1])[:top]
+    return line + ''.join('\n    {:<30} {:8.1f} ms'.format(package, us / 1000) for package, us in packages)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Measures the cold start imports of the python Lambda functions.')
+    parser.add_argument('paths', nargs='*', help='function folders or templates, relative to --root')
+    parser.add_argument('--root', default=REPOSITORY_ROOT, help='defaults to the repository of this file')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='fresh interpreters per handler')
+    parser.add_argument('--top', type=int, default=TOP, help='packages listed per handler')
+    parser.add_argument('--json', help='writes the report to this file')
+    parser.add_argument('--baseline', help='report of an earlier run to compare with')
+    args = parser.parse_args(args)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report = {}
+    for target in targets(args.paths or DEFAULT_PATHS, args.root):
+        report[target.name] = profile(target, args.repeat)
+        print(format_profile(target.name, report[target.name], baseline.get(target.name), args.top))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if any('Error' in result for result in report.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
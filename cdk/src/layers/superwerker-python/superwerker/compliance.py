@@ -0,0 +1,140 @@
+"""
+Evaluates the superwerker:backup tag rules over a whole resource inventory at once.
+
+The backup conformance pack checks every resource with one REQUIRED_TAGS Config rule per resource type. This module
+applies the same rules, or the ones of an effective tag policy, to a columnar inventory with NumPy, so hundreds of
+thousands of resources are judged in one pass.
+
+It is meant for offline analysis, NumPy comes with requirements_dev.txt and is not deployed with the lambda layer.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+BACKUP_TAG_KEY = 'superwerker:backup'
+
+COMPLIANT = 'COMPLIANT'
+NON_COMPLIANT = 'NON_COMPLIANT'
+NOT_APPLICABLE = 'NOT_APPLICABLE'
+
+# resource types as used by the enforced_for of tag policies, with the Config types of the conformance pack rules
+RESOURCE_TYPES = {
+    'dynamodb:table': 'AWS::DynamoDB::Table',
+    'ec2:volume': 'AWS::EC2::Volume',
+    'rds:db': 'AWS::RDS::DBInstance',
+}
+
+TagRule = namedtuple('TagRule', ['tag_key', 'allowed_values', 'resource_types'])
+
+# the rules of the backup conformance pack, see src/stacks/backup-organization-conformance-pack.yaml
+BACKUP_TAG_RULE = TagRule(BACKUP_TAG_KEY, ('daily', 'none'), tuple(RESOURCE_TYPES))
+
+
+def rule_from_tag_policy(effective_policy, tag_key=BACKUP_TAG_KEY):
+    """Returns the rule an effective tag policy (see superwerker.effective_policy) defines for `tag_key`."""
+    tag = effective_policy.get('tags', {}).get(tag_key, {})
+    return TagRule(tag.get('tag_key', tag_key), tuple(tag.get('tag_value', ())), tuple(tag.get('enforced_for', ())))
+
+
+def resource_type(arn):
+    """Returns the tag policy resource type of an ARN, e.g. `ec2:volume` or `rds:db`."""
+    parts = arn.split(':', 5)
+    resource = parts[5]
+    separator = '/' if '/' in resource.split(':')[0] else ':'
+    return '{}:{}'.format(parts[2], resource.split(separator)[0])
+
+
+def _tags(tags):
+    if isinstance(tags, dict):
+        return tags
+    return {tag['Key']: tag['Value'] for tag in tags or []}
+
+
+def _encode(values):
+    """Returns integer codes and the distinct values they index, None is encoded as -1."""
+    categories = {}
+    codes = np.fromiter(
+        (-1 if value is None else categories.setdefault(value, len(categories)) for value in values), dtype=np.int32, count=len(values)
+    )
+    return codes, tuple(categories)
+
+
+def _codes_of(categories, wanted):
+    return np.array([code for code, value in enumerate(categories) if value in wanted], dtype=np.int32)
+
+
+class Inventory(namedtuple('Inventory', ['arns', 'resource_types', 'tag_values'])):
+    """
+    Resources as columns of equal length: ARN, tag policy resource type and the values of the evaluated tag keys.
+
+    Resource types and tag values are dictionary encoded, i.e. `resource_types` is a pair of an int32 array and the
+    distinct types it indexes, `tag_values` maps each tag key to such a pair with -1 where the resource lacks the tag.
+    """
+
+    @classmethod
+    def from_records(cls, records, tag_keys=(BACKUP_TAG_KEY,)):
+        """
+        Builds the columns from records like the ones of the Resource Groups Tagging API, i.e. dicts with
+        `ResourceARN` and `Tags` as list of Key/Value or as plain dict. `ResourceType` is derived from the ARN if absent.
+        """
+        arns = []
+        types = []
+        values = {key: [] for key in tag_keys}
+        for record in records:
+            arn = record['ResourceARN']
+            tags = _tags(record.get('Tags'))
+            arns.append(arn)
+            types.append(record.get('ResourceType') or resource_type(arn))
+            for key in tag_keys:
+                values[key].append(tags.get(key))
+        return cls(
+            np.array(arns, dtype=object),
+            _encode(types),
+            {key: _encode(column) for key, column in values.items()},
+        )
+
+    def __len__(self):
+        return len(self.arns)
+
+
+STATUSES = (COMPLIANT, NON_COMPLIANT, NOT_APPLICABLE)
+
+
+class ComplianceReport(namedtuple('ComplianceReport', ['inventory', 'rule', 'status'])):
+    """The result of `evaluate`, `status` holds an index into STATUSES per resource."""
+
+    def statuses(self):
+        return [STATUSES[code] for code in self.status]
+
+    def arns(self, status=NON_COMPLIANT):
+        return self.inventory.arns[self.status == STATUSES.index(status)].tolist()
+
+    def summary(self):
+        """Returns {resource type: {status: count}} for all resource types of the inventory."""
+        codes, types = self.inventory.resource_types
+        counts = np.bincount(codes * len(STATUSES) + self.status, minlength=len(types) * len(STATUSES))
+        summary = {}
+        for index in np.flatnonzero(counts):
+            resource, status = divmod(int(index), len(STATUSES))
+            summary.setdefault(types[resource], {})[STATUSES[status]] = int(counts[index])
+        return summary
+
+
+def evaluate(inventory, rule=BACKUP_TAG_RULE):
+    """
+    Judges every resource of the inventory against `rule` in one vectorized pass.
+
+    Resources of other types than `rule.resource_types` are NOT_APPLICABLE, `<service>:ALL_SUPPORTED` matches all types
+    of a service like in tag policies. Resources of a matching type need the tag with one of the allowed values.
+    """
+    type_codes, types = inventory.resource_types
+    in_scope_types = [t for t in types if t in rule.resource_types or t.split(':')[0] + ':ALL_SUPPORTED' in rule.resource_types]
+    in_scope = np.isin(type_codes, _codes_of(types, in_scope_types))
+
+    value_codes, values = inventory.tag_values[rule.tag_key]
+    valid = np.isin(value_codes, _codes_of(values, rule.allowed_values))
+
+    status = np.full(len(inventory), STATUSES.index(NOT_APPLICABLE), dtype=np.int64)
+    status[in_scope] = STATUSES.index(NON_COMPLIANT)
+    status[in_scope & valid] = STATUSES.index(COMPLIANT)
+    return ComplianceReport(inventory, rule, status)
@@ -0,0 +1,60 @@
+"""
+Reads the `/superwerker` SSM parameters as a whole.
+
+One paginated `get_parameters_by_path` returns every parameter, so a consumer needs one call (a page holds 10
+parameters) on start instead of one `get_parameter` per value, and none on warm invocations within the TTL.
+"""
+import time
+
+from superwerker.cache import TTLCache
+from superwerker.clients import client
+from superwerker.retry import throttling_back_off
+
+PATH = '/superwerker'
+# entries of superwerker.cache stores are no configuration, and can be many
+EXCLUDED_PATHS = ('/superwerker/cache/',)
+TTL = 300
+ACCOUNT_ID_PARAMETER = '/superwerker/account_id_{}'
+
+
+def read_parameters(ssm, path=PATH):
+    """Returns name and value of all parameters below `path`, except the ones below `EXCLUDED_PATHS`."""
+    parameters = {}
+    for page in ssm.get_paginator('get_parameters_by_path').paginate(Path=path, Recursive=True):
+        for parameter in page['Parameters']:
+            if not parameter['Name'].startswith(EXCLUDED_PATHS):
+                parameters[parameter['Name']] = parameter['Value']
+    return parameters
+
+
+def account_id_parameter(account_name):
+    """Returns the parameter of the account id, e.g. `/superwerker/account_id_logarchive` for `Log Archive`."""
+    return ACCOUNT_ID_PARAMETER.format(account_name.lower().replace(' ', ''))
+
+
+class ConfigReader:
+    """Keeps the `/superwerker` parameters for `ttl` seconds, shared by all invocations of an execution environment."""
+
+    def __init__(self, path=PATH, ttl=TTL, ssm=None, clock=time.time):
+        self.path = path
+        self._ssm = ssm
+        self._cache = TTLCache(ttl, clock=clock)
+
+    @property
+    def ssm(self):
+        if self._ssm is None:
+            self._ssm = client('ssm')
+        return self._ssm
+
+    def parameters(self):
+        return self._cache.get(self.path, lambda: throttling_back_off(lambda: read_parameters(self.ssm, self.path)))
+
+    def get(self, name, default=None):
+        return self.parameters().get(name, default)
+
+    def account_id(self, account_name):
+        return self.get(account_id_parameter(account_name))
+
+    def invalidate(self):
+        self._cache.invalidate()
+
@@ -0,0 +1,254 @@
+"""
+Computes effective tag and backup policies locally from a snapshot of the organization.
+
+Usage:
+    python -m superwerker.effective_policy TAG_POLICY [--snapshot snapshot.json] [--target ID ...] [--plan event.json]
+
+With `--plan` the custom resource event of a policy handler (e.g. copied from its logs) is applied to the snapshot
+and only the roots, OUs and accounts whose effective policy would change are printed. Nothing is written.
+"""
+import argparse
+import json
+import sys
+from collections import namedtuple
+
+from superwerker.organizations import CREATE, DELETE, UPDATE, Organization
+from superwerker.retry import throttling_back_off
+
+ASSIGN = '@@assign'
+APPEND = '@@append'
+REMOVE = '@@remove'
+CHILD_OPERATORS = '@@operators_allowed_for_child_policies'
+ALL = '@@all'
+NONE = '@@none'
+
+VALUE_OPERATORS = (ASSIGN, APPEND, REMOVE)
+
+_MISSING = object()
+
+
+class OrganizationSnapshot(namedtuple('OrganizationSnapshot', ['root_id', 'parents', 'documents'])):
+    """
+    The organization tree and the policies of one type attached to it.
+
+    `parents` maps every OU and account id to the id of its parent, `documents` maps target ids to
+    {policy id: policy content} of the policies attached to that target.
+    """
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['RootId'], data['Parents'], data['Documents'])
+
+    def to_json(self):
+        return {'RootId': self.root_id, 'Parents': self.parents, 'Documents': self.documents}
+
+    def targets(self):
+        return [self.root_id] + sorted(self.parents)
+
+
+def snapshot(organization, policy_type):
+    """Reads the organization tree and all policies of `policy_type` with their attachments."""
+    client = organization.client
+    root_id = organization.root_id()
+    parents = {}
+    pending = [root_id]
+    while pending:
+        parent_id = pending.pop()
+        for child_type in ['ORGANIZATIONAL_UNIT', 'ACCOUNT']:
+            paginator = client.get_paginator('list_children')
+            pages = throttling_back_off(lambda: list(paginator.paginate(ParentId=parent_id, ChildType=child_type)))
+            for child in [c for page in pages for c in page['Children']]:
+                parents[child['Id']] = parent_id
+                if child_type == 'ORGANIZATIONAL_UNIT':
+                    pending.append(child['Id'])
+
+    documents = {}
+    for policy in organization.list_policies(policy_type):
+        content = organization.describe_policy(policy['Id'])['Content']
+        for target_id in organization.attachments.targets_for_policy(policy['Id']):
+            documents.setdefault(target_id, {})[policy['Id']] = content
+    return OrganizationSnapshot(root_id, parents, documents)
+
+
+def _node(allowed):
+    return {'allowed': allowed, 'next_allowed': allowed, 'value': _MISSING, 'children': {}}
+
+
+def _allowed_operators(value):
+    if value == [ALL] or value == ALL:
+        return frozenset(VALUE_OPERATORS)
+    if value == [NONE] or value == NONE:
+        return frozenset()
+    return frozenset(value)
+
+
+def _apply_value(current, operator, value):
+    if operator == ASSIGN:
+        return value
+    existing = current if isinstance(current, list) else []
+    values = value if isinstance(value, list) else [value]
+    if operator == APPEND:
+        return existing + [v for v in values if v not in existing]
+    return [v for v in existing if v not in values]
+
+
+def _merge(node, document):
+    """
+    Returns a copy of `node` with `document` applied, leaving `node` untouched.
+
+    Operators are checked against the `allowed` set inherited from the levels above, operators a parent does not allow
+    for child policies are ignored like Organizations does.
+    """
+    merged = dict(node, children=dict(node['children']))
+    for operator in VALUE_OPERATORS:
+        if operator in document and operator in node['allowed']:
+            merged['value'] = _apply_value(merged['value'], operator, document[operator])
+    if CHILD_OPERATORS in document:
+        merged['next_allowed'] = merged['next_allowed'] & _allowed_operators(document[CHILD_OPERATORS])
+
+    for key, value in document.items():
+        if key.startswith('@@') or not isinstance(value, dict):
+            continue
+        child = merged['children'].get(key) or _node(node['allowed'])
+        merged['children'][key] = _merge(child, value)
+    return merged
+
+
+def _restrict(node, parent_allowed):
+    """Hands restrictions set by the policies of one level down to the key paths below them."""
+    allowed = node['next_allowed'] & parent_allowed
+    return dict(
+        node,
+        allowed=allowed,
+        next_allowed=allowed,
+        children={key: _restrict(child, allowed) for key, child in node['children'].items()},
+    )
+
+
+def apply_level(node, documents):
+    """Applies the documents attached to one root, OU or account on top of what it inherits."""
+    if not documents:
+        return node
+    for document in documents:
+        node = _merge(node, document)
+    return _restrict(node, frozenset(VALUE_OPERATORS))
+
+
+def render(node):
+    """Returns the effective policy of an intermediate result, i.e. the values without operators."""
+    if node['value'] is not _MISSING:
+        return node['value']
+    rendered = {}
+    for key, child in node['children'].items():
+        value = render(child)
+        if value is not None:
+            rendered[key] = value
+    return rendered or None
+
+
+class EffectivePolicyEvaluator:
+    """
+    Evaluates the effective policy of any root, OU or account of a snapshot.
+
+    Intermediate results of the root and OUs are cached, so every account costs a single merge of the policies
+    attached to it directly. Results are shared between targets and must not be modified.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._parent_ids = set(snapshot.parents.values()) | {snapshot.root_id}
+        self._documents = {}
+        self._nodes = {}
+        self._effective = {}
+
+    def _parsed(self, target_id):
+        parsed = []
+        for policy_id, content in sorted(self.snapshot.documents.get(target_id, {}).items()):
+            if policy_id not in self._documents:
+                self._documents[policy_id] = json.loads(content)
+            parsed.append(self._documents[policy_id])
+        return parsed
+
+    def _node(self, target_id):
+        path = []
+        while target_id is not None and target_id not in self._nodes:
+            path.append(target_id)
+            target_id = self.snapshot.parents.get(target_id)
+        node = self._nodes[target_id] if target_id is not None else _node(frozenset(VALUE_OPERATORS))
+        for target_id in reversed(path):
+            node = apply_level(node, self._parsed(target_id))
+            if target_id in self._parent_ids:
+                self._nodes[target_id] = node
+        return node
+
+    def effective(self, target_id):
+        if target_id in self._effective:
+            return self._effective[target_id]
+        if target_id not in self._parent_ids and target_id not in self.snapshot.parents:
+            raise KeyError('{} is not part of the snapshot'.format(target_id))
+        if target_id not in self._parent_ids and not self.snapshot.documents.get(target_id):
+            return self.effective(self.snapshot.parents[target_id])
+        effective = render(self._node(target_id)) or {}
+        if target_id in self._parent_ids:
+            self._effective[target_id] = effective
+        return effective
+
+    def effective_all(self, target_ids=None):
+        return {target_id: self.effective(target_id) for target_id in target_ids or self.snapshot.targets()}
+
+
+def planned_snapshot(snapshot, event):
+    """Returns the snapshot as it would be after a policy handler processed the custom resource `event`."""
+    request_type = event['RequestType']
+    policy_id = event.get('PhysicalResourceId')
+    properties = event.get('ResourceProperties', {})
+    documents = {target_id: dict(policies) for target_id, policies in snapshot.documents.items()}
+
+    if request_type == CREATE and properties.get('Attach') == 'true':
+        documents.setdefault(snapshot.root_id, {})['planned'] = properties['Policy']
+    elif request_type == UPDATE:
+        for policies in documents.values():
+            if policy_id in policies:
+                policies[policy_id] = properties['Policy']
+    elif request_type == DELETE:
+        for policies in documents.values():
+            policies.pop(policy_id, None)
+    return snapshot._replace(documents=documents)
+
+
+def plan(snapshot, event, target_ids=None):
+    """Returns {target id: {'Before': ..., 'After': ...}} for all targets whose effective policy `event` changes."""
+    before = EffectivePolicyEvaluator(snapshot)
+    after = EffectivePolicyEvaluator(planned_snapshot(snapshot, event))
+    changes = {}
+    for target_id in target_ids or snapshot.targets():
+        if before.effective(target_id) != after.effective(target_id):
+            changes[target_id] = {'Before': before.effective(target_id), 'After': after.effective(target_id)}
+    return changes
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Computes effective tag and backup policies without calling AWS per account.')
+    parser.add_argument('policy_type', choices=['TAG_POLICY', 'BACKUP_POLICY'])
+    parser.add_argument('--snapshot', help='snapshot JSON to use instead of reading the organization')
+    parser.add_argument('--target', action='append', help='root, OU or account id, defaults to all')
+    parser.add_argument('--plan', metavar='EVENT', help='custom resource event JSON of a policy handler to plan')
+    args = parser.parse_args(args)
+
+    if args.snapshot:
+        with open(args.snapshot) as f:
+            organization_snapshot = OrganizationSnapshot.from_json(json.load(f))
+    else:
+        organization_snapshot = snapshot(Organization(), args.policy_type)
+
+    if args.plan:
+        with open(args.plan) as f:
+            result = plan(organization_snapshot, json.load(f), args.target)
+    else:
+        result = EffectivePolicyEvaluator(organization_snapshot).effective_all(args.target)
+    json.dump(result, sys.stdout, indent=2, sort_keys=True)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Answers repeated deliveries of a custom resource request with the result of the first one.
+
+CloudFormation and the provider framework retry requests, e.g. after a timeout, although the handler may already
+have done the work. Requests are kept per StackId, LogicalResourceId and RequestId, in the table of
+REQUEST_RESULTS_TABLE (see `CustomResourceResults` in src/constructs) or, without it, in memory of the execution
+environment.
+
+The first delivery writes an in progress marker before it runs the handler, only if there is none yet, and replaces it
+with the result. A delivery finding the marker waits for that result. A marker outlives its delivery only if that one
+crashed or timed out, it expires with the time the delivery had left, and the next delivery runs the handler again.
+Failed requests are not kept, their retries run again. Errors of the table are raised, a missing table or permission
+must not silently run a request twice.
+"""
+import functools
+import hashlib
+import os
+import time
+import uuid
+
+from superwerker.cache import DynamoDBStore, InMemoryStore
+
+CREATE = 'Create'
+
+REQUEST_RESULTS_TABLE_ENV = 'REQUEST_RESULTS_TABLE'
+# CloudFormation waits an hour for a custom resource, the provider framework up to two
+RESULT_TTL = 2 * 3600
+# lifetime of an in progress marker without a Lambda context, the longest a function can run
+IN_PROGRESS_TTL = 900
+# seconds between reads while another delivery runs the request
+POLL_INTERVAL = 2
+
+IN_PROGRESS = 'InProgress'
+DONE = 'Done'
+
+
+def request_key(event):
+    """Returns the key of the request, the same for all deliveries of it."""
+    request = '{}/{}/{}'.format(event['StackId'], event['LogicalResourceId'], event['RequestId'])
+    return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+
+def result_store():
+    """Returns the store of the table configured by REQUEST_RESULTS_TABLE, an in memory one if it is not set."""
+    table_name = os.environ.get(REQUEST_RESULTS_TABLE_ENV)
+    return DynamoDBStore(table_name) if table_name else InMemoryStore()
+
+
+def _remaining_seconds(context):
+    if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+        return IN_PROGRESS_TTL
+    return context.get_remaining_time_in_millis() / 1000
+
+
+def idempotent(request_types=(CREATE,), store=None, clock=time.time, sleep=time.sleep):
+    """
+    Decorates a custom resource handler to run once per request of one of `request_types`, e.g. an expensive Create.
+
+    Other requests, and events without a RequestId, are passed through. Results must be JSON serializable.
+    """
+
+    def decorate(handler):
+        stores = []
+
+        def run(store, key, event, context):
+            try:
+                result = handler(event, context)
+            except Exception:
+                try:
+                    store.delete(key)
+                except Exception as e:
+                    # the marker expires with the delivery, the error of the handler is the one to raise
+                    print('Deleting the in progress marker of request {} failed: {}'.format(event['RequestId'], e))
+                raise
+            store.put(key, clock() + RESULT_TTL, {'Status': DONE, 'Result': result})
+            return result
+
+        @functools.wraps(handler)
+        def handle(event, context):
+            if event.get('RequestType') not in request_types or 'RequestId' not in event:
+                return handler(event, context)
+            if not stores:
+                stores.append(store or result_store())
+            key = request_key(event)
+            token = str(uuid.uuid4())
+            waited = False
+            expired = False
+
+            while True:
+                marker = {'Status': IN_PROGRESS, 'Token': token}
+                if stores[0].add(key, clock() + _remaining_seconds(context), marker):
+                    return run(stores[0], key, event, context)
+                entry = stores[0].get(key)
+                if entry is None or entry[0] <= clock():
+                    # the other delivery failed or its marker expired, this one runs the request. The store may see
+                    # the marker as not expired yet, e.g. comparing whole seconds of its own clock, so it is not hammered
+                    if expired:
+                        sleep(POLL_INTERVAL)
+                    expired = True
+                    continue
+                if entry[1].get('Token') == token:
+                    # the write of the marker was retried after it went through
+                    return run(stores[0], key, event, context)
+                if entry[1]['Status'] == DONE:
+                    print('Returning the result of the earlier delivery of request {}'.format(event['RequestId']))
+                    return entry[1]['Result']
+                if not waited:
+                    print('Waiting for the earlier delivery of request {} to finish'.format(event['RequestId']))
+                    waited = True
+                sleep(POLL_INTERVAL)
+
+        return handle
+
+    return decorate
@@ -0,0 +1,127 @@
+"""
+Keeps inline code of the templates in sync with the function modules it was extracted to.
+
+Usage:
+    python -m superwerker.inline_code [--update]
+
+An InlineCode or ZipFile block starting with `# source: <path>` has to equal the module at that path, relative to the
+repository root. Drifted blocks are listed with a diff and the exit code is 1, the layer tests run the same check so
+`yarn test` fails. `--update` rewrites the blocks from their modules instead.
+Modules must not contain `${`, CloudFormation would substitute it in blocks that are part of a `!Sub` string.
+"""
+import argparse
+import difflib
+import glob
+import os
+import re
+import sys
+from collections import namedtuple
+
+from superwerker.coldstart import REPOSITORY_ROOT
+
+TEMPLATES = ['templates/*.yaml', 'cdk/src/stacks/*.yaml']
+
+CODE_KEY = re.compile(r'^( *)(InlineCode|ZipFile): *(!Sub +)?\|-? *(#.*)?$')
+SOURCE_MARKER = re.compile(r'^# source: (\S+)$')
+
+# lines[start:end] of `template` hold the block, `source` is the module of the marker or None
+InlineBlock = namedtuple('InlineBlock', ['template', 'start', 'end', 'indent', 'source', 'code'])
+
+
+def _indent(line):
+    return len(line) - len(line.lstrip(' '))
+
+
+def inline_blocks(template, lines):
+    for i, line in enumerate(lines):
+        match = CODE_KEY.match(line)
+        if not match:
+            continue
+        end = i + 1
+        while end < len(lines) and (not lines[end].strip() or _indent(lines[end]) > len(match.group(1))):
+            end += 1
+        while end > i + 1 and not lines[end - 1].strip():
+            end -= 1
+        if end == i + 1:
+            continue
+
+        indent = _indent(lines[i + 1])
+        code = [l[indent:] for l in lines[i + 1 : end]]
+        source = SOURCE_MARKER.match(code[0])
+        yield InlineBlock(template, i + 1, end, indent, source and source.group(1), '\n'.join(code[1:] if source else code) + '\n')
+
+
+def _module(root, block):
+    with open(os.path.join(root, block.source)) as f:
+        module = f.read()
+    if '${' in module:
+        raise ValueError('{} contains ${{, which CloudFormation would substitute'.format(block.source))
+    return module
+
+
+def _templates(root, patterns):
+    for pattern in patterns:
+        for path in sorted(glob.glob(os.path.join(root, pattern))):
+            with open(path) as f:
+                yield os.path.relpath(path, root), f.read().split('\n')
+
+
+def check(root=REPOSITORY_ROOT, patterns=TEMPLATES):
+    """Returns a diff per block that does not equal its module."""
+    drifted = []
+    for template, lines in _templates(root, patterns):
+        for block in inline_blocks(template, lines):
+            if block.source is None:
+                continue
+            module = _module(root, block)
+            if block.code.rstrip('\n') != module.rstrip('\n'):
+                diff = difflib.unified_diff(
+                    module.splitlines(),
+                    block.code.splitlines(),
+                    block.source,
+                    '{}:{}'.format(template, block.start + 1),
+                    lineterm='',
+                )
+                drifted.append('\n'.join(diff))
+    return drifted
+
+
+def update(root=REPOSITORY_ROOT, patterns=TEMPLATES):
+    """Rewrites every block with a source marker from its module, returns the templates that changed."""
+    changed = []
+    for template, lines in _templates(root, patterns):
+        updated = list(lines)
+        # from the bottom, so the line numbers of the blocks above stay valid
+        for block in reversed(list(inline_blocks(template, lines))):
+            if block.source is None:
+                continue
+            code = ['# source: {}'.format(block.source)] + _module(root, block).rstrip('\n').split('\n')
+            updated[block.start : block.end] = [' ' * block.indent + l if l else '' for l in code]
+            # the code does not use any variables
+            updated[block.start - 1] = re.sub(r'!Sub +\|', '|', updated[block.start - 1])
+        if updated != lines:
+            with open(os.path.join(root, template), 'w') as f:
+                f.write('\n'.join(updated))
+            changed.append(template)
+    return changed
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Checks that inline code of the templates equals its function modules.')
+    parser.add_argument('--update', action='store_true', help='rewrites the inline code from the modules')
+    args = parser.parse_args(args)
+
+    if args.update:
+        for template in update():
+            print('updated {}'.format(template))
+        return
+
+    drifted = check()
+    for diff in drifted:
+        print(diff)
+    if drifted:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
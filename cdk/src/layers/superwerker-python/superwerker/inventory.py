@@ -0,0 +1,190 @@
+"""
+Streams DynamoDB tables, EBS volumes and RDS instances of all accounts and regions with their tags as NDJSON.
+
+Usage:
+    python -m superwerker.inventory [--account ID ...] [--region REGION ...] [--concurrency 16] > inventory.ndjson
+
+Accounts default to all active accounts of the organization, regions to the ones enabled in the management account.
+Every record is written as soon as its page is read, so it can be piped into e.g. `python -m superwerker.remediation -`.
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+from superwerker.clients import CONFIG
+from superwerker.retry import throttling_back_off
+from superwerker.sessions import CONTROL_TOWER_EXECUTION_ROLE, SessionPool, assumed_role_session, caller_account_id
+
+CONCURRENCY = 16
+# records buffered between the scanning threads and the consumer, scanning threads wait while it is full
+QUEUE_SIZE = 1000
+
+# more attempts than the shared config, see _pages
+CLIENT_CONFIG = CONFIG.merge(Config(retries={'mode': 'adaptive', 'max_attempts': 10}))
+
+_DONE = object()
+
+
+def _pages(client, operation, **kwargs):
+    # a page iterator can not be resumed after an error, throttling is retried by the client, see CLIENT_CONFIG
+    return client.get_paginator(operation).paginate(**kwargs)
+
+
+def _tags(tags):
+    return {tag['Key']: tag['Value'] for tag in tags or []}
+
+
+def dynamodb_tables(client, partition, account_id, region):
+    for page in _pages(client, 'list_tables'):
+        for name in page['TableNames']:
+            arn = 'arn:{}:dynamodb:{}:{}:table/{}'.format(partition, region, account_id, name)
+            tags = [t for tags_page in _pages(client, 'list_tags_of_resource', ResourceArn=arn) for t in tags_page['Tags']]
+            yield {'ResourceARN': arn, 'ResourceType': 'dynamodb:table', 'Tags': _tags(tags)}
+
+
+def ebs_volumes(client, partition, account_id, region):
+    for page in _pages(client, 'describe_volumes'):
+        for volume in page['Volumes']:
+            arn = 'arn:{}:ec2:{}:{}:volume/{}'.format(partition, region, account_id, volume['VolumeId'])
+            yield {'ResourceARN': arn, 'ResourceType': 'ec2:volume', 'Tags': _tags(volume.get('Tags'))}
+
+
+def rds_instances(client, partition, account_id, region):
+    for page in _pages(client, 'describe_db_instances'):
+        for instance in page['DBInstances']:
+            yield {'ResourceARN': instance['DBInstanceArn'], 'ResourceType': 'rds:db', 'Tags': _tags(instance.get('TagList'))}
+
+
+# service of the client and the function listing its resources
+SCANNERS = [('dynamodb', dynamodb_tables), ('ec2', ebs_volumes), ('rds', rds_instances)]
+
+
+class InventoryScanner:
+    """
+    Scans accounts and regions on a thread pool and hands out the records through a bounded queue.
+
+    `session_factory(account_id)` returns a boto3 session for the account, it is called once per account and again
+    before the credentials expire during long scans. Failures of an account, region and service, whatever the
+    exception, are collected in `errors` and do not stop the scan.
+    """
+
+    def __init__(self, session_factory, scanners=SCANNERS, concurrency=CONCURRENCY, queue_size=QUEUE_SIZE):
+        self.session_factory = session_factory
+        self.scanners = scanners
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.errors = []
+        self._sessions = SessionPool()
+        self._lock = threading.Lock()
+
+    def _session(self, account_id):
+        return self._sessions.get(account_id, lambda: self.session_factory(account_id))
+
+    def _scan(self, account_id, region, scanner, records, stopped):
+        service, resources = scanner
+        try:
+            session = self._session(account_id)
+            # creating clients from a shared session is not thread safe
+            with self._lock:
+                client = session.client(service, region_name=region, config=CLIENT_CONFIG)
+                partition = session.get_partition_for_region(region)
+            for record in resources(client, partition, account_id, region):
+                if stopped.is_set():
+                    return
+                self._put(records, dict(record, AccountId=account_id, Region=region), stopped)
+        except (BotoCoreError, ClientError) as e:
+            self._failed(account_id, region, scanner, e)
+
+    def _failed(self, account_id, region, scanner, e):
+        print('Scanning {} in {}/{} failed: {}'.format(scanner[1].__name__, account_id, region, e), file=sys.stderr)
+        self.errors.append({'AccountId': account_id, 'Region': region, 'Scanner': scanner[1].__name__, 'Error': str(e)})
+
+    def _put(self, records, record, stopped):
+        while not stopped.is_set():
+            try:
+                records.put(record, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _finish(self, futures, records, stopped):
+        wait(futures)
+        # anything else _scan raised, e.g. a bug in a scanner or session factory, would be dropped with its future
+        for future, (account_id, region, scanner) in futures.items():
+            if not future.cancelled() and future.exception() is not None:
+                self._failed(account_id, region, scanner, future.exception())
+        self._put(records, _DONE, stopped)
+
+    def scan(self, account_ids, regions):
+        """Yields the records of all accounts and regions while they are still being scanned."""
+        records = queue.Queue(maxsize=self.queue_size)
+        stopped = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        futures = {
+            executor.submit(self._scan, account_id, region, scanner, records, stopped): (account_id, region, scanner)
+            for account_id in account_ids
+            for region in regions
+            for scanner in self.scanners
+        }
+        threading.Thread(target=self._finish, args=(futures, records, stopped), daemon=True).start()
+        try:
+            while True:
+                record = records.get()
+                if record is _DONE:
+                    return
+                yield record
+        finally:
+            stopped.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def organization_account_ids(session):
+    paginator = session.client('organizations').get_paginator('list_accounts')
+    return [a['Id'] for page in paginator.paginate() for a in page['Accounts'] if a['Status'] == 'ACTIVE']
+
+
+def enabled_regions(session):
+    return sorted(r['RegionName'] for r in throttling_back_off(session.client('ec2').describe_regions)['Regions'])
+
+
+def read_ndjson(lines):
+    """Yields the records of NDJSON lines, e.g. of an inventory file or stdin while it is still being written."""
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def write_ndjson(records, out):
+    for record in records:
+        out.write(json.dumps(record, sort_keys=True) + '\n')
+        out.flush()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Streams backup relevant resources of all accounts and regions as NDJSON.')
+    parser.add_argument('--account', action='append', help='account id, defaults to all active accounts')
+    parser.add_argument('--region', action='append', help='region, defaults to the regions enabled in this account')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--role-name', default=CONTROL_TOWER_EXECUTION_ROLE)
+    args = parser.parse_args(args)
+
+    session = boto3.session.Session()
+    own_account_id = caller_account_id(session)
+    scanner = InventoryScanner(
+        lambda account_id: assumed_role_session(account_id, args.role_name, own_account_id=own_account_id),
+        concurrency=args.concurrency,
+    )
+    write_ndjson(scanner.scan(args.account or organization_account_ids(session), args.region or enabled_regions(session)), sys.stdout)
+    if scanner.errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
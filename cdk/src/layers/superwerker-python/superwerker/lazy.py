@@ -0,0 +1,43 @@
+import importlib
+import threading
+
+
+class Lazy:
+    """
+    Stands in for the object returned by `factory()`, which is only called on first attribute access.
+
+    Handlers use it for module level clients and imports, so a cold start only builds what the current request
+    needs. The object is created once, also when several threads ask for it at the same time.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._target is None:
+                self._target = self._factory()
+        return self._target
+
+    def __getattr__(self, name):
+        if name in ('_factory', '_target', '_lock'):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+
+def lazy_client(service_name, **kwargs):
+    """Returns the client of `superwerker.clients` for `service_name`, it is created, and boto3 imported, on first use."""
+
+    def client():
+        from superwerker import clients
+
+        return clients.client(service_name, **kwargs)
+
+    return Lazy(client)
+
+
+def lazy_import(name):
+    """Returns the module `name`, imported on first attribute access."""
+    return Lazy(lambda: importlib.import_module(name))
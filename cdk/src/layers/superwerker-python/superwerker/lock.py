@@ -0,0 +1,235 @@
+import os
+import random
+import threading
+import time
+import uuid
+
+from botocore.exceptions import ClientError
+
+from superwerker.clients import client as tuned_client
+from superwerker.retry import throttling_back_off
+
+ORGANIZATIONS_LOCK = 'organizations'
+ORGANIZATIONS_LOCK_TABLE_ENV = 'ORGANIZATIONS_LOCK_TABLE'
+
+# a heartbeat renews the lease while the lock is held, see Lock, so it only runs out if the holder dies
+LEASE_SECONDS = 60
+HEARTBEATS_PER_LEASE = 3
+WAIT_TIMEOUT = 150
+MAX_POLL_INTERVAL = 2
+
+
+class LockTimeout(Exception):
+    pass
+
+
+class LockLost(Exception):
+    pass
+
+
+class DynamoDBLockBackend:
+    """
+    Stores leases in a DynamoDB table with partition key `LockName` using conditional writes.
+
+    Items are never deleted, so the fencing token of a lock keeps increasing across releases.
+    """
+
+    def __init__(self, table_name, client=None):
+        self.table_name = table_name
+        self.client = client or tuned_client('dynamodb')
+
+    def acquire(self, name, owner, lease_seconds, now):
+        """Returns the new fencing token, or None while someone else holds an unexpired lease."""
+        try:
+            response = throttling_back_off(
+                lambda: self.client.update_item(
+                    TableName=self.table_name,
+                    Key={'LockName': {'S': name}},
+                    UpdateExpression='SET #owner = :owner, ExpiresAt = :expires ADD FencingToken :one',
+                    ConditionExpression='attribute_not_exists(LockName) OR ExpiresAt < :now OR #owner = :owner',
+                    ExpressionAttributeNames={'#owner': 'Owner'},
+                    ExpressionAttributeValues={
+                        ':owner': {'S': owner},
+                        ':expires': {'N': str(now + lease_seconds)},
+                        ':now': {'N': str(now)},
+                        ':one': {'N': '1'},
+                    },
+                    ReturnValues='UPDATED_NEW',
+                )
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return None
+            raise
+        return int(response['Attributes']['FencingToken']['N'])
+
+    def _update_lease(self, name, owner, token, expires_at):
+        try:
+            throttling_back_off(
+                lambda: self.client.update_item(
+                    TableName=self.table_name,
+                    Key={'LockName': {'S': name}},
+                    UpdateExpression='SET ExpiresAt = :expires',
+                    ConditionExpression='#owner = :owner AND FencingToken = :token',
+                    ExpressionAttributeNames={'#owner': 'Owner'},
+                    ExpressionAttributeValues={
+                        ':owner': {'S': owner},
+                        ':token': {'N': str(token)},
+                        ':expires': {'N': str(expires_at)},
+                    },
+                )
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def renew(self, name, owner, token, lease_seconds, now):
+        """Extends the lease if `token` is still the current one, returns whether it was."""
+        return self._update_lease(name, owner, token, now + lease_seconds)
+
+    def release(self, name, owner, token):
+        self._update_lease(name, owner, token, 0)
+
+
+class InMemoryLockBackend:
+    """Local stand-in for DynamoDBLockBackend, shared between the threads of one process."""
+
+    def __init__(self):
+        self._leases = {}
+        self._mutex = threading.Lock()
+
+    def acquire(self, name, owner, lease_seconds, now):
+        with self._mutex:
+            lease = self._leases.get(name, {'owner': None, 'token': 0, 'expires_at': 0})
+            if lease['owner'] not in (None, owner) and lease['expires_at'] >= now:
+                return None
+            lease = {'owner': owner, 'token': lease['token'] + 1, 'expires_at': now + lease_seconds}
+            self._leases[name] = lease
+            return lease['token']
+
+    def renew(self, name, owner, token, lease_seconds, now):
+        with self._mutex:
+            lease = self._leases.get(name)
+            if lease is None or lease['owner'] != owner or lease['token'] != token:
+                return False
+            lease['expires_at'] = now + lease_seconds
+            return True
+
+    def release(self, name, owner, token):
+        with self._mutex:
+            lease = self._leases.get(name)
+            if lease is not None and lease['owner'] == owner and lease['token'] == token:
+                lease['expires_at'] = 0
+
+
+class Lock:
+    """
+    Lease based mutual exclusion with fencing tokens, used as context manager.
+
+    While the lock is held, a heartbeat thread renews the lease several times per lease, so a write that retries for
+    longer than the lease keeps the lock. A holder that dies, or is frozen, loses the lock to the next writer once its
+    lease runs out. `ensure_held()` raises LockLost once a newer fencing token has been handed out, so call it right
+    before each write.
+    """
+
+    def __init__(self, backend, name, lease_seconds=LEASE_SECONDS, wait_timeout=WAIT_TIMEOUT, clock=time.time, heartbeat=True):
+        self.backend = backend
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.wait_timeout = wait_timeout
+        self.clock = clock
+        self.heartbeat = heartbeat
+        self.owner = str(uuid.uuid4())
+        self.token = None
+        self._stopped = None
+        self._heartbeat = None
+        self._lost = False
+
+    def acquire(self):
+        deadline = self.clock() + self.wait_timeout
+        interval = 0.05
+        while True:
+            self.token = self.backend.acquire(self.name, self.owner, self.lease_seconds, self.clock())
+            if self.token is not None:
+                print('Acquired lock {} with fencing token {}'.format(self.name, self.token))
+                self._lost = False
+                if self.heartbeat:
+                    self._start_heartbeat(self.token)
+                return self.token
+            if self.clock() + interval > deadline:
+                raise LockTimeout('Lock {} not acquired within {}s'.format(self.name, self.wait_timeout))
+            time.sleep(random.uniform(interval / 2, interval))
+            interval = min(MAX_POLL_INTERVAL, interval * 2)
+
+    def _start_heartbeat(self, token):
+        stopped = threading.Event()
+
+        def beat():
+            while not stopped.wait(self.lease_seconds / HEARTBEATS_PER_LEASE):
+                try:
+                    if not self.backend.renew(self.name, self.owner, token, self.lease_seconds, self.clock()):
+                        self._lost = True
+                        return
+                except Exception as e:
+                    # the lease outlives a few failed beats, the next one tries again
+                    print('Renewing lock {} failed: {}'.format(self.name, e))
+
+        self._stopped = stopped
+        self._heartbeat = threading.Thread(target=beat, name='lock-heartbeat-{}'.format(self.name), daemon=True)
+        self._heartbeat.start()
+
+    def _stop_heartbeat(self):
+        if self._heartbeat is not None:
+            self._stopped.set()
+            self._heartbeat.join()
+            self._heartbeat = None
+
+    def ensure_held(self):
+        if (
+            self.token is None
+            or self._lost
+            or not self.backend.renew(self.name, self.owner, self.token, self.lease_seconds, self.clock())
+        ):
+            raise LockLost('Lock {} with fencing token {} is no longer held'.format(self.name, self.token))
+
+    def release(self):
+        self._stop_heartbeat()
+        if self.token is not None:
+            self.backend.release(self.name, self.owner, self.token)
+            self.token = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class NoLock:
+    """Stand-in for Lock when no lock table is configured."""
+
+    token = None
+
+    def ensure_held(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def organizations_lock():
+    """
+    Returns the lock serializing the Organizations writes of the handlers sharing the lock table, i.e. of one stack.
+
+    Handlers of other stacks have their own table and are not serialized with these.
+    """
+    table_name = os.environ.get(ORGANIZATIONS_LOCK_TABLE_ENV)
+    if not table_name:
+        return NoLock()
+    return Lock(DynamoDBLockBackend(table_name), ORGANIZATIONS_LOCK)
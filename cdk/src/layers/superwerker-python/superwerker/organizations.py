@@ -0,0 +1,250 @@
+import hashlib
+import json
+import re
+
+from superwerker.clients import client
+from superwerker.lock import NoLock, organizations_lock
+from superwerker.retry import throttling_back_off
+
+CREATE = 'Create'
+UPDATE = 'Update'
+DELETE = 'Delete'
+
+SERVICE_CONTROL_POLICY = 'SERVICE_CONTROL_POLICY'
+TAG_POLICY = 'TAG_POLICY'
+BACKUP_POLICY = 'BACKUP_POLICY'
+
+POLICY_ID_PATTERN = re.compile('p-[0-9a-z]+')
+
+
+def organizations_client():
+    """Returns the Organizations client shared by all calls in this execution environment."""
+    return client('organizations')
+
+
+def normalize_policy(content):
+    """Returns the policy JSON with sorted keys and without whitespace, so formatting changes compare equal."""
+    return json.dumps(json.loads(content), sort_keys=True, separators=(',', ':'))
+
+
+def policy_hash(content):
+    try:
+        return hashlib.sha256(normalize_policy(content).encode('utf-8')).hexdigest()
+    except ValueError:
+        return None
+
+
+def with_retry(function, **kwargs):
+    print('Running {}'.format(function.__name__))
+    response = throttling_back_off(lambda: function(**kwargs))
+    print('Response for {}: {}'.format(function.__name__, response))
+    return response
+
+
+class AttachmentIndex:
+    """
+    Policy attachments seen during a single invocation, indexed both by target and by policy.
+
+    Each (target, policy type) and each policy is listed once with all pages, afterwards lookups are set membership
+    checks. Attach and detach calls made through Organization keep the index up to date.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._by_target = {}
+        self._by_policy = {}
+
+    def policies_for_target(self, target_id, policy_type):
+        key = (target_id, policy_type)
+        if key not in self._by_target:
+            paginator = self.client.get_paginator('list_policies_for_target')
+            pages = throttling_back_off(lambda: list(paginator.paginate(TargetId=target_id, Filter=policy_type)))
+            self._by_target[key] = {p['Id'] for page in pages for p in page['Policies']}
+        return self._by_target[key]
+
+    def targets_for_policy(self, policy_id):
+        if policy_id not in self._by_policy:
+            paginator = self.client.get_paginator('list_targets_for_policy')
+            pages = throttling_back_off(lambda: list(paginator.paginate(PolicyId=policy_id)))
+            self._by_policy[policy_id] = {t['TargetId'] for page in pages for t in page['Targets']}
+        return self._by_policy[policy_id]
+
+    def attached(self, policy_id, target_id, policy_type=None):
+        """Answers from the policy's targets if already listed, lists the target's policies of `policy_type` otherwise."""
+        if policy_id in self._by_policy:
+            return target_id in self._by_policy[policy_id]
+        if policy_type is None:
+            return target_id in self.targets_for_policy(policy_id)
+        return policy_id in self.policies_for_target(target_id, policy_type)
+
+    def add(self, policy_id, target_id, policy_type=None):
+        if policy_id in self._by_policy:
+            self._by_policy[policy_id].add(target_id)
+        if (target_id, policy_type) in self._by_target:
+            self._by_target[(target_id, policy_type)].add(policy_id)
+
+    def discard(self, policy_id, target_id):
+        if policy_id in self._by_policy:
+            self._by_policy[policy_id].discard(target_id)
+        for (target, _), policy_ids in self._by_target.items():
+            if target == target_id:
+                policy_ids.discard(policy_id)
+
+
+class Organization:
+    """
+    Organizations state for a single invocation.
+
+    The root is looked up once and reused for every attach, detach and enable call made through this object.
+    Writes check right before they run that `lock` is still held.
+    """
+
+    def __init__(self, client=None, lock=None):
+        self.client = client or organizations_client()
+        self.lock = lock or NoLock()
+        self._root = None
+        self.attachments = AttachmentIndex(self.client)
+
+    def _write(self, function, **kwargs):
+        self.lock.ensure_held()
+        return with_retry(function, **kwargs)
+
+    def root(self):
+        if self._root is None:
+            self._root = throttling_back_off(self.client.list_roots)['Roots'][0]
+        return self._root
+
+    def root_id(self):
+        return self.root()['Id']
+
+    def policy_type_enabled(self, policy_type):
+        return {'Type': policy_type, 'Status': 'ENABLED'} in self.root()['PolicyTypes']
+
+    def enable_policy_type(self, policy_type):
+        if self.policy_type_enabled(policy_type):
+            return
+        print('Enable {} for root: {}'.format(policy_type, self.root_id()))
+        response = self._write(self.client.enable_policy_type, RootId=self.root_id(), PolicyType=policy_type)
+        self._root = response['Root']
+
+    def create_policy(self, policy_type, name, description, content):
+        response = self._write(
+            self.client.create_policy,
+            Content=content,
+            Description=description,
+            Name=name,
+            Type=policy_type,
+        )
+        return response['Policy']['PolicySummary']['Id']
+
+    def describe_policy(self, policy_id):
+        return throttling_back_off(lambda: self.client.describe_policy(PolicyId=policy_id))['Policy']
+
+    def policy_up_to_date(self, policy_id, name, description, content):
+        deployed = self.describe_policy(policy_id)
+        summary = deployed['PolicySummary']
+        deployed_hash = policy_hash(deployed['Content'])
+        return (
+            summary['Name'] == name
+            and summary.get('Description') == description
+            and deployed_hash is not None
+            and deployed_hash == policy_hash(content)
+        )
+
+    def list_policies(self, policy_type):
+        paginator = self.client.get_paginator('list_policies')
+        return throttling_back_off(lambda: [p for page in paginator.paginate(Filter=policy_type) for p in page['Policies']])
+
+    def update_policy(self, policy_id, name, description, content):
+        """Updates the policy unless the deployed one has the same name, description and normalized content."""
+        if self.policy_up_to_date(policy_id, name, description, content):
+            print('Policy {} is up to date, skipping update'.format(policy_id))
+            return False
+        self._write(
+            self.client.update_policy,
+            PolicyId=policy_id,
+            Content=content,
+            Description=description,
+            Name=name,
+        )
+        return True
+
+    def attach_policy(self, policy_id, target_id=None, policy_type=None):
+        target_id = target_id or self.root_id()
+        self._write(self.client.attach_policy, PolicyId=policy_id, TargetId=target_id)
+        self.attachments.add(policy_id, target_id, policy_type)
+
+    def detach_policy(self, policy_id, target_id=None):
+        target_id = target_id or self.root_id()
+        self._write(self.client.detach_policy, PolicyId=policy_id, TargetId=target_id)
+        self.attachments.discard(policy_id, target_id)
+
+    def policy_attached(self, policy_id, policy_type, target_id=None):
+        return self.attachments.attached(policy_id, target_id or self.root_id(), policy_type)
+
+    def delete_policy(self, policy_id, policy_type):
+        """Deletes the policy, detaching it from every root, OU and account it is attached to first."""
+        for target_id in sorted(self.attachments.targets_for_policy(policy_id)):
+            self.detach_policy(policy_id, target_id)
+        self._write(self.client.delete_policy, PolicyId=policy_id)
+
+
+def handle_policy_request(event, policy_type, name=None, organization=None):
+    """Handles a CloudFormation custom resource request for a policy of the given type attached to the root."""
+    request_type = event['RequestType']
+    properties = event['ResourceProperties']
+    logical_resource_id = event['LogicalResourceId']
+    policy_id = event.get('PhysicalResourceId')
+    attach = properties['Attach'] == 'true'
+
+    print('RequestType: {}'.format(request_type))
+    print('PhysicalResourceId: {}'.format(policy_id))
+    print('LogicalResourceId: {}'.format(logical_resource_id))
+    print('Attach: {}'.format(attach))
+
+    parameters = dict(
+        content=properties['Policy'],
+        description='superwerker - {}'.format(logical_resource_id),
+        name=name or logical_resource_id,
+    )
+
+    lock = organizations_lock()
+    organization = organization or Organization(lock=lock)
+
+    try:
+        with lock:
+            if request_type == CREATE:
+                print('Creating Policy: {}'.format(logical_resource_id))
+                policy_id = organization.create_policy(policy_type, **parameters)
+                if attach:
+                    organization.attach_policy(policy_id, policy_type=policy_type)
+            elif request_type == UPDATE:
+                print('Updating Policy: {}'.format(logical_resource_id))
+                organization.update_policy(policy_id, **parameters)
+            elif request_type == DELETE:
+                print('Deleting Policy: {}'.format(logical_resource_id))
+                if POLICY_ID_PATTERN.match(policy_id):
+                    organization.delete_policy(policy_id, policy_type)
+                else:
+                    print('{} is no valid PolicyId'.format(policy_id))
+            else:
+                raise Exception('Unexpected RequestType: {}'.format(request_type))
+
+        return {
+            'PhysicalResourceId': policy_id,
+        }
+    except Exception as e:
+        print(e)
+        print(event)
+        raise e
+
+
+def handle_enable_policy_type_request(event, policy_type, organization=None):
+    """Handles a CloudFormation custom resource request that enables a policy type on the root."""
+    if event['RequestType'] == CREATE:
+        lock = organizations_lock()
+        with lock:
+            (organization or Organization(lock=lock)).enable_policy_type(policy_type)
+    return {
+        'PhysicalResourceId': policy_type,
+    }
@@ -0,0 +1,137 @@
+"""
+Tags non-compliant resources with superwerker:backup in bulk instead of one SSM automation per resource.
+
+Usage:
+    python -m superwerker.remediation inventory.ndjson [--dry-run] [--concurrency 8] [--role-name AWSControlTowerExecution]
+
+The inventory holds one Resource Groups Tagging API style record (`ResourceARN`, `Tags`) per line, `-` reads stdin.
+Non-compliant resources are tagged with TagResources from the management account through `--role-name` in each member
+account, one NDJSON result per ARN is written to stdout.
+"""
+import argparse
+import json
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from superwerker.clients import client as tuned_client
+from superwerker.compliance import BACKUP_TAG_RULE, Inventory, evaluate
+from superwerker.inventory import read_ndjson
+from superwerker.retry import throttling_back_off
+from superwerker.sessions import CONTROL_TOWER_EXECUTION_ROLE, SessionPool, assumed_role_session, caller_account_id
+
+TAGGED = 'TAGGED'
+ALREADY_COMPLIANT = 'ALREADY_COMPLIANT'
+WOULD_TAG = 'WOULD_TAG'
+FAILED = 'FAILED'
+
+# TagResources accepts at most 20 ARNs per call
+CHUNK_SIZE = 20
+CONCURRENCY = 8
+
+# `previous` is the invalid value a tagged resource had before, e.g. `weekly`, None if it had no tag
+RemediationResult = namedtuple('RemediationResult', ['arn', 'status', 'error', 'previous'], defaults=[None, None])
+
+
+def account_and_region(arn):
+    parts = arn.split(':', 5)
+    return parts[4], parts[3]
+
+
+def chunks(items, size=CHUNK_SIZE):
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _error(e):
+    return e.response['Error']['Code'] if isinstance(e, ClientError) else repr(e)
+
+
+def _remediate_chunk(client, arns, rule, tag_value, dry_run):
+    """
+    Tags the ARNs of one account and region that still lack an allowed value.
+
+    The current tags are read right before tagging, so resources fixed meanwhile (e.g. by the SSM remediation or an
+    earlier run) are reported as ALREADY_COMPLIANT and never overwritten. Invalid values that are overwritten are
+    reported as `previous` of the result.
+    """
+    mappings = throttling_back_off(lambda: client.get_resources(ResourceARNList=arns))['ResourceTagMappingList']
+    current = {m['ResourceARN']: {t['Key']: t['Value'] for t in m['Tags']}.get(rule.tag_key) for m in mappings}
+    pending = [arn for arn in arns if current.get(arn) not in rule.allowed_values]
+    results = [RemediationResult(arn, ALREADY_COMPLIANT) for arn in arns if arn not in pending]
+    if dry_run or not pending:
+        return results + [RemediationResult(arn, WOULD_TAG, previous=current.get(arn)) for arn in pending]
+
+    for arn in pending:
+        if current.get(arn) is not None:
+            print('Overwriting invalid {} value {} of {}'.format(rule.tag_key, current[arn], arn), file=sys.stderr)
+    response = throttling_back_off(lambda: client.tag_resources(ResourceARNList=pending, Tags={rule.tag_key: tag_value}))
+
+    failed = response.get('FailedResourcesMap', {})
+    return results + [
+        RemediationResult(arn, FAILED, failed[arn].get('ErrorCode'), current.get(arn))
+        if arn in failed
+        else RemediationResult(arn, TAGGED, previous=current.get(arn))
+        for arn in pending
+    ]
+
+
+def remediate(arns, client_factory, rule=BACKUP_TAG_RULE, tag_value='daily', concurrency=CONCURRENCY, dry_run=False):
+    """
+    Tags `arns` with `rule.tag_key` = `tag_value` in chunks of 20 per account and region, at most `concurrency` at a time.
+
+    `client_factory(account_id, region)` returns the Resource Groups Tagging API client for that account and region.
+    Returns a RemediationResult per distinct ARN, running it again only touches ARNs that are still non-compliant.
+    """
+    groups = {}
+    for arn in dict.fromkeys(arns):
+        groups.setdefault(account_and_region(arn), []).append(arn)
+
+    # one client per account and region, created by the first worker needing it, boto3 clients are thread safe but
+    # creating them is not
+    clients = SessionPool()
+
+    def remediate_chunk(key, chunk):
+        try:
+            client = clients.get(key, lambda: client_factory(*key))
+            return _remediate_chunk(client, chunk, rule, tag_value, dry_run)
+        except Exception as e:
+            # a failing account or region, e.g. a role that can not be assumed, only fails its own ARNs
+            return [RemediationResult(arn, FAILED, _error(e)) for arn in chunk]
+
+    work = [(key, chunk) for key, group in sorted(groups.items()) for chunk in chunks(group)]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return [result for results in executor.map(lambda item: remediate_chunk(*item), work) for result in results]
+
+
+def tagging_client_factory(role_name=CONTROL_TOWER_EXECUTION_ROLE):
+    sessions = SessionPool()
+    own_account_id = caller_account_id()
+
+    def client(account_id, region):
+        session = sessions.get(account_id, lambda: assumed_role_session(account_id, role_name, own_account_id=own_account_id))
+        return tuned_client('resourcegroupstaggingapi', region_name=region, session=session)
+
+    return client
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Tags resources lacking a valid superwerker:backup tag in bulk.')
+    parser.add_argument('inventory', help='NDJSON file with ResourceARN and Tags per line, - for stdin')
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--role-name', default=CONTROL_TOWER_EXECUTION_ROLE)
+    args = parser.parse_args(args)
+
+    lines = sys.stdin if args.inventory == '-' else open(args.inventory)
+    with lines:
+        report = evaluate(Inventory.from_records(read_ndjson(lines)))
+
+    results = remediate(report.arns(), tagging_client_factory(args.role_name), concurrency=args.concurrency, dry_run=args.dry_run)
+    for result in results:
+        print(json.dumps(result._asdict()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import random
+import time
+
+from botocore.exceptions import ClientError, CredentialRetrievalError
+
+# Error codes of isThrottlingError in src/functions/utils/throttle.ts that botocore does not retry itself, the
+# throttling and server errors of that list, e.g. TooManyRequestsException, are retried by the clients already
+RETRYABLE_ERROR_CODES = {
+    'ConcurrentModificationException',  # Retry for AWS Organizations
+    'InsufficientDeliveryPolicyException',  # Retry for ConfigService
+    'NoAvailableDeliveryChannelException',  # Retry for ConfigService
+    'ConcurrentModifications',  # Retry for AssociateHostedZone
+    'OperationNotPermittedException',  # Retry for RAM
+    'InvalidStateException',  # Retry for ServiceCatalog
+}
+
+# botocore counterpart of CredentialsProviderError, connection errors are retried by the clients as well
+RETRYABLE_EXCEPTIONS = (
+    CredentialRetrievalError,
+)
+
+STARTING_DELAY = 0.15
+MAX_DELAY = 20
+NUM_OF_ATTEMPTS = 20
+RETRY_BUDGET = 120
+
+
+def is_throttling_error(e):
+    if isinstance(e, ClientError):
+        return e.response.get('Error', {}).get('Code') in RETRYABLE_ERROR_CODES
+    return isinstance(e, RETRYABLE_EXCEPTIONS)
+
+
+def throttling_back_off(
+    request,
+    starting_delay=STARTING_DELAY,
+    max_delay=MAX_DELAY,
+    num_of_attempts=NUM_OF_ATTEMPTS,
+    retry_budget=RETRY_BUDGET,
+    retry=is_throttling_error,
+    clock=time.monotonic,
+):
+    """
+    Calls `request` until it succeeds, retrying errors classified by `retry`.
+
+    The first attempt runs immediately. Retries wait a random time between zero and an exponentially growing delay
+    ("full jitter", capped at `max_delay`) and stop after `num_of_attempts` or once the next retry would start later
+    than `retry_budget` seconds after the first attempt, attempts and waits included.
+
+    The clients of superwerker.clients retry throttling, server and connection errors themselves, `is_throttling_error`
+    only classifies the others as retryable, so no error is retried by both. The last attempt starts within the budget
+    and takes at most the client's own retries on top of it.
+    """
+    deadline = clock() + retry_budget
+    for attempt in range(num_of_attempts):
+        try:
+            return request()
+        except Exception as e:
+            if not retry(e) or attempt == num_of_attempts - 1:
+                raise
+            delay = random.uniform(0, min(max_delay, starting_delay * 2**attempt))
+            if clock() + delay > deadline:
+                print('Retry budget of {}s exhausted'.format(retry_budget))
+                raise
+            print('Retrying after {:.2f}s: {}'.format(delay, e))
+            time.sleep(delay)
@@ -0,0 +1,107 @@
+"""
+Queries the index OpsSanta keeps of the root mails in the email bucket, and prints the matching entries as NDJSON.
+
+Usage:
+    python -m superwerker.rootmail_index --bucket BUCKET --from 2026-10-01 [--to 2026-10-07] [--recipient ALIAS] [--subject TEXT]
+
+OpsSanta writes an entry for every mail it receives, a JSON line with message id, recipient alias, subject, date,
+verdicts and size, and merges the entries of a day into NDJSON manifests after it is over, see compact_index of
+OpsSanta:
+
+    RootMailIndex/mails/<date>/<message id>.json        entries not merged yet, e.g. of today
+    RootMailIndex/day=<date>.ndjson                     all mails of a day
+    RootMailIndex/recipient=<alias>/<month>.ndjson      the mails of a recipient in a month, e.g. 2026-10
+
+Keys sort by date within a partition, so a query lists only the keys of its date range, starting right at its first
+day, and reads one manifest per day, or per month of the recipient, plus the entries not merged yet instead of listing
+and downloading the mails below `RootMail/`.
+"""
+import argparse
+import datetime
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from superwerker.clients import client
+from superwerker.retry import throttling_back_off
+
+PREFIX = 'RootMailIndex/'
+MAILS_PARTITION = PREFIX + 'mails/'
+DAY_PARTITION = PREFIX + 'day='
+RECIPIENT_PARTITION = PREFIX + 'recipient={}/'
+CONCURRENCY = 16
+
+
+def _day(value):
+    return value.isoformat() if isinstance(value, datetime.date) else value
+
+
+def _keys(s3, bucket, prefix, start, end):
+    """Yields the keys below `prefix` whose date, as long as `start` right after the prefix, is from `start` to `end`."""
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix, StartAfter=prefix + start):
+        for obj in page.get('Contents', []):
+            if obj['Key'][len(prefix):len(prefix) + len(start)] > end:
+                return
+            yield obj['Key']
+
+
+def _entries(s3, bucket, key):
+    try:
+        body = throttling_back_off(lambda: s3.get_object(Bucket=bucket, Key=key))['Body'].read().decode()
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'NoSuchKey':
+            # an entry merged into its manifests and deleted since it was listed
+            return []
+        raise
+    return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+
+def query(bucket, start, end=None, recipient=None, subject=None, s3=None, concurrency=CONCURRENCY):
+    """
+    Returns the entries of the mails from day `start` to `end`, both included, sorted by date.
+
+    Days are `datetime.date` or `YYYY-MM-DD`, `end` defaults to `start`. With `recipient`, e.g. the alias `abc` of
+    `root+abc@aws.example.com`, only its monthly manifests are read. `subject` keeps the mails whose subject contains
+    it, ignoring case.
+    """
+    s3 = s3 or client('s3')
+    start = _day(start)
+    end = _day(end) if end is not None else start
+    if recipient is not None:
+        prefix, first, last = RECIPIENT_PARTITION.format(recipient), start[:7], end[:7]
+    else:
+        prefix, first, last = DAY_PARTITION, start, end
+    # entries first, an entry merged and deleted after this listing is in the manifests listed next
+    keys = throttling_back_off(
+        lambda: list(_keys(s3, bucket, MAILS_PARTITION, start, end)) + list(_keys(s3, bucket, prefix, first, last))
+    )
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # an entry merged while the query ran may be read from its manifest and on its own, it is kept once
+        entries = {entry['messageId']: entry for entries in executor.map(lambda key: _entries(s3, bucket, key), keys) for entry in entries}
+
+    entries = [entry for entry in entries.values() if start <= entry['date'][:10] <= end]
+    if recipient is not None:
+        entries = [entry for entry in entries if entry['recipient'] == recipient]
+    if subject is not None:
+        entries = [entry for entry in entries if subject.lower() in (entry.get('subject') or '').lower()]
+    return sorted(entries, key=lambda entry: (entry['date'], entry['messageId']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Queries the index of the root mails.')
+    parser.add_argument('--bucket', required=True, help='the email bucket of the RootMail stack')
+    parser.add_argument('--from', dest='start', required=True, help='first day, YYYY-MM-DD')
+    parser.add_argument('--to', dest='end', help='last day, YYYY-MM-DD, defaults to the first one')
+    parser.add_argument('--recipient', help='alias of the root mail address, e.g. abc of root+abc@aws.example.com')
+    parser.add_argument('--subject', help='text the subject contains, ignoring case')
+    args = parser.parse_args(argv)
+
+    for entry in query(args.bucket, args.start, args.end, recipient=args.recipient, subject=args.subject):
+        sys.stdout.write(json.dumps(entry) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import boto3
+
+from superwerker.clients import client
+from superwerker.retry import throttling_back_off
+
+CONTROL_TOWER_EXECUTION_ROLE = 'AWSControlTowerExecution'
+
+# lifetime of assumed role credentials (DurationSeconds defaults to an hour), awsapilib console sessions use the same
+SESSION_LIFETIME = 3600
+REFRESH_MARGIN = 600
+
+
+def caller_account_id(session=None):
+    session = session or boto3.session.Session()
+    return throttling_back_off(client('sts', session=session).get_caller_identity)['Account']
+
+
+def assumed_role_session(account_id, role_name=CONTROL_TOWER_EXECUTION_ROLE, session_name='superwerker', session=None, own_account_id=None):
+    """
+    Returns a session with credentials of `role_name` in `account_id`, or `session` itself for `own_account_id`.
+
+    Callers creating sessions for many accounts look up their own account id once with caller_account_id() and pass it.
+    """
+    session = session or boto3.session.Session()
+    if account_id == own_account_id:
+        return session
+    partition = session.get_partition_for_region(session.region_name or 'us-east-1')
+    credentials = throttling_back_off(
+        lambda: client('sts', session=session).assume_role(
+            RoleArn='arn:{}:iam::{}:role/{}'.format(partition, account_id, role_name),
+            RoleSessionName=session_name,
+        )
+    )['Credentials']
+    return boto3.session.Session(
+        aws_access_key_id=credentials['AccessKeyId'],
+        aws_secret_access_key=credentials['SecretAccessKey'],
+        aws_session_token=credentials['SessionToken'],
+        region_name=session.region_name,
+    )
+
+
+class SessionPool:
+    """
+    Keeps objects holding assumed-role credentials, e.g. boto3 sessions or awsapilib objects, across warm invocations.
+
+    An object is created again once it is within `refresh_margin` seconds of `lifetime`, so callers never get one
+    about to expire. Creating an object for a key blocks other threads asking for the same key only.
+    """
+
+    def __init__(self, lifetime=SESSION_LIFETIME, refresh_margin=REFRESH_MARGIN, clock=time.time):
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self._entries = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, create):
+        """Returns the pooled object for `key`, calls `create()` if there is none or it is about to expire."""
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] - self.refresh_margin <= self.clock():
+                entry = (self.clock() + self.lifetime, create())
+                self._entries[key] = entry
+            return entry[1]
+
+    def invalidate(self, key):
+        """Drops `key`, e.g. after its credentials or console session were rejected."""
+        with self._lock:
+            self._entries.pop(key, None)
@@ -0,0 +1,110 @@
+import ast
+import glob
+import json
+import os
+import botocore.session
+import pytest
+from botocore.loaders import Loader
+from superwerker.botocore_data import LAYER_DIRECTORY, _modules, main, used_services, write
+
+SERVICES = set(Loader().list_available_services('service-2'))
+FUNCTIONS = sorted(os.path.dirname(p) for p in glob.glob(os.path.join(LAYER_DIRECTORY, '..', '..', 'functions', '*', 'index.py')))
+
+
+@pytest.fixture
+def function(tmp_path):
+    package = tmp_path / 'layer' / 'superwerker'
+    package.mkdir(parents=True)
+    (package / 'helper.py').write_text(
+        "import boto3\n\n\ndef client(service_name):\n    return boto3.client(service_name)\n\n\norganizations = boto3.client('organizations')\n"
+    )
+    (tmp_path / 'function').mkdir()
+    (tmp_path / 'function' / 'index.py').write_text(
+        "import boto3\nfrom superwerker.helper import client as tuned_client\nfrom superwerker.lazy import lazy_client\n\n"
+        "s3 = boto3.client('s3')\nses = lazy_client(service_name='ses')\nsqs = tuned_client('sqs')\n"
+    )
+    return str(tmp_path / 'function'), str(tmp_path / 'layer')
+
+
+def session(data_path):
+    """A session reading `data_path` before the data of botocore, like a function with AWS_DATA_PATH does."""
+    session = botocore.session.get_session()
+    session.register_component('data_loader', Loader(extra_search_paths=[data_path]))
+    return session
+
+
+def bundled_services(data_path):
+    return Loader(extra_search_paths=[data_path], include_default_search_paths=False).list_available_services('service-2')
+
+
+def test_finds_services_of_function_and_imported_modules(function):
+    directory, layer = function
+
+    assert used_services(directory, layer) == (['organizations', 's3', 'ses', 'sqs'], [])
+
+
+def test_reports_clients_without_literal_service(function):
+    directory, layer = function
+    with open(os.path.join(directory, 'index.py'), 'a') as f:
+        f.write("service = 'sns'\nsns = boto3.client(service)\n")
+
+    assert used_services(directory, layer) == (['organizations', 's3', 'ses', 'sqs'], ['index.py:9'])
+
+
+def test_writes_data_of_used_services_only(tmp_path):
+    write(['ses', 'ssm'], str(tmp_path))
+
+    model = json.loads(next((tmp_path / 'ssm').glob('*/service-2.json')).read_text())
+    assert 'documentation' not in model['operations']['GetParameter']
+    endpoints = json.loads((tmp_path / 'endpoints.json').read_text())
+    assert set(endpoints['partitions'][0]['services']) == {'email', 'ssm'}
+
+    client = session(str(tmp_path)).create_client('ssm', region_name='eu-central-1')
+    assert client.meta.endpoint_url == 'https://ssm.eu-central-1.amazonaws.com'
+    assert client.can_paginate('get_parameters_by_path')
+    assert bundled_services(str(tmp_path)) == ['ses', 'ssm']
+    # the data shared by all clients is read from botocore, not shadowed by a copy
+    assert sorted(p.name for p in tmp_path.glob('*.json')) == ['endpoints.json']
+
+
+def test_fails_for_clients_without_literal_service(tmp_path):
+    (tmp_path / 'index.py').write_text("import boto3\nclient = boto3.client(SERVICE)\n")
+
+    with pytest.raises(SystemExit) as e:
+        main([str(tmp_path), str(tmp_path / 'botocore-data')])
+
+    assert 'index.py:2' in str(e.value)
+
+
+def services_named(directory):
+    """Every service name passed as first argument to any call in the function and the superwerker modules it imports."""
+    services = set()
+    pending, seen = glob.glob(os.path.join(directory, '*.py')), set()
+    while pending:
+        path = os.path.abspath(pending.pop())
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call):
+                for argument in node.args[:1] + [k.value for k in node.keywords if k.arg == 'service_name']:
+                    if isinstance(argument, ast.Constant) and argument.value in SERVICES:
+                        services.add(argument.value)
+        pending.extend(_modules(tree, LAYER_DIRECTORY))
+    return services
+
+
+@pytest.mark.parametrize('directory', FUNCTIONS, ids=os.path.basename)
+def test_bundled_data_covers_every_service_the_function_reaches(directory, tmp_path):
+    services, unresolved = used_services(directory)
+    assert unresolved == []
+
+    write(services, str(tmp_path))
+
+    # found independently of the client factory names used_services knows, e.g. clients imported under another name,
+    # a service missing in the bundle would silently be read from the botocore of the runtime
+    assert services_named(directory) <= set(bundled_services(str(tmp_path)))
+    for service in services:
+        session(str(tmp_path)).create_client(service, region_name='eu-west-1')
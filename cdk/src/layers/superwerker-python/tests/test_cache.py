@@ -0,0 +1,99 @@
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from superwerker.cache import DynamoDBStore, FileStore, InMemoryStore, SSMParameterStore, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+def test_loads_once_within_ttl():
+    clock = Clock()
+    load = MagicMock(side_effect=[1, 2])
+    cache = TTLCache(60, clock=clock)
+
+    assert cache.get('settings', load) == 1
+    clock.now += 59
+    assert cache.get('settings', load) == 1
+    clock.now += 1
+    assert cache.get('settings', load) == 2
+    assert load.call_count == 2
+
+
+def test_store_survives_cold_start_and_invalidation():
+    clock = Clock()
+    store = InMemoryStore()
+    TTLCache(60, store, clock).get('settings', lambda: {'credit_sharing': True})
+
+    cold = TTLCache(60, store, clock)
+    assert cold.get('settings', MagicMock(side_effect=AssertionError)) == {'credit_sharing': True}
+
+    cold.invalidate('settings')
+    assert TTLCache(60, store, clock).get('settings', lambda: 'reloaded') == 'reloaded'
+
+
+def test_failing_store_falls_back_to_memory():
+    store = MagicMock()
+    store.get.side_effect = Exception('store down')
+    store.put.side_effect = Exception('store down')
+    cache = TTLCache(60, store)
+
+    assert cache.get('settings', lambda: 1) == 1
+    assert cache.get('settings', MagicMock(side_effect=AssertionError)) == 1
+
+
+def test_file_store(tmp_path):
+    store = FileStore(str(tmp_path))
+    store.put('billing/settings', 1060, {'a': True})
+
+    assert store.get('billing/settings') == (1060, {'a': True})
+    store.delete('billing/settings')
+    store.delete('billing/settings')
+    assert store.get('billing/settings') is None
+
+
+def test_ssm_parameter_store():
+    client = MagicMock()
+    store = SSMParameterStore('/superwerker/cache/', client)
+
+    store.put('settings', 1060, True)
+    name, value = client.put_parameter.call_args.kwargs['Name'], client.put_parameter.call_args.kwargs['Value']
+    client.get_parameter.return_value = {'Parameter': {'Value': value}}
+
+    assert name == '/superwerker/cache/settings'
+    assert store.get('settings') == (1060, True)
+    client.get_parameter.side_effect = ClientError({'Error': {'Code': 'ParameterNotFound'}}, 'GetParameter')
+    assert store.get('settings') is None
+
+
+def test_dynamodb_store():
+    client = MagicMock()
+    store = DynamoDBStore('results', client)
+
+    store.put('request', 1060.5, {'PhysicalResourceId': 'p-1'})
+    item = client.put_item.call_args.kwargs['Item']
+    client.get_item.return_value = {'Item': item}
+
+    assert item['Key'] == {'S': 'request'} and item['ExpiresAt'] == {'N': '1060'}
+    assert store.get('request') == (1060, {'PhysicalResourceId': 'p-1'})
+    client.get_item.return_value = {}
+    assert store.get('request') is None
+
+
+def test_add_writes_only_missing_or_expired_entries():
+    client = MagicMock()
+    client.put_item.side_effect = [{}, ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'PutItem')]
+    store = DynamoDBStore('results', client)
+
+    assert store.add('request', 1900, {'Status': 'InProgress'}, clock=lambda: 1000)
+    assert not store.add('request', 1900, {'Status': 'InProgress'}, clock=lambda: 1000)
+    assert client.put_item.call_args.kwargs['ExpressionAttributeValues'] == {':now': {'N': '1000'}}
+
+    memory = InMemoryStore(clock=lambda: 1000)
+    assert memory.add('request', 1060, 'first') and not memory.add('request', 1060, 'second')
+    memory.put('request', 1000, 'expired')
+    assert memory.add('request', 1060, 'third') and memory.get('request') == (1060, 'third')
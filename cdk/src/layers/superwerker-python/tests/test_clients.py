@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from superwerker import clients
+
+
+@pytest.fixture(autouse=True)
+def no_shared_clients():
+    with patch.dict(clients._clients, clear=True), patch.object(clients, '_http', None):
+        yield
+
+
+def test_shares_client_per_service_and_region():
+    with patch('boto3.client') as client:
+        client.side_effect = lambda *args, **kwargs: MagicMock()
+
+        ssm = clients.client('ssm')
+
+        assert clients.client('ssm') is ssm
+        assert clients.client('ssm', region_name='us-east-1') is not ssm
+        assert client.call_count == 2
+        client.assert_called_with('ssm', region_name='us-east-1', config=clients.CONFIG)
+
+
+def test_creates_client_once_for_concurrent_first_use():
+    with patch('boto3.client') as client:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: clients.client('organizations'), range(32)))
+
+    client.assert_called_once_with('organizations', region_name=None, config=clients.CONFIG)
+
+
+def test_does_not_share_clients_of_other_sessions():
+    session = MagicMock()
+
+    clients.client('sts', session=session)
+    clients.client('sts', session=session)
+
+    assert session.client.call_count == 2
+    session.client.assert_called_with('sts', region_name=None, config=clients.CONFIG)
+    assert clients._clients == {}
+
+
+def test_config_is_tuned():
+    assert clients.CONFIG.retries == {'mode': 'adaptive', 'max_attempts': 5}
+    assert clients.CONFIG.max_pool_connections == 16
+    assert clients.CONFIG.tcp_keepalive
+
+
+def test_shares_http_pool():
+    http = clients.http()
+
+    assert clients.http() is http
+    assert http.connection_pool_kw['retries'].total == 3
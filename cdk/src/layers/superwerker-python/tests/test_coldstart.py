@@ -0,0 +1,133 @@
+import json
+import yaml
+from superwerker.coldstart import (
+    Target,
+    _TemplateLoader,
+    inline_code_targets,
+    main,
+    parse_importtime,
+    profile,
+    side_effect_at_import,
+    targets,
+)
+
+IMPORT_TIME = '''import time: self [us] | cumulative | imported package
+import time:       100 |        100 | site
+import time:        50 |         50 |     json.decoder
+import time:        20 |         70 |   json
+import time:        30 |         30 |   helper
+import time:        10 |        110 | index
+import time:         5 |          5 | atexit
+'''
+
+TEMPLATE = '''
+Resources:
+  Function:
+    Type: AWS::Serverless::Function
+    Properties:
+      Runtime: python3.14
+      InlineCode: !Sub |
+        import boto3
+        region = "${AWS::Region}"
+        bucket = "${Bucket}"
+        literal = "${!Literal}"
+  NodeFunction:
+    Type: AWS::Serverless::Function
+    Properties:
+      Runtime: nodejs18.x
+      InlineCode: exports.handler = () => {}
+  Role:
+    Type: AWS::IAM::Role
+    Properties:
+      RoleName: !Ref AWS::StackName
+  StackSet:
+    Type: AWS::CloudFormation::StackSet
+    Properties:
+      TemplateBody: !Sub |
+        Resources:
+          Nested:
+            Type: AWS::Lambda::Function
+            Properties:
+              Runtime: python3.14
+              Code:
+                ZipFile: !Sub |
+                  region = "${!AWS::Region}"
+'''
+
+
+def test_parses_imports_of_handler():
+    records = parse_importtime(IMPORT_TIME)
+
+    assert [(r.module, r.self_us, r.depth) for r in records] == [
+        ('json.decoder', 50, 2),
+        ('json', 20, 1),
+        ('helper', 30, 1),
+        ('index', 10, 0),
+    ]
+
+
+def test_finds_python_inline_code():
+    found = list(inline_code_targets(yaml.load(TEMPLATE, Loader=_TemplateLoader), 'template.yaml'))
+
+    assert [t.name for t in found] == ['template.yaml/Function', 'template.yaml/StackSet/Nested']
+    assert 'region = "eu-central-1"' in found[0].code
+    assert 'bucket = "Bucket"' in found[0].code
+    assert 'literal = "${Literal}"' in found[0].code
+    assert 'region = "eu-central-1"' in found[1].code
+
+
+def test_profiles_function_folder(tmp_path):
+    (tmp_path / 'index.py').write_text('import json\nimport superwerker.retry\n')
+
+    result = profile(Target('function', directory=str(tmp_path)), repeat=2)
+
+    assert len(result['Runs']) == 2
+    assert result['Seconds'] in result['Runs']
+    assert 'superwerker.retry' in result['Modules']
+    assert 'botocore' in result['Packages']
+    assert 'index' in result['Packages']
+
+
+def test_profiles_inline_code_with_cfnresponse():
+    result = profile(Target('inline', code='import cfnresponse\n'), repeat=1)
+
+    assert 'cfnresponse' in result['Modules']
+    assert 'urllib3' in result['Packages']
+
+
+def test_reports_failing_import():
+    result = profile(Target('inline', code='import does_not_exist\n'), repeat=1)
+
+    assert result == {'Error': "ModuleNotFoundError: No module named 'does_not_exist'"}
+
+
+def test_skips_inline_code_running_commands_or_requests_at_import():
+    pip = 'import subprocess\nimport sys\nsubprocess.check_call([sys.executable, "-m", "pip", "install", "awsapilib"])\n'
+    client = 'import boto3\nssm = boto3.client("ssm")\nPARAMETER = ssm.get_parameter(Name="name")\n'
+    handler = 'import boto3\nimport urllib3\nhttp = urllib3.PoolManager()\nssm = boto3.client("ssm")\ndef handler(event, _):\n    ssm.get_parameter(Name="name")\n'
+
+    assert profile(Target('inline', code=pip), repeat=1) == {'Skipped': 'calls subprocess.check_call at import'}
+    assert side_effect_at_import('from subprocess import run\nrun(["ls"])\n') == 'run'
+    assert side_effect_at_import(client) == 'ssm.get_parameter'
+    assert side_effect_at_import(handler) is None
+
+
+def test_writes_report_and_compares_with_baseline(tmp_path, capsys):
+    (tmp_path / 'function').mkdir()
+    (tmp_path / 'function' / 'index.py').write_text('import json\n')
+    (tmp_path / 'template.yaml').write_text(TEMPLATE)
+    baseline = tmp_path / 'before.json'
+    baseline.write_text(json.dumps({'function': {'Seconds': 10}}))
+
+    assert [t.name for t in targets(['function', 'template.yaml'], root=str(tmp_path))] == [
+        'function',
+        'template.yaml/Function',
+        'template.yaml/StackSet/Nested',
+    ]
+
+    main(['function', '--root', str(tmp_path), '--repeat', '1', '--json', str(tmp_path / 'after.json'), '--baseline', str(baseline)])
+
+    report = json.loads((tmp_path / 'after.json').read_text())
+    assert list(report) == ['function']
+    assert report['function']['Seconds'] < 10
+    assert capsys.readouterr().out.startswith('function: {:.1f} ms (-'.format(report['function']['Seconds'] * 1000))
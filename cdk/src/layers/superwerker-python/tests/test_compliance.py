@@ -0,0 +1,68 @@
+import time
+from superwerker.compliance import (
+    BACKUP_TAG_RULE,
+    COMPLIANT,
+    NON_COMPLIANT,
+    NOT_APPLICABLE,
+    Inventory,
+    evaluate,
+    resource_type,
+    rule_from_tag_policy,
+)
+
+VOLUME = 'arn:aws:ec2:eu-central-1:111111111111:volume/vol-{}'
+TABLE = 'arn:aws:dynamodb:eu-central-1:111111111111:table/table-{}'
+DB = 'arn:aws:rds:eu-central-1:111111111111:db:db-{}'
+BUCKET = 'arn:aws:s3:::bucket-{}'
+
+
+def test_resource_type():
+    assert resource_type(VOLUME.format(1)) == 'ec2:volume'
+    assert resource_type(TABLE.format(1)) == 'dynamodb:table'
+    assert resource_type(DB.format(1)) == 'rds:db'
+    assert resource_type(BUCKET.format(1)) == 's3:bucket-1'
+
+
+def test_evaluate_backup_tag_rule():
+    inventory = Inventory.from_records(
+        [
+            {'ResourceARN': VOLUME.format(1), 'Tags': [{'Key': 'superwerker:backup', 'Value': 'daily'}]},
+            {'ResourceARN': VOLUME.format(2), 'Tags': [{'Key': 'superwerker:backup', 'Value': 'weekly'}]},
+            {'ResourceARN': TABLE.format(1), 'Tags': {'superwerker:backup': 'none'}},
+            {'ResourceARN': DB.format(1), 'Tags': []},
+            {'ResourceARN': BUCKET.format(1), 'ResourceType': 's3:bucket'},
+        ]
+    )
+
+    report = evaluate(inventory)
+
+    assert report.statuses() == [COMPLIANT, NON_COMPLIANT, COMPLIANT, NON_COMPLIANT, NOT_APPLICABLE]
+    assert report.arns() == [VOLUME.format(2), DB.format(1)]
+    assert report.summary() == {
+        'dynamodb:table': {COMPLIANT: 1},
+        'ec2:volume': {COMPLIANT: 1, NON_COMPLIANT: 1},
+        'rds:db': {NON_COMPLIANT: 1},
+        's3:bucket': {NOT_APPLICABLE: 1},
+    }
+
+
+def test_rule_from_effective_tag_policy():
+    rule = rule_from_tag_policy({'tags': {'superwerker:backup': {'tag_value': ['none', 'daily'], 'enforced_for': ['ec2:ALL_SUPPORTED']}}})
+    inventory = Inventory.from_records([{'ResourceARN': VOLUME.format(1)}, {'ResourceARN': DB.format(1)}])
+
+    assert evaluate(inventory, rule).statuses() == [NON_COMPLIANT, NOT_APPLICABLE]
+
+
+def test_hundreds_of_thousands_of_resources():
+    values = ['daily', 'none', None, 'Daily']
+    templates = [VOLUME, TABLE, DB]
+    records = [{'ResourceARN': templates[i % 3].format(i), 'Tags': {'superwerker:backup': values[i % 4]}} for i in range(300000)]
+    inventory = Inventory.from_records(records)
+
+    start = time.time()
+    report = evaluate(inventory, BACKUP_TAG_RULE)
+    summary = report.summary()
+
+    assert time.time() - start < 1
+    assert sum(summary['ec2:volume'].values()) == 100000
+    assert sum(c[COMPLIANT] for c in summary.values()) == 150000
@@ -0,0 +1,41 @@
+from unittest.mock import MagicMock
+from superwerker.config import ConfigReader, account_id_parameter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+def ssm_client(*pages):
+    ssm = MagicMock()
+    ssm.get_paginator.return_value.paginate.side_effect = lambda **kwargs: [
+        {'Parameters': [{'Name': name, 'Value': value} for name, value in page.items()]} for page in pages
+    ]
+    return ssm
+
+
+def test_reads_all_parameters_once_within_ttl():
+    clock = Clock()
+    ssm = ssm_client(
+        {'/superwerker/account_id_audit': '111111111111', '/superwerker/cache/billing-setup/settings': '{}'},
+        {'/superwerker/controltower/regions': 'eu-central-1,eu-west-1'},
+    )
+    reader = ConfigReader(ssm=ssm, clock=clock)
+
+    assert reader.account_id('Audit') == '111111111111'
+    assert reader.get('/superwerker/controltower/regions') == 'eu-central-1,eu-west-1'
+    assert reader.get('/superwerker/cache/billing-setup/settings') is None
+    ssm.get_paginator.return_value.paginate.assert_called_once_with(Path='/superwerker', Recursive=True)
+
+    clock.now += 300
+    reader.get('/superwerker/account_id_audit')
+    assert ssm.get_paginator.return_value.paginate.call_count == 2
+
+
+def test_account_id_parameter():
+    assert account_id_parameter('Log Archive') == '/superwerker/account_id_logarchive'
+
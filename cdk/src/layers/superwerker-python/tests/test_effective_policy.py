@@ -0,0 +1,119 @@
+import json
+import time
+from unittest.mock import MagicMock, patch
+import pytest
+from superwerker.effective_policy import EffectivePolicyEvaluator, OrganizationSnapshot, main, plan, snapshot
+from superwerker.organizations import CREATE, DELETE, TAG_POLICY, UPDATE, Organization
+
+TAG_POLICY_DOCUMENT = json.dumps(
+    {
+        'tags': {
+            'superwerker:backup': {
+                'tag_value': {'@@assign': ['none', 'daily']},
+                'enforced_for': {'@@assign': ['dynamodb:table', 'ec2:volume']},
+            },
+        },
+    }
+)
+
+TAG_POLICY_EFFECTIVE = {'tags': {'superwerker:backup': {'tag_value': ['none', 'daily'], 'enforced_for': ['dynamodb:table', 'ec2:volume']}}}
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with patch('superwerker.retry.time.sleep'):
+        yield
+
+
+def organization_snapshot(documents):
+    return OrganizationSnapshot(
+        'r-1234',
+        {'ou-1234-workload': 'r-1234', 'ou-1234-sandbox': 'r-1234', '111111111111': 'ou-1234-workload', '222222222222': 'ou-1234-sandbox'},
+        documents,
+    )
+
+
+def test_inheritance_operators():
+    evaluator = EffectivePolicyEvaluator(
+        organization_snapshot(
+            {
+                'r-1234': {'p-root': TAG_POLICY_DOCUMENT},
+                'ou-1234-workload': {'p-ou': json.dumps({'tags': {'superwerker:backup': {'tag_value': {'@@append': ['weekly']}}}})},
+                '111111111111': {'p-account': json.dumps({'tags': {'superwerker:backup': {'tag_value': {'@@remove': ['none']}}}})},
+            }
+        )
+    )
+
+    assert evaluator.effective('111111111111')['tags']['superwerker:backup'] == {
+        'tag_value': ['daily', 'weekly'],
+        'enforced_for': ['dynamodb:table', 'ec2:volume'],
+    }
+    assert evaluator.effective('222222222222') == evaluator.effective('r-1234') == TAG_POLICY_EFFECTIVE
+
+
+def test_child_policies_cannot_use_disallowed_operators():
+    root_policy = json.loads(TAG_POLICY_DOCUMENT)
+    root_policy['tags']['superwerker:backup']['@@operators_allowed_for_child_policies'] = ['@@none']
+    evaluator = EffectivePolicyEvaluator(
+        organization_snapshot(
+            {
+                'r-1234': {'p-root': json.dumps(root_policy)},
+                'ou-1234-workload': {'p-ou': json.dumps({'tags': {'superwerker:backup': {'tag_value': {'@@assign': ['weekly']}}}})},
+            }
+        )
+    )
+
+    assert evaluator.effective('111111111111')['tags']['superwerker:backup']['tag_value'] == ['none', 'daily']
+
+
+def test_thousands_of_accounts_in_bulk():
+    parents = {'ou-{}'.format(o): 'r-1234' for o in range(20)}
+    parents.update({'{:012d}'.format(a): 'ou-{}'.format(a % 20) for a in range(5000)})
+    documents = {'r-1234': {'p-root': TAG_POLICY_DOCUMENT}}
+    documents.update({'{:012d}'.format(a): {'p-a': json.dumps({'tags': {'cost': {'tag_key': {'@@assign': 'Cost'}}}})} for a in range(0, 5000, 7)})
+
+    start = time.time()
+    effective = EffectivePolicyEvaluator(OrganizationSnapshot('r-1234', parents, documents)).effective_all()
+
+    assert time.time() - start < 1
+    assert len(effective) == 5021
+    assert effective['000000000007']['tags']['cost'] == {'tag_key': 'Cost'}
+
+
+def test_plan_shows_changed_targets_only():
+    organization = organization_snapshot(
+        {'r-1234': {'p-root': TAG_POLICY_DOCUMENT}, 'ou-1234-sandbox': {'p-sandbox': TAG_POLICY_DOCUMENT.replace('"daily"', '"weekly"')}}
+    )
+    event = {'RequestType': UPDATE, 'PhysicalResourceId': 'p-root', 'ResourceProperties': {'Policy': json.dumps({'tags': {}}), 'Attach': 'true'}}
+
+    assert sorted(plan(organization, event)) == ['111111111111', 'ou-1234-workload', 'r-1234']
+    assert sorted(plan(organization, dict(event, RequestType=DELETE))) == ['111111111111', 'ou-1234-workload', 'r-1234']
+    assert plan(organization_snapshot({}), {'RequestType': CREATE, 'ResourceProperties': {'Policy': TAG_POLICY_DOCUMENT, 'Attach': 'true'}})[
+        '222222222222'
+    ] == {'Before': {}, 'After': TAG_POLICY_EFFECTIVE}
+
+
+def test_snapshot_reads_tree_and_attachments():
+    client = MagicMock()
+    client.list_roots.return_value = {'Roots': [{'Id': 'r-1234', 'PolicyTypes': []}]}
+    children = {('r-1234', 'ORGANIZATIONAL_UNIT'): ['ou-1234-workload'], ('ou-1234-workload', 'ACCOUNT'): ['111111111111']}
+    pages = {
+        'list_children': lambda ParentId, ChildType: [{'Children': [{'Id': c} for c in children.get((ParentId, ChildType), [])]}],
+        'list_policies': lambda Filter: [{'Policies': [{'Id': 'p-root'}]}],
+        'list_targets_for_policy': lambda PolicyId: [{'Targets': [{'TargetId': 'r-1234'}]}],
+    }
+    client.get_paginator.side_effect = lambda name: MagicMock(paginate=MagicMock(side_effect=pages[name]))
+    client.describe_policy.return_value = {'Policy': {'Content': TAG_POLICY_DOCUMENT}}
+
+    assert snapshot(Organization(client), TAG_POLICY) == OrganizationSnapshot(
+        'r-1234', {'ou-1234-workload': 'r-1234', '111111111111': 'ou-1234-workload'}, {'r-1234': {'p-root': TAG_POLICY_DOCUMENT}}
+    )
+
+
+def test_main_plan_from_snapshot_file(tmp_path, capsys):
+    (tmp_path / 'snapshot.json').write_text(json.dumps(organization_snapshot({'r-1234': {'p-root': TAG_POLICY_DOCUMENT}}).to_json()))
+    (tmp_path / 'event.json').write_text(json.dumps({'RequestType': DELETE, 'PhysicalResourceId': 'p-root'}))
+
+    main(['TAG_POLICY', '--snapshot', str(tmp_path / 'snapshot.json'), '--plan', str(tmp_path / 'event.json'), '--target', '111111111111'])
+
+    assert json.loads(capsys.readouterr().out) == {'111111111111': {'After': {}, 'Before': TAG_POLICY_EFFECTIVE}}
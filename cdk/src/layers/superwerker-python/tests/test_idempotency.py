@@ -0,0 +1,137 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from botocore.exceptions import ClientError
+from superwerker.cache import DynamoDBStore, InMemoryStore
+from superwerker.idempotency import idempotent, request_key, result_store
+
+EVENT = {
+    'RequestType': 'Create',
+    'StackId': 'arn:aws:cloudformation:eu-central-1:123456789012:stack/superwerker/1',
+    'LogicalResourceId': 'BackupPolicy',
+    'RequestId': 'a',
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_runs_create_once_per_request():
+    handler = MagicMock(side_effect=[{'PhysicalResourceId': 'p-1'}, {'PhysicalResourceId': 'p-2'}, {'PhysicalResourceId': 'p-3'}])
+    decorated = idempotent(store=InMemoryStore())(handler)
+
+    assert decorated(EVENT, None) == {'PhysicalResourceId': 'p-1'}
+    assert decorated(dict(EVENT), None) == {'PhysicalResourceId': 'p-1'}
+    assert decorated(dict(EVENT, RequestId='b'), None) == {'PhysicalResourceId': 'p-2'}
+    assert decorated(dict(EVENT, RequestType='Update'), None) == {'PhysicalResourceId': 'p-3'}
+    assert handler.call_count == 3
+
+
+def test_result_survives_cold_start():
+    store = InMemoryStore()
+    idempotent(store=store)(lambda event, context: {'PhysicalResourceId': 'p-1'})(EVENT, None)
+
+    cold = idempotent(store=store)(MagicMock(side_effect=AssertionError))
+
+    assert cold(EVENT, None) == {'PhysicalResourceId': 'p-1'}
+
+
+def test_failed_request_runs_again():
+    handler = MagicMock(side_effect=[Exception('throttled'), {'PhysicalResourceId': 'p-1'}])
+    decorated = idempotent(store=InMemoryStore())(handler)
+
+    with pytest.raises(Exception):
+        decorated(EVENT, None)
+
+    assert decorated(EVENT, None) == {'PhysicalResourceId': 'p-1'}
+
+
+def test_error_of_the_handler_is_raised_when_its_marker_can_not_be_deleted():
+    store = InMemoryStore()
+    decorated = idempotent(store=store)(MagicMock(side_effect=ValueError('invalid property')))
+
+    with patch.object(store, 'delete', side_effect=Exception('throttled')):
+        with pytest.raises(ValueError, match='invalid property'):
+            decorated(EVENT, None)
+
+
+def test_redelivery_waits_while_the_store_does_not_see_the_marker_expired():
+    clock = Clock()
+    store = MagicMock()
+    # the marker expired by the clock of the decorator, the store does not see it expired until a second later
+    store.add.side_effect = lambda key, expires_at, value: clock.now >= 1001
+    store.get.return_value = (1000, {'Status': 'InProgress', 'Token': 'crashed'})
+
+    decorated = idempotent(store=store, clock=clock, sleep=clock.sleep)(lambda event, context: {'PhysicalResourceId': 'p-1'})
+
+    assert decorated(EVENT, None) == {'PhysicalResourceId': 'p-1'}
+    assert store.add.call_count == 3
+
+
+def test_redelivery_waits_for_the_running_delivery():
+    clock = Clock()
+    store = InMemoryStore(clock=clock)
+    handler = MagicMock(side_effect=AssertionError)
+    running = {'Status': 'InProgress', 'Token': 'first'}
+    store.add(request_key(EVENT), clock() + 60, running)
+
+    def first_delivery_finishes(seconds):
+        clock.sleep(seconds)
+        store.put(request_key(EVENT), clock() + 60, {'Status': 'Done', 'Result': {'PhysicalResourceId': 'p-1'}})
+
+    decorated = idempotent(store=store, clock=clock, sleep=first_delivery_finishes)(handler)
+
+    assert decorated(EVENT, None) == {'PhysicalResourceId': 'p-1'}
+    handler.assert_not_called()
+
+
+def test_redelivery_runs_request_of_crashed_delivery():
+    clock = Clock()
+    store = InMemoryStore(clock=clock)
+    context = MagicMock(get_remaining_time_in_millis=MagicMock(return_value=30000))
+    # the first delivery timed out after writing its marker, which expires with the time it had left
+    store.add(request_key(EVENT), clock() + 30, {'Status': 'InProgress', 'Token': 'crashed'})
+
+    decorated = idempotent(store=store, clock=clock, sleep=clock.sleep)(lambda event, context: {'PhysicalResourceId': 'p-1'})
+
+    assert decorated(EVENT, context) == {'PhysicalResourceId': 'p-1'}
+    assert clock.now == 1030
+    assert store.get(request_key(EVENT))[1] == {'Status': 'Done', 'Result': {'PhysicalResourceId': 'p-1'}}
+
+
+def test_store_errors_are_raised():
+    client = MagicMock()
+    client.put_item.side_effect = ClientError({'Error': {'Code': 'ResourceNotFoundException'}}, 'PutItem')
+    handler = MagicMock()
+
+    with pytest.raises(ClientError):
+        idempotent(store=DynamoDBStore('missing', client))(handler)(EVENT, None)
+
+    handler.assert_not_called()
+
+
+def test_passes_through_events_without_request():
+    handler = MagicMock(return_value='<p>dashboard</p>')
+
+    assert idempotent(store=InMemoryStore())(handler)({}, None) == '<p>dashboard</p>'
+    assert idempotent(store=InMemoryStore())(handler)({}, None) == '<p>dashboard</p>'
+    assert handler.call_count == 2
+
+
+def test_key_is_stable_per_request():
+    assert request_key(EVENT) == request_key(dict(EVENT, ResponseURL='https://example.com/retry'))
+    assert request_key(EVENT) != request_key(dict(EVENT, LogicalResourceId='TagPolicy'))
+
+
+def test_result_store_uses_table_from_environment():
+    with patch.dict('os.environ', {'REQUEST_RESULTS_TABLE': 'results'}):
+        assert result_store().table_name == 'results'
+    with patch.dict('os.environ', clear=True):
+        assert isinstance(result_store(), InMemoryStore)
@@ -0,0 +1,79 @@
+import pytest
+from superwerker.inline_code import check, inline_blocks, update
+
+MODULE = '''import os
+
+
+def handler(event, context):
+    return os.environ['BUCKET']
+'''
+
+TEMPLATE = '''Resources:
+  Function:
+    Type: AWS::Serverless::Function
+    Properties:
+      InlineCode: !Sub |
+        # source: functions/bucket/index.py
+        import os
+
+        def handler(event, context):
+            return '${Bucket}'
+
+      Runtime: python3.14
+  Other:
+    Type: AWS::Lambda::Function
+    Properties:
+      Code:
+        ZipFile: |
+          def handler(event, context):
+              pass
+'''
+
+
+@pytest.fixture
+def repository(tmp_path):
+    (tmp_path / 'functions' / 'bucket').mkdir(parents=True)
+    (tmp_path / 'functions' / 'bucket' / 'index.py').write_text(MODULE)
+    (tmp_path / 'templates').mkdir()
+    (tmp_path / 'templates' / 'template.yaml').write_text(TEMPLATE)
+    return tmp_path
+
+
+def test_finds_inline_blocks():
+    blocks = list(inline_blocks('template.yaml', TEMPLATE.split('\n')))
+
+    assert [(b.start, b.end, b.indent, b.source) for b in blocks] == [
+        (5, 10, 8, 'functions/bucket/index.py'),
+        (17, 19, 10, None),
+    ]
+    assert blocks[0].code.startswith('import os\n')
+    assert blocks[1].code == 'def handler(event, context):\n    pass\n'
+
+
+def test_reports_drifted_block(repository):
+    drifted = check(str(repository), ['templates/*.yaml'])
+
+    assert len(drifted) == 1
+    assert drifted[0].startswith('--- functions/bucket/index.py\n+++ templates/template.yaml:6')
+    assert "-    return os.environ['BUCKET']" in drifted[0]
+
+
+def test_update_rewrites_block_from_module(repository):
+    assert update(str(repository), ['templates/*.yaml']) == ['templates/template.yaml']
+
+    assert check(str(repository), ['templates/*.yaml']) == []
+    template = (repository / 'templates' / 'template.yaml').read_text()
+    assert '      InlineCode: |\n        # source: functions/bucket/index.py\n        import os\n\n\n        def handler' in template
+    assert '      Runtime: python3.14\n  Other:' in template
+    assert update(str(repository), ['templates/*.yaml']) == []
+
+
+def test_refuses_module_with_substitution(repository):
+    (repository / 'functions' / 'bucket' / 'index.py').write_text("BUCKET = '${Bucket}'\n")
+
+    with pytest.raises(ValueError):
+        check(str(repository), ['templates/*.yaml'])
+
+
+def test_templates_match_their_modules():
+    assert check() == []
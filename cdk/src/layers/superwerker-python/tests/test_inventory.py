@@ -0,0 +1,84 @@
+import io
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from superwerker.inventory import InventoryScanner, read_ndjson, write_ndjson
+
+
+def session_mock(account_id, volumes=1, fail_service=None):
+    pages = {
+        'list_tables': lambda: [{'TableNames': ['table']}],
+        'list_tags_of_resource': lambda ResourceArn: [{'Tags': [{'Key': 'superwerker:backup', 'Value': 'daily'}]}],
+        'describe_volumes': lambda: [{'Volumes': [{'VolumeId': 'vol-{}'.format(i)} for i in range(volumes)]}],
+        'describe_db_instances': lambda: [
+            {'DBInstances': [{'DBInstanceArn': 'arn:aws:rds:eu-central-1:{}:db:db'.format(account_id), 'TagList': []}]}
+        ],
+    }
+
+    def client(service, region_name, config):
+        client = MagicMock()
+        if service == fail_service:
+            client.get_paginator.side_effect = ClientError({'Error': {'Code': 'AccessDenied'}}, 'Describe')
+        else:
+            client.get_paginator.side_effect = lambda name: MagicMock(paginate=MagicMock(side_effect=pages[name]))
+        return client
+
+    session = MagicMock()
+    session.client.side_effect = client
+    session.get_partition_for_region.return_value = 'aws'
+    return session
+
+
+def test_scans_all_accounts_regions_and_services():
+    sessions = []
+
+    def session_factory(account_id):
+        sessions.append(account_id)
+        return session_mock(account_id, fail_service='rds' if account_id == '222222222222' else None)
+
+    scanner = InventoryScanner(session_factory, concurrency=4)
+    records = list(scanner.scan(['111111111111', '222222222222'], ['eu-central-1', 'eu-west-1']))
+
+    assert sorted(sessions) == ['111111111111', '222222222222']
+    assert len(records) == 10
+    assert {
+        'AccountId': '111111111111',
+        'Region': 'eu-west-1',
+        'ResourceARN': 'arn:aws:dynamodb:eu-west-1:111111111111:table/table',
+        'ResourceType': 'dynamodb:table',
+        'Tags': {'superwerker:backup': 'daily'},
+    } in records
+    assert sorted((e['AccountId'], e['Region'], e['Scanner']) for e in scanner.errors) == [
+        ('222222222222', 'eu-central-1', 'rds_instances'),
+        ('222222222222', 'eu-west-1', 'rds_instances'),
+    ]
+
+
+def test_reports_accounts_failing_with_any_exception():
+    def session_factory(account_id):
+        if account_id == '222222222222':
+            raise ValueError('no credentials')
+        return session_mock(account_id)
+
+    scanner = InventoryScanner(session_factory, concurrency=4)
+    records = list(scanner.scan(['111111111111', '222222222222'], ['eu-central-1']))
+
+    assert {r['AccountId'] for r in records} == {'111111111111'}
+    assert {(e['AccountId'], e['Region'], e['Error']) for e in scanner.errors} == {('222222222222', 'eu-central-1', 'no credentials')}
+    assert len(scanner.errors) == len(scanner.scanners)
+
+
+def test_consumer_can_stop_early_with_bounded_queue():
+    scanner = InventoryScanner(lambda account_id: session_mock(account_id, volumes=1000), concurrency=2, queue_size=5)
+    records = scanner.scan(['111111111111'], ['eu-central-1'])
+
+    first = [next(records) for _ in range(3)]
+    records.close()
+
+    assert len(first) == 3
+
+
+def test_ndjson_round_trip():
+    out = io.StringIO()
+    write_ndjson([{'ResourceARN': 'arn', 'Tags': {}}], out)
+
+    assert list(read_ndjson(out.getvalue().splitlines() + [''])) == [{'ResourceARN': 'arn', 'Tags': {}}]
@@ -0,0 +1,57 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from superwerker.lazy import Lazy, lazy_client, lazy_import
+
+
+def test_creates_target_on_first_use_only():
+    factory = MagicMock()
+    lazy = Lazy(factory)
+
+    factory.assert_not_called()
+
+    lazy.describe()
+    lazy.describe()
+
+    factory.assert_called_once()
+    assert factory.return_value.describe.call_count == 2
+
+
+def test_creates_target_once_for_concurrent_first_use():
+    factory = MagicMock()
+    lazy = Lazy(factory)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: lazy.describe(), range(32)))
+
+    factory.assert_called_once()
+
+
+def test_lazy_client_gets_shared_client():
+    with patch('superwerker.clients.client') as client:
+        ssm = lazy_client('ssm', region_name='us-east-1')
+        client.assert_not_called()
+
+        ssm.get_parameter(Name='/superwerker/foo')
+
+        client.assert_called_once_with('ssm', region_name='us-east-1')
+        client.return_value.get_parameter.assert_called_once_with(Name='/superwerker/foo')
+
+
+def test_lazy_import_imports_on_first_use():
+    sys.modules.pop('this', None)
+    with patch('sys.stdout'):
+        module = lazy_import('this')
+
+        assert 'this' not in sys.modules
+        assert module.s
+        assert 'this' in sys.modules
+
+
+def test_attributes_can_be_patched():
+    module = lazy_import('json')
+
+    with patch.object(module, 'dumps', return_value='patched'):
+        assert module.dumps({}) == 'patched'
+
+    assert module.dumps({}) == '{}'
@@ -0,0 +1,120 @@
+import threading
+from unittest.mock import MagicMock, patch
+import pytest
+from botocore.exceptions import ClientError
+from superwerker.lock import DynamoDBLockBackend, InMemoryLockBackend, Lock, LockLost, LockTimeout, NoLock, organizations_lock
+from superwerker.organizations import Organization
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with patch('superwerker.lock.time.sleep'), patch('superwerker.retry.time.sleep'):
+        yield
+
+
+def test_fencing_tokens_increase_across_holders():
+    backend = InMemoryLockBackend()
+    clock = Clock()
+
+    with Lock(backend, 'organizations', clock=clock) as first:
+        assert first.token == 1
+    with Lock(backend, 'organizations', clock=clock) as second:
+        assert second.token == 2
+
+
+def test_waits_for_holder_and_times_out():
+    backend = InMemoryLockBackend()
+    clock = Clock()
+    holder = Lock(backend, 'organizations', lease_seconds=60, clock=clock)
+    holder.acquire()
+
+    with pytest.raises(LockTimeout):
+        Lock(backend, 'organizations', wait_timeout=0, clock=clock).acquire()
+
+
+def test_expired_lease_is_taken_over_and_old_holder_is_fenced():
+    backend = InMemoryLockBackend()
+    clock = Clock()
+    # e.g. a frozen execution environment, no heartbeat renews its lease
+    stalled = Lock(backend, 'organizations', lease_seconds=60, clock=clock, heartbeat=False)
+    stalled.acquire()
+
+    clock.now += 61
+    with Lock(backend, 'organizations', clock=clock) as successor:
+        assert successor.token == 2
+        with pytest.raises(LockLost):
+            stalled.ensure_held()
+
+
+def test_ensure_held_renews_lease():
+    backend = InMemoryLockBackend()
+    clock = Clock()
+    lock = Lock(backend, 'organizations', lease_seconds=60, clock=clock)
+    lock.acquire()
+
+    clock.now += 50
+    lock.ensure_held()
+    clock.now += 50
+
+    assert backend.acquire('organizations', 'someone-else', 60, clock()) is None
+
+
+def test_heartbeat_renews_lease_while_held():
+    backend = InMemoryLockBackend()
+    clock = Clock()
+    lock = Lock(backend, 'organizations', lease_seconds=0.03, clock=clock)
+    lock.acquire()
+
+    clock.now += 1  # e.g. a write retrying longer than the lease
+    threading.Event().wait(0.2)
+
+    assert backend.acquire('organizations', 'someone-else', 0.03, clock()) is None
+    lock.ensure_held()
+    lock.release()
+    assert backend.acquire('organizations', 'someone-else', 0.03, clock()) == 2
+
+
+def test_organization_does_not_write_without_lock():
+    backend = InMemoryLockBackend()
+    clock = Clock()
+    lock = Lock(backend, 'organizations', lease_seconds=60, clock=clock)
+    client = MagicMock()
+    client.list_roots.return_value = {'Roots': [{'Id': 'r-1234', 'PolicyTypes': []}]}
+
+    with pytest.raises(LockLost):
+        Organization(client, lock=lock).attach_policy('p-abc123')
+    client.attach_policy.assert_not_called()
+
+
+def test_dynamodb_backend_conditional_write():
+    client = MagicMock()
+    client.update_item.return_value = {'Attributes': {'FencingToken': {'N': '7'}}}
+
+    assert DynamoDBLockBackend('locks', client).acquire('organizations', 'me', 60, 1000) == 7
+
+    kwargs = client.update_item.call_args.kwargs
+    assert kwargs['Key'] == {'LockName': {'S': 'organizations'}}
+    assert kwargs['ExpressionAttributeValues'][':expires'] == {'N': '1060'}
+    assert 'ExpiresAt < :now' in kwargs['ConditionExpression']
+
+
+def test_dynamodb_backend_returns_none_while_held():
+    client = MagicMock()
+    client.update_item.side_effect = ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+
+    assert DynamoDBLockBackend('locks', client).acquire('organizations', 'me', 60, 1000) is None
+    assert DynamoDBLockBackend('locks', client).renew('organizations', 'me', 7, 60, 1000) is False
+
+
+def test_organizations_lock_without_table(monkeypatch):
+    monkeypatch.delenv('ORGANIZATIONS_LOCK_TABLE', raising=False)
+
+    assert isinstance(organizations_lock(), NoLock)
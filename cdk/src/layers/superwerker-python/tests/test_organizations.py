@@ -0,0 +1,180 @@
+from unittest.mock import MagicMock, call, patch
+import pytest
+from botocore.exceptions import ClientError
+from superwerker.organizations import (
+    CREATE,
+    DELETE,
+    TAG_POLICY,
+    UPDATE,
+    Organization,
+    handle_enable_policy_type_request,
+    handle_policy_request,
+    policy_hash,
+)
+
+ROOT = {'Id': 'r-1234', 'PolicyTypes': []}
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with patch('superwerker.retry.time.sleep'):
+        yield
+
+
+def organizations_mock(targets=None, attached=None):
+    client = MagicMock()
+    pages = {
+        'list_targets_for_policy': lambda PolicyId: [{'Targets': [{'TargetId': t} for t in (targets or {}).get(PolicyId, [])]}],
+        'list_policies_for_target': lambda TargetId, Filter: [
+            {'Policies': [{'Id': p} for p in (attached or {}).get(TargetId, [])][:1]},
+            {'Policies': [{'Id': p} for p in (attached or {}).get(TargetId, [])][1:]},
+        ],
+    }
+    client.get_paginator.side_effect = lambda name: MagicMock(paginate=MagicMock(side_effect=pages[name]))
+    client.list_roots.return_value = {'Roots': [ROOT]}
+    client.create_policy.__name__ = 'create_policy'
+    client.update_policy.__name__ = 'update_policy'
+    client.attach_policy.__name__ = 'attach_policy'
+    client.detach_policy.__name__ = 'detach_policy'
+    client.delete_policy.__name__ = 'delete_policy'
+    client.enable_policy_type.__name__ = 'enable_policy_type'
+    client.create_policy.return_value = {'Policy': {'PolicySummary': {'Id': 'p-abc123'}}}
+    return client
+
+
+def deployed_policy(content, name='TagPolicy', description='superwerker - TagPolicy'):
+    return {'Policy': {'PolicySummary': {'Id': 'p-abc123', 'Name': name, 'Description': description}, 'Content': content}}
+
+
+def policy_event(request_type, physical_resource_id=None):
+    return {
+        'RequestType': request_type,
+        'LogicalResourceId': 'TagPolicy',
+        'PhysicalResourceId': physical_resource_id,
+        'ResourceProperties': {'Policy': '{"tags": {}}', 'Attach': 'true'},
+    }
+
+
+def test_create_and_attach_looks_up_root_once():
+    client = organizations_mock()
+
+    response = handle_policy_request(policy_event(CREATE), TAG_POLICY, organization=Organization(client))
+
+    assert response == {'PhysicalResourceId': 'p-abc123'}
+    client.create_policy.assert_called_once_with(
+        Content='{"tags": {}}', Description='superwerker - TagPolicy', Name='TagPolicy', Type=TAG_POLICY
+    )
+    client.attach_policy.assert_called_once_with(PolicyId='p-abc123', TargetId='r-1234')
+    client.list_roots.assert_called_once()
+
+
+def test_update():
+    client = organizations_mock()
+    client.describe_policy.return_value = deployed_policy('{"tags": {"superwerker:backup": {}}}')
+
+    handle_policy_request(policy_event(UPDATE, 'p-abc123'), TAG_POLICY, name='superwerker', organization=Organization(client))
+
+    client.update_policy.assert_called_once_with(
+        PolicyId='p-abc123', Content='{"tags": {}}', Description='superwerker - TagPolicy', Name='superwerker'
+    )
+
+
+def test_update_skips_reformatted_policy():
+    client = organizations_mock()
+    client.describe_policy.return_value = deployed_policy('{\n    "tags": {\n    }\n}')
+
+    response = handle_policy_request(policy_event(UPDATE, 'p-abc123'), TAG_POLICY, organization=Organization(client))
+
+    assert response == {'PhysicalResourceId': 'p-abc123'}
+    client.describe_policy.assert_called_once_with(PolicyId='p-abc123')
+    client.update_policy.assert_not_called()
+
+
+def test_update_when_name_changed():
+    client = organizations_mock()
+    client.describe_policy.return_value = deployed_policy('{"tags": {}}', name='OldName')
+
+    handle_policy_request(policy_event(UPDATE, 'p-abc123'), TAG_POLICY, organization=Organization(client))
+
+    client.update_policy.assert_called_once()
+
+
+def test_policy_hash_ignores_key_order_and_whitespace():
+    assert policy_hash('{"a": 1, "b": [2, 3]}') == policy_hash('{"b":[2,3],\n "a":1}')
+    assert policy_hash('{"b": [3, 2]}') != policy_hash('{"b": [2, 3]}')
+    assert policy_hash('not json') is None
+
+
+def test_delete_detaches_policy_from_all_targets():
+    client = organizations_mock(targets={'p-abc123': ['r-1234', 'ou-1234-abcdefgh']})
+
+    handle_policy_request(policy_event(DELETE, 'p-abc123'), TAG_POLICY, organization=Organization(client))
+
+    assert client.detach_policy.call_args_list == [
+        call(PolicyId='p-abc123', TargetId='ou-1234-abcdefgh'),
+        call(PolicyId='p-abc123', TargetId='r-1234'),
+    ]
+    client.delete_policy.assert_called_once_with(PolicyId='p-abc123')
+    client.list_roots.assert_not_called()
+
+
+def test_attachment_lookup_reads_all_pages_once():
+    client = organizations_mock(attached={'r-1234': ['p-first', 'p-second']})
+    organization = Organization(client)
+
+    assert organization.policy_attached('p-second', TAG_POLICY)
+    assert not organization.policy_attached('p-other', TAG_POLICY)
+
+    client.get_paginator.assert_called_once_with('list_policies_for_target')
+    client.list_roots.assert_called_once()
+
+
+def test_attachment_index_follows_writes():
+    client = organizations_mock(attached={'r-1234': []})
+    organization = Organization(client)
+    assert not organization.policy_attached('p-abc123', TAG_POLICY)
+
+    organization.attach_policy('p-abc123', policy_type=TAG_POLICY)
+    assert organization.policy_attached('p-abc123', TAG_POLICY)
+
+    organization.detach_policy('p-abc123')
+    assert not organization.policy_attached('p-abc123', TAG_POLICY)
+    client.get_paginator.assert_called_once()
+
+
+def test_delete_ignores_invalid_policy_id():
+    client = organizations_mock()
+
+    handle_policy_request(policy_event(DELETE, 'some-request-id'), TAG_POLICY, organization=Organization(client))
+
+    client.delete_policy.assert_not_called()
+
+
+def test_concurrent_modification_is_retried():
+    client = organizations_mock()
+    conflict = ClientError({'Error': {'Code': 'ConcurrentModificationException'}}, 'AttachPolicy')
+    client.attach_policy.side_effect = [conflict, {}]
+
+    Organization(client).attach_policy('p-abc123')
+
+    assert client.attach_policy.call_count == 2
+
+
+def test_list_policies_is_retried():
+    client = organizations_mock()
+    conflict = ClientError({'Error': {'Code': 'ConcurrentModificationException'}}, 'ListPolicies')
+    client.get_paginator.side_effect = lambda name: MagicMock(paginate=MagicMock(side_effect=[conflict, [{'Policies': [{'Id': 'p-abc123'}]}]]))
+
+    assert Organization(client).list_policies(TAG_POLICY) == [{'Id': 'p-abc123'}]
+
+
+def test_enable_policy_type_only_when_disabled():
+    client = organizations_mock()
+    client.enable_policy_type.return_value = {'Root': {'Id': 'r-1234', 'PolicyTypes': [{'Type': TAG_POLICY, 'Status': 'ENABLED'}]}}
+    organization = Organization(client)
+
+    assert handle_enable_policy_type_request({'RequestType': CREATE}, TAG_POLICY, organization) == {'PhysicalResourceId': TAG_POLICY}
+    handle_enable_policy_type_request({'RequestType': CREATE}, TAG_POLICY, organization)
+
+    client.enable_policy_type.assert_called_once_with(RootId='r-1234', PolicyType=TAG_POLICY)
+    client.list_roots.assert_called_once()
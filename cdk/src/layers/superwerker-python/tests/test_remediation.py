@@ -0,0 +1,95 @@
+import json
+from unittest.mock import MagicMock, patch
+import pytest
+from botocore.exceptions import ClientError
+from superwerker.remediation import ALREADY_COMPLIANT, FAILED, TAGGED, WOULD_TAG, RemediationResult, main, remediate
+
+VOLUME = 'arn:aws:ec2:eu-central-1:{}:volume/vol-{}'
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with patch('superwerker.retry.time.sleep'):
+        yield
+
+
+def tagging_mock(tags=None, failed=()):
+    client = MagicMock()
+    client.get_resources.side_effect = lambda ResourceARNList: {
+        'ResourceTagMappingList': [
+            {'ResourceARN': arn, 'Tags': [{'Key': 'superwerker:backup', 'Value': (tags or {})[arn]}] if arn in (tags or {}) else []}
+            for arn in ResourceARNList
+        ]
+    }
+    client.tag_resources.side_effect = lambda ResourceARNList, Tags: {
+        'FailedResourcesMap': {arn: {'StatusCode': 400, 'ErrorCode': 'InvalidParameterException'} for arn in ResourceARNList if arn in failed}
+    }
+    return client
+
+
+def test_groups_by_account_and_region_in_chunks_of_20():
+    clients = {}
+    factory = MagicMock(side_effect=lambda account, region: clients.setdefault((account, region), tagging_mock()))
+    arns = [VOLUME.format('111111111111', i) for i in range(45)] + [VOLUME.format('222222222222', i) for i in range(3)]
+
+    results = remediate(arns + arns[:5], factory)
+
+    assert sorted(clients) == [('111111111111', 'eu-central-1'), ('222222222222', 'eu-central-1')]
+    # one client, i.e. one assumed role, per account and region, not per chunk
+    assert factory.call_count == 2
+    assert [len(c.kwargs['ResourceARNList']) for c in clients[('111111111111', 'eu-central-1')].tag_resources.call_args_list] == [20, 20, 5]
+    clients[('111111111111', 'eu-central-1')].tag_resources.assert_called_with(ResourceARNList=arns[40:45], Tags={'superwerker:backup': 'daily'})
+    assert len(results) == 48
+    assert {r.status for r in results} == {TAGGED}
+
+
+def test_reports_per_arn_and_skips_compliant_resources():
+    arns = [VOLUME.format('111111111111', i) for i in range(3)]
+    client = tagging_mock(tags={arns[0]: 'none', arns[1]: 'weekly'}, failed=[arns[2]])
+
+    results = remediate(arns, lambda account, region: client)
+
+    assert results == [
+        RemediationResult(arns[0], ALREADY_COMPLIANT),
+        RemediationResult(arns[1], TAGGED, previous='weekly'),
+        RemediationResult(arns[2], FAILED, 'InvalidParameterException'),
+    ]
+    client.tag_resources.assert_called_once_with(ResourceARNList=arns[1:], Tags={'superwerker:backup': 'daily'})
+
+
+def test_dry_run_and_errors():
+    arns = [VOLUME.format('111111111111', 1)]
+    client = tagging_mock()
+
+    assert remediate(arns, lambda account, region: client, dry_run=True) == [RemediationResult(arns[0], WOULD_TAG)]
+    client.tag_resources.assert_not_called()
+
+    client.get_resources.side_effect = ClientError({'Error': {'Code': 'AccessDeniedException'}}, 'GetResources')
+    assert remediate(arns, lambda account, region: client) == [RemediationResult(arns[0], FAILED, 'AccessDeniedException')]
+
+
+def test_failing_account_only_fails_its_own_arns():
+    broken, working = VOLUME.format('111111111111', 1), VOLUME.format('222222222222', 1)
+    clients = {'222222222222': tagging_mock()}
+
+    def factory(account, region):
+        if account not in clients:
+            raise ValueError('role can not be assumed')
+        return clients[account]
+
+    results = remediate([broken, working], factory)
+
+    assert results == [RemediationResult(broken, FAILED, "ValueError('role can not be assumed')"), RemediationResult(working, TAGGED)]
+
+
+def test_main_remediates_non_compliant_resources_of_inventory(tmp_path, capsys):
+    compliant, non_compliant = VOLUME.format('111111111111', 1), VOLUME.format('111111111111', 2)
+    (tmp_path / 'inventory.ndjson').write_text(
+        json.dumps({'ResourceARN': compliant, 'Tags': {'superwerker:backup': 'daily'}}) + '\n' + json.dumps({'ResourceARN': non_compliant}) + '\n'
+    )
+    client = tagging_mock()
+
+    with patch('superwerker.remediation.tagging_client_factory', return_value=lambda account, region: client):
+        main([str(tmp_path / 'inventory.ndjson')])
+
+    assert json.loads(capsys.readouterr().out) == {'arn': non_compliant, 'status': TAGGED, 'error': None, 'previous': None}
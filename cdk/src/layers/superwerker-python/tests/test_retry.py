@@ -0,0 +1,84 @@
+from unittest.mock import MagicMock, patch
+import pytest
+from botocore.exceptions import ClientError, CredentialRetrievalError, EndpointConnectionError
+from superwerker.retry import is_throttling_error, throttling_back_off
+
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code}}, 'AttachPolicy')
+
+
+class Clock:
+    """Monotonic clock advanced by the waits and by the attempts themselves."""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.mark.parametrize(
+    'error, retryable',
+    [
+        (client_error('ConcurrentModificationException'), True),
+        (CredentialRetrievalError(provider='container-role', error_msg='timed out'), True),
+        # retried by the clients of superwerker.clients already
+        (client_error('TooManyRequestsException'), False),
+        (client_error('ThrottlingException'), False),
+        (client_error('ProvisionedThroughputExceededException'), False),
+        (EndpointConnectionError(endpoint_url='https://organizations.us-east-1.amazonaws.com'), False),
+        (client_error('DuplicatePolicyException'), False),
+        (client_error('AccessDeniedException'), False),
+        (ValueError('bug'), False),
+    ],
+)
+def test_is_throttling_error(error, retryable):
+    assert is_throttling_error(error) == retryable
+
+
+def test_first_attempt_does_not_sleep():
+    with patch('superwerker.retry.time.sleep') as sleep:
+        assert throttling_back_off(lambda: 'ok') == 'ok'
+    sleep.assert_not_called()
+
+
+def test_retries_with_full_jitter_exponential_delays():
+    request = MagicMock(side_effect=[client_error('ConcurrentModificationException')] * 3 + ['ok'])
+    with patch('superwerker.retry.time.sleep') as sleep, patch('superwerker.retry.random.uniform', side_effect=lambda a, b: b):
+        assert throttling_back_off(request, starting_delay=1, max_delay=3) == 'ok'
+    assert [c.args[0] for c in sleep.call_args_list] == [1, 2, 3]
+
+
+def test_does_not_retry_other_errors():
+    request = MagicMock(side_effect=client_error('DuplicatePolicyException'))
+    with patch('superwerker.retry.time.sleep'), pytest.raises(ClientError):
+        throttling_back_off(request)
+    request.assert_called_once()
+
+
+def test_gives_up_when_retry_budget_is_exhausted():
+    clock = Clock()
+    request = MagicMock(side_effect=client_error('ConcurrentModificationException'))
+    with patch('superwerker.retry.time.sleep', clock.sleep), patch('superwerker.retry.random.uniform', side_effect=lambda a, b: b):
+        with pytest.raises(ClientError):
+            throttling_back_off(request, starting_delay=1, max_delay=10, retry_budget=10, clock=clock)
+    # waits 1, 2, 4 (7s in total), the next wait of 8s would exceed the budget
+    assert request.call_count == 4
+
+
+def test_retry_budget_includes_the_time_of_the_attempts():
+    clock = Clock()
+
+    def request():
+        clock.now += 50  # e.g. an attempt running into the read timeout
+        raise client_error('ConcurrentModificationException')
+
+    with patch('superwerker.retry.time.sleep', clock.sleep), patch('superwerker.retry.random.uniform', side_effect=lambda a, b: b):
+        with pytest.raises(ClientError):
+            throttling_back_off(request, starting_delay=1, retry_budget=120, clock=clock)
+    # attempts start at 0, 51 and 103, after the third one the next would start at 157, beyond the budget
+    assert clock.now == 153
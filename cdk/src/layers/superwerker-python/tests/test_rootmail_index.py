@@ -0,0 +1,99 @@
+import datetime
+import io
+import json
+from unittest.mock import MagicMock, patch
+
+from superwerker.rootmail_index import main, query
+
+
+def entry(message_id, recipient, date, subject='Your AWS bill'):
+    return {'messageId': message_id, 'recipient': recipient, 'subject': subject, 'date': date + 'T08:00:00.000Z'}
+
+
+ENTRIES = [
+    entry('a', 'alias-1', '2026-10-01'),
+    entry('b', 'alias-2', '2026-10-02', 'Amazon Web Services Password Assistance'),
+    entry('c', 'alias-1', '2026-10-03', 'Amazon Web Services Password Assistance'),
+    entry('d', 'alias-1', '2026-10-09'),
+]
+
+
+def s3_client(entries=ENTRIES, merged_before='2026-10-09'):
+    """
+    Stands in for S3 with the index of `entries`, the ones of days before `merged_before` merged into manifests, listing
+    keys in order from StartAfter like S3 does.
+    """
+    objects = {}
+    for e in entries:
+        day = e['date'][:10]
+        if day < merged_before:
+            objects.setdefault('RootMailIndex/day={}.ndjson'.format(day), []).append(e)
+            objects.setdefault('RootMailIndex/recipient={}/{}.ndjson'.format(e['recipient'], day[:7]), []).append(e)
+        else:
+            objects['RootMailIndex/mails/{}/{}.json'.format(day, e['messageId'])] = [e]
+
+    s3 = MagicMock(objects=objects)
+    s3.get_paginator.return_value.paginate.side_effect = lambda Bucket, Prefix, StartAfter: [
+        {'Contents': [{'Key': key} for key in sorted(objects) if key.startswith(Prefix) and key > StartAfter]}
+    ]
+    s3.get_object.side_effect = lambda Bucket, Key: {
+        'Body': io.BytesIO(''.join(json.dumps(e) + '\n' for e in objects[Key]).encode())
+    }
+    return s3
+
+
+def test_reads_one_manifest_per_day_of_the_range():
+    s3 = s3_client()
+
+    entries = query('rootmail-bucket', '2026-10-02', datetime.date(2026, 10, 3), s3=s3)
+
+    assert [e['messageId'] for e in entries] == ['b', 'c']
+    assert [c.kwargs['Key'] for c in s3.get_object.call_args_list] == [
+        'RootMailIndex/day=2026-10-02.ndjson',
+        'RootMailIndex/day=2026-10-03.ndjson',
+    ]
+
+
+def test_reads_only_the_monthly_manifests_of_the_recipient():
+    s3 = s3_client()
+
+    entries = query('rootmail-bucket', '2026-10-01', '2026-10-31', recipient='alias-1', subject='password', s3=s3)
+
+    assert [e['messageId'] for e in entries] == ['c']
+    assert {c.kwargs['Key'] for c in s3.get_object.call_args_list} == {
+        'RootMailIndex/recipient=alias-1/2026-10.ndjson',
+        'RootMailIndex/mails/2026-10-09/d.json',
+    }
+
+
+def test_reads_entries_not_merged_yet():
+    s3 = s3_client(merged_before='2026-10-03')
+
+    entries = query('rootmail-bucket', '2026-10-01', '2026-10-31', recipient='alias-1', s3=s3)
+
+    assert [e['messageId'] for e in entries] == ['a', 'c', 'd']
+
+
+def test_entry_merged_but_not_deleted_yet_is_kept_once():
+    s3 = s3_client(merged_before='2026-10-10')
+    s3.objects['RootMailIndex/mails/2026-10-09/d.json'] = [ENTRIES[3]]
+
+    assert [e['messageId'] for e in query('rootmail-bucket', '2026-10-09', s3=s3)] == ['d']
+
+
+def test_lists_entries_before_the_manifests_they_are_merged_into():
+    s3 = s3_client()
+
+    query('rootmail-bucket', '2026-10-01', '2026-10-31', s3=s3)
+
+    assert [c.kwargs['Prefix'] for c in s3.get_paginator.return_value.paginate.call_args_list] == [
+        'RootMailIndex/mails/',
+        'RootMailIndex/day=',
+    ]
+
+
+def test_main_prints_the_entries_of_a_single_day(capsys):
+    with patch('superwerker.rootmail_index.client', return_value=s3_client()):
+        main(['--bucket', 'rootmail-bucket', '--from', '2026-10-09'])
+
+    assert [json.loads(line)['messageId'] for line in capsys.readouterr().out.splitlines()] == ['d']
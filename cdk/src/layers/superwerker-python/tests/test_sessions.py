@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+import pytest
+from superwerker.sessions import SessionPool, assumed_role_session
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with patch('superwerker.retry.time.sleep'):
+        yield
+
+
+def session_mock():
+    session = MagicMock(region_name='eu-central-1')
+    session.get_partition_for_region.return_value = 'aws'
+    session.client.return_value.get_caller_identity.return_value = {'Account': '111111111111'}
+    session.client.return_value.assume_role.return_value = {
+        'Credentials': {'AccessKeyId': 'key', 'SecretAccessKey': 'secret', 'SessionToken': 'token'}
+    }
+    return session
+
+
+def test_assumes_role_in_member_account():
+    session = session_mock()
+
+    assumed = assumed_role_session('222222222222', session=session)
+
+    session.client.return_value.assume_role.assert_called_once_with(
+        RoleArn='arn:aws:iam::222222222222:role/AWSControlTowerExecution', RoleSessionName='superwerker'
+    )
+    assert assumed.get_credentials().access_key == 'key'
+    assert assumed.region_name == 'eu-central-1'
+
+
+def test_own_account_uses_session():
+    session = session_mock()
+
+    assert assumed_role_session('111111111111', session=session, own_account_id='111111111111') is session
+    session.client.return_value.assume_role.assert_not_called()
+    # the caller looked up its own account once, not once per account
+    session.client.return_value.get_caller_identity.assert_not_called()
+
+
+def test_pool_refreshes_before_expiry():
+    clock = Clock()
+    create = MagicMock(side_effect=['first', 'second'])
+    pool = SessionPool(lifetime=3600, refresh_margin=600, clock=clock)
+
+    assert pool.get('billing', create) == 'first'
+    clock.now += 2999
+    assert pool.get('billing', create) == 'first'
+    clock.now += 1
+    assert pool.get('billing', create) == 'second'
+
+
+def test_pool_creates_once_for_concurrent_callers():
+    create = MagicMock(return_value='session')
+    pool = SessionPool()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: pool.get('billing', create), range(32)))
+
+    assert results == ['session'] * 32
+    create.assert_called_once()
+
+    pool.invalidate('billing')
+    pool.get('billing', create)
+    assert create.call_count == 2
@@ -23,7 +23,8 @@ const REGIONS = [
   'us-west-2',
 ];
 
-const REGIONS_DEV = ['eu-central-1'];
+// the rootmail stack set runs its functions in eu-west-1 from the asset bucket there
+const REGIONS_DEV = ['eu-central-1', 'eu-west-1'];
 
 const retries = 20;
 const regions = process.env.NODE_ENV != 'development' ? REGIONS : REGIONS_DEV;
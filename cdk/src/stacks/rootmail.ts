@@ -16,6 +16,7 @@ import * as cdk from 'aws-cdk-lib';
 import { CfnRole } from 'aws-cdk-lib/aws-iam';
 import { NagSuppressions } from 'cdk-nag';
 import { Construct } from 'constructs';
+import { PythonFunctionAsset } from '../constructs/python-function-asset';
 import { HostedZoneDkim } from '../constructs/rootmail-hosted-zone-dkim';
 
 export class RootmailStack extends NestedStack {
@@ -119,6 +120,14 @@ export class RootmailStack extends NestedStack {
     });
     (stackSetAdminRole.node.defaultChild as CfnRole).overrideLogicalId('StackSetAdministrationRole');
 
+    // the stack set functions load their code from the asset bucket of the stack set region
+    const opsSantaCode = new PythonFunctionAsset(this, 'OpsSantaCode', 'rootmail-ops-santa');
+    const sesReceiptRuleSetActivationCode = new PythonFunctionAsset(
+      this,
+      'SESReceiptRuleSetActivationCode',
+      'rootmail-ses-receipt-rule-set-activation',
+    );
+
     new cdk.CfnStackSet(this, 'SESReceiveStack', {
       permissionModel: 'SELF_MANAGED',
       stackSetName: Stack.of(this).stackName + '-ReceiveStack',
@@ -138,6 +147,8 @@ export class RootmailStack extends NestedStack {
         Subdomain: subdomain.valueAsString,
         EmailBucket: this.emailBucket.bucketName,
         EmailBucketArn: this.emailBucket.bucketArn,
+        OpsSantaCodeKey: opsSantaCode.s3ObjectKey,
+        SESReceiptRuleSetActivationCodeKey: sesReceiptRuleSetActivationCode.s3ObjectKey,
       }),
     });
   }
@@ -59,6 +59,7 @@ class ServiceControlPolicyRootProvider extends Construct {
             'organizations:DetachPolicy',
             'organizations:ListRoots',
             'organizations:ListPolicies',
+            'organizations:ListTargetsForPolicy',
           ],
         }),
       ],
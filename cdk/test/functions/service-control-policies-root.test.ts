@@ -5,6 +5,7 @@ import {
   DetachPolicyCommand,
   ListPoliciesCommand,
   ListRootsCommand,
+  ListTargetsForPolicyCommand,
   OrganizationsClient,
   UpdatePolicyCommand,
 } from '@aws-sdk/client-organizations';
@@ -193,6 +194,10 @@ describe('service control policies', () => {
       ],
     });
 
+    organizationClientMock.on(ListTargetsForPolicyCommand).resolves({
+      Targets: [{ TargetId: rootAccountId }, { TargetId: 'ou-1234-abcdefgh' }],
+    });
+
     organizationClientMock.on(DetachPolicyCommand).resolves({});
     organizationClientMock.on(DeletePolicyCommand).resolves({});
 
@@ -211,6 +216,11 @@ describe('service control policies', () => {
       TargetId: rootAccountId,
     });
 
+    expect(organizationClientMock).toHaveReceivedCommandWith(DetachPolicyCommand, {
+      PolicyId: policyId,
+      TargetId: 'ou-1234-abcdefgh',
+    });
+
     expect(organizationClientMock).toHaveReceivedCommandWith(DeletePolicyCommand, {
       PolicyId: policyId,
     });
@@ -294,6 +304,10 @@ describe('service control policies', () => {
       ],
     });
 
+    organizationClientMock.on(ListTargetsForPolicyCommand).resolves({
+      Targets: [{ TargetId: rootAccountId }],
+    });
+
     organizationClientMock.on(DetachPolicyCommand).rejects(new Error('PolicyNotAttachedException'));
     organizationClientMock.on(DeletePolicyCommand).resolves({});
 
@@ -7,13 +7,12 @@ import pytest
 import json
 
 sts = boto3.client('sts')
-ssm = boto3.client('ssm')
 organizations = boto3.client('organizations')
 config_client = boto3.client('config')
 
 @pytest.fixture(scope="module")
-def audit_account_id():
-    return ssm.get_parameter(Name='/superwerker/account_id_audit')['Parameter']['Value']
+def audit_account_id(superwerker_config):
+    return superwerker_config['/superwerker/account_id_audit']
 
 @pytest.fixture(scope="module")
 def audit_account_role(audit_account_id):
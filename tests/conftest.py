@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# the superwerker package of the Lambda layer, it only needs boto3
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cdk', 'src', 'layers', 'superwerker-python'))
+
+from superwerker.config import ConfigReader  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def superwerker_config():
+    # all /superwerker parameters in one paginated call, instead of a get_parameter per fixture and test module
+    return ConfigReader().parameters()
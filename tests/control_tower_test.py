@@ -3,7 +3,6 @@ import pytest
 
 control_tower = boto3.client('controltower')
 cloudtrail = boto3.client('cloudtrail')
-ssm = boto3.client('ssm')
 sts = boto3.client('sts')
 
 
@@ -12,16 +11,16 @@ def management_account_id():
     return sts.get_caller_identity()['Account']
 
 @pytest.fixture(scope="module")
-def audit_account_id():
-    return ssm.get_parameter(Name='/superwerker/account_id_audit')['Parameter']['Value']
+def audit_account_id(superwerker_config):
+    return superwerker_config['/superwerker/account_id_audit']
 
 @pytest.fixture(scope="module")
-def log_archive_account_id():
-    return ssm.get_parameter(Name='/superwerker/account_id_logarchive')['Parameter']['Value']
+def log_archive_account_id(superwerker_config):
+    return superwerker_config['/superwerker/account_id_logarchive']
 
 @pytest.fixture(scope="module")
-def kms_key_arn():
-    return ssm.get_parameter(Name='/superwerker/controltower/kms_key')['Parameter']['Value']
+def kms_key_arn(superwerker_config):
+    return superwerker_config['/superwerker/controltower/kms_key']
 
 
 
@@ -3,7 +3,6 @@ import botocore
 import pytest
 
 guardduty = boto3.client('guardduty')
-ssm = boto3.client('ssm')
 sts = boto3.client('sts')
 
 
@@ -12,12 +11,12 @@ def management_account_id():
     return sts.get_caller_identity()['Account']
 
 @pytest.fixture(scope="module")
-def audit_account_id():
-    return ssm.get_parameter(Name='/superwerker/account_id_audit')['Parameter']['Value']
+def audit_account_id(superwerker_config):
+    return superwerker_config['/superwerker/account_id_audit']
 
 @pytest.fixture(scope="module")
-def log_archive_account_id():
-    return ssm.get_parameter(Name='/superwerker/account_id_logarchive')['Parameter']['Value']
+def log_archive_account_id(superwerker_config):
+    return superwerker_config['/superwerker/account_id_logarchive']
 
 def control_tower_exection_role_session(account_id):
     account_creds = sts.assume_role(
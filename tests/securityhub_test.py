@@ -6,7 +6,6 @@ from retrying import retry
 
 events = boto3.client('events')
 organizations = boto3.client('organizations')
-ssm = boto3.client('ssm')
 sts = boto3.client('sts')
 
 
@@ -15,12 +14,12 @@ def management_account_id():
     return sts.get_caller_identity()['Account']
 
 @pytest.fixture(scope="module")
-def audit_account_id():
-    return ssm.get_parameter(Name='/superwerker/account_id_audit')['Parameter']['Value']
+def audit_account_id(superwerker_config):
+    return superwerker_config['/superwerker/account_id_audit']
 
 @pytest.fixture(scope="module")
-def log_archive_account_id():
-    return ssm.get_parameter(Name='/superwerker/account_id_logarchive')['Parameter']['Value']
+def log_archive_account_id(superwerker_config):
+    return superwerker_config['/superwerker/account_id_logarchive']
 
 def control_tower_exection_role_session(account_id):
     account_creds = sts.assume_role(
@@ -139,7 +138,6 @@ from retrying import retry
 
 events = boto3.client('events')
 organizations = boto3.client('organizations')
-ssm = boto3.client('ssm')
 sts = boto3.client('sts')
 
 
@@ -148,16 +146,16 @@ def management_account_id():
     return sts.get_caller_identity()['Account']
 
 @pytest.fixture(scope="module")
-def audit_account_id():
-    return ssm.get_parameter(Name='/superwerker/account_id_audit')['Parameter']['Value']
+def audit_account_id(superwerker_config):
+    return superwerker_config['/superwerker/account_id_audit']
 
 @pytest.fixture(scope="module")
-def log_archive_account_id():
-    return ssm.get_parameter(Name='/superwerker/account_id_logarchive')['Parameter']['Value']
+def log_archive_account_id(superwerker_config):
+    return superwerker_config['/superwerker/account_id_logarchive']
 
 @pytest.fixture(scope="module")
-def control_tower_regions():
-    return ssm.get_parameter(Name='/superwerker/controltower/regions')['Parameter']['Value']
+def control_tower_regions(superwerker_config):
+    return superwerker_config['/superwerker/controltower/regions']
 
 def control_tower_exection_role_session(account_id):
     account_creds = sts.assume_role(